@@ -0,0 +1,407 @@
+"""
+    Compact binary format for logger event logs
+
+    Files start with MAGIC and are a stream of length prefixed records:
+
+        varint length | u8 record type | payload
+
+    STRING records add an entry to the file's string table. Event names, dict
+    keys and short string values are written once and referenced by id after
+    that. EVENT records carry a fixed width u32 timestamp, the event name id
+    and the event data. [U:1:n] steamids are stored as a fixed width u32.
+    RESET clears the string table and is written whenever the logger starts
+    appending to an existing file.
+
+    This module only uses the standard library so it can be run on its own:
+
+        python binlog.py convert event.blog -o event.log
+        python binlog.py bench --events 200000
+"""
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Core Imports
+import argparse
+import tempfile
+import random
+import struct
+import time
+import json
+import sys
+import os
+import re
+
+# =============================================================================
+# >> FORMAT
+# =============================================================================
+MAGIC = b"SPLOGB1\n"
+EXTENSION = ".blog"
+
+RECORD_STRING = 1
+RECORD_EVENT = 2
+RECORD_RESET = 3
+
+TAG_NONE = 0
+TAG_FALSE = 1
+TAG_TRUE = 2
+TAG_INT = 3
+TAG_FLOAT = 4
+TAG_STR = 5
+TAG_REF = 6
+TAG_STEAMID3 = 7
+TAG_DICT = 8
+TAG_LIST = 9
+
+_U32 = struct.Struct("<I")
+_F64 = struct.Struct("<d")
+_STEAMID3 = re.compile(r"\[U:1:([1-9]\d{0,9}|0)\]")
+
+def _write_varint(buffer, value):
+    while value > 0x7F:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+def _read_varint(data, position):
+    result = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, position
+        shift += 7
+
+def _zigzag(value):
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+def _unzigzag(value):
+    return value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+# =============================================================================
+# >> ENCODER
+# =============================================================================
+class BinaryCodec(object):
+    """
+        Encodes logger records for one file. The string table lives as long
+        as the file handle, begin() starts a new one.
+    """
+    extension = EXTENSION
+
+    def __init__(self, max_strings=65536, max_intern_length=32):
+        self.max_strings = max_strings
+        self.max_intern_length = max_intern_length
+        self.strings = {}
+
+    def begin(self, empty):
+        self.strings = {}
+        if empty:
+            return MAGIC
+
+        buffer = bytearray()
+        self._record(buffer, RECORD_RESET, b"")
+        return bytes(buffer)
+
+    def encode(self, record):
+        definitions = bytearray()
+        body = bytearray((RECORD_EVENT,))
+        interned = len(self.strings)
+        try:
+            body += _U32.pack(int(record["time"]) & 0xFFFFFFFF)
+            _write_varint(body, self._intern(definitions, str(record["event_name"])))
+            self._value(definitions, body, record["event"])
+        except Exception:
+            # The record and its string definitions are dropped together, so
+            # the ids it took have to be given back
+            for string in list(self.strings)[interned:]:
+                del self.strings[string]
+            raise
+
+        _write_varint(definitions, len(body))
+        definitions += body
+        return bytes(definitions)
+
+    def _record(self, buffer, record_type, payload):
+        _write_varint(buffer, len(payload) + 1)
+        buffer.append(record_type)
+        buffer += payload
+
+    def _intern(self, definitions, string):
+        string_id = self.strings.get(string)
+        if string_id is None:
+            string_id = len(self.strings)
+            self.strings[string] = string_id
+            self._record(definitions, RECORD_STRING, string.encode("utf-8"))
+        return string_id
+
+    def _value(self, definitions, body, value):
+        if value is None:
+            body.append(TAG_NONE)
+        elif value is True:
+            body.append(TAG_TRUE)
+        elif value is False:
+            body.append(TAG_FALSE)
+        elif isinstance(value, int):
+            body.append(TAG_INT)
+            _write_varint(body, _zigzag(value))
+        elif isinstance(value, float):
+            body.append(TAG_FLOAT)
+            body += _F64.pack(value)
+        elif isinstance(value, str):
+            match = _STEAMID3.fullmatch(value) if value.startswith("[U:1:") else None
+            if match is not None and int(match.group(1)) <= 0xFFFFFFFF:
+                body.append(TAG_STEAMID3)
+                body += _U32.pack(int(match.group(1)))
+            elif len(value) <= self.max_intern_length and (value in self.strings or len(self.strings) < self.max_strings):
+                body.append(TAG_REF)
+                _write_varint(body, self._intern(definitions, value))
+            else:
+                encoded = value.encode("utf-8")
+                body.append(TAG_STR)
+                _write_varint(body, len(encoded))
+                body += encoded
+        elif isinstance(value, dict):
+            body.append(TAG_DICT)
+            _write_varint(body, len(value))
+            for key, item in value.items():
+                _write_varint(body, self._intern(definitions, str(key)))
+                self._value(definitions, body, item)
+        elif isinstance(value, (list, tuple)):
+            body.append(TAG_LIST)
+            _write_varint(body, len(value))
+            for item in value:
+                self._value(definitions, body, item)
+        else:
+            raise TypeError(f"Can't encode {type(value).__name__} in a binary log")
+
+# =============================================================================
+# >> DECODER
+# =============================================================================
+class TruncatedRecord(Exception):
+    pass
+
+def _decode_value(data, position, strings):
+    tag = data[position]
+    position += 1
+
+    if tag == TAG_NONE:
+        return None, position
+    if tag == TAG_FALSE:
+        return False, position
+    if tag == TAG_TRUE:
+        return True, position
+    if tag == TAG_INT:
+        value, position = _read_varint(data, position)
+        return _unzigzag(value), position
+    if tag == TAG_FLOAT:
+        return _F64.unpack_from(data, position)[0], position + 8
+    if tag == TAG_STR:
+        length, position = _read_varint(data, position)
+        return data[position:position + length].decode("utf-8"), position + length
+    if tag == TAG_REF:
+        string_id, position = _read_varint(data, position)
+        return strings[string_id], position
+    if tag == TAG_STEAMID3:
+        return f"[U:1:{_U32.unpack_from(data, position)[0]}]", position + 4
+    if tag == TAG_DICT:
+        count, position = _read_varint(data, position)
+        value = {}
+        for _ in range(count):
+            key_id, position = _read_varint(data, position)
+            value[strings[key_id]], position = _decode_value(data, position, strings)
+        return value, position
+    if tag == TAG_LIST:
+        count, position = _read_varint(data, position)
+        value = []
+        for _ in range(count):
+            item, position = _decode_value(data, position, strings)
+            value.append(item)
+        return value, position
+
+    raise ValueError(f"Unknown value tag {tag}")
+
+def read_records(file, chunk_size=1024 * 1024):
+    """
+        Yields every event in a binary log as the same dict log_json queued
+        Reads the file in chunks, so arbitrarily large logs stream through
+        A partially written record at the end of the file is ignored
+    """
+    if file.read(len(MAGIC)) != MAGIC:
+        raise ValueError("Not a binary logger file")
+
+    strings = []
+    data = b""
+    position = 0
+    eof = False
+
+    while True:
+        try:
+            if position >= len(data):
+                raise TruncatedRecord
+
+            length, start = _read_varint(data, position)
+            end = start + length
+            if end > len(data):
+                raise TruncatedRecord
+        except (TruncatedRecord, IndexError):
+            if eof:
+                return
+
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            data = data[position:] + chunk
+            position = 0
+            continue
+
+        record_type = data[start]
+        if record_type == RECORD_STRING:
+            strings.append(data[start + 1:end].decode("utf-8"))
+        elif record_type == RECORD_RESET:
+            strings = []
+        elif record_type == RECORD_EVENT:
+            timestamp = _U32.unpack_from(data, start + 1)[0]
+            name_id, offset = _read_varint(data, start + 5)
+            event, _ = _decode_value(data, offset, strings)
+            yield {"time": timestamp, "event_name": strings[name_id], "event": event}
+        else:
+            raise ValueError(f"Unknown record type {record_type}")
+
+        position = end
+
+def convert(source, destination):
+    """
+        Streams a binary log back out as JSON lines, exactly as the JSON
+        file sink would have written them
+    """
+    count = 0
+    for record in read_records(source):
+        destination.write(json.dumps(record))
+        destination.write("\n")
+        count += 1
+    return count
+
+# =============================================================================
+# >> BENCHMARK
+# =============================================================================
+def _sample_events(count, seed=1):
+    generator = random.Random(seed)
+    players = [
+        (f"[U:1:{generator.randint(10000, 400000000)}]", f"player{i} {'x' * generator.randint(0, 12)}")
+        for i in range(24)
+    ]
+    teams = ["unassigned", "spectate", "red", "blue"]
+    words = "gg push mid uber ready heal demo sniper last point ff fresh spawn".split()
+    now = int(time.time())
+
+    for i in range(count):
+        steamid, name = generator.choice(players)
+        team = generator.randint(2, 3)
+        kind = generator.random()
+        if kind < 0.6:
+            yield "chat.log", {
+                "time": now + i // 20,
+                "event_name": "player_chat",
+                "event": {
+                    "team_only": generator.random() < 0.3,
+                    "message": " ".join(generator.choice(words) for _ in range(generator.randint(1, 8))),
+                    "player": {"steamid": steamid, "name": name, "team": team, "team_name": teams[team]}
+                }
+            }
+        elif kind < 0.8:
+            yield "connect.log", {
+                "time": now + i // 20,
+                "event_name": "player_connect",
+                "event": {
+                    "player": {"bot": False, "ip_address": f"10.0.{i % 255}.{generator.randint(1, 254)}:27005", "name": name, "steamid": steamid},
+                    "blank": 0
+                }
+            }
+        else:
+            yield "event.log", {
+                "time": now + i // 20,
+                "event_name": "player_change_class",
+                "event": {
+                    "class": generator.randint(1, 9),
+                    "class_name": generator.choice(["scout", "soldier", "demoman", "medic"]),
+                    "player": {"steamid": steamid, "name": name, "team": team, "team_name": teams[team]}
+                }
+            }
+
+def benchmark(events=100000, directory=None):
+    records = list(_sample_events(events))
+    results = {}
+
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        for label, extension, make_codec in (("json", ".log", None), ("binary", EXTENSION, BinaryCodec)):
+            codecs = {}
+            handles = {}
+            start = time.perf_counter()
+            for logfile, record in records:
+                handle = handles.get(logfile)
+                if handle is None:
+                    handle = handles[logfile] = open(os.path.join(tmp, logfile[:-4] + extension), "wb")
+                    if make_codec is not None:
+                        codecs[logfile] = make_codec()
+                        handle.write(codecs[logfile].begin(True))
+
+                if make_codec is None:
+                    handle.write((json.dumps(record) + "\n").encode("utf-8"))
+                else:
+                    handle.write(codecs[logfile].encode(record))
+
+            for handle in handles.values():
+                handle.close()
+            elapsed = time.perf_counter() - start
+
+            size = sum(os.path.getsize(os.path.join(tmp, name)) for name in os.listdir(tmp) if name.endswith(extension))
+            results[label] = (elapsed, size)
+
+        # Make sure the binary files decode back to exactly what went in
+        decoded = 0
+        start = time.perf_counter()
+        for name in os.listdir(tmp):
+            if name.endswith(EXTENSION):
+                with open(os.path.join(tmp, name), "rb") as file:
+                    decoded += sum(1 for _ in read_records(file))
+        read_elapsed = time.perf_counter() - start
+
+    print(f"{events} events")
+    for label, (elapsed, size) in results.items():
+        print(f"  {label:<7} {events / elapsed:>10.0f} events/s  {size / 1024:>10.1f} KiB  {size / events:>6.1f} bytes/event")
+    print(f"  binary read back {decoded} events at {decoded / read_elapsed:.0f} events/s")
+    json_size, binary_size = results["json"][1], results["binary"][1]
+    print(f"  binary is {100 * binary_size / json_size:.1f}% of the json size")
+
+# =============================================================================
+# >> CLI
+# =============================================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Binary logger file tools")
+    commands = parser.add_subparsers(dest="command")
+
+    convert_parser = commands.add_parser("convert", help="Convert a binary log to JSON lines")
+    convert_parser.add_argument("input", help="Binary log file (.blog)")
+    convert_parser.add_argument("-o", "--output", help="Write JSON lines here instead of stdout")
+
+    bench_parser = commands.add_parser("bench", help="Compare the binary and JSON formats")
+    bench_parser.add_argument("--events", type=int, default=100000)
+    bench_parser.add_argument("--dir", default=None, help="Directory to write the temporary files in")
+
+    args = parser.parse_args(argv)
+    if args.command == "convert":
+        with open(args.input, "rb") as source:
+            if args.output:
+                with open(args.output, "w") as destination:
+                    convert(source, destination)
+            else:
+                convert(source, sys.stdout)
+    elif args.command == "bench":
+        benchmark(args.events, args.dir)
+    else:
+        parser.print_help()
+        return 1
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
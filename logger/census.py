@@ -0,0 +1,114 @@
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Core Imports
+import time
+
+# =============================================================================
+# >> PLAYER KINDS
+# =============================================================================
+KIND_HUMAN = "human"
+KIND_BOT = "bot"
+KIND_HLTV = "hltv"
+
+# =============================================================================
+# >> PLAYER CENSUS
+# =============================================================================
+class PlayerCensus(object):
+    """
+        Keeps the player counts up to date from connect/team/disconnect events
+        so nobody has to walk every player to know how many are on the server.
+        reconcile() takes a full listing now and then to fix any drift.
+    """
+    def __init__(self):
+        # userid -> [kind, team]
+        self.entries = {}
+        self.players = 0
+        self.spectators = 0
+        self.bots = 0
+        self.hltv = 0
+
+        self.idle_start = -1
+        self.idle_duration = 0
+
+        self.reconciled = 0
+        self.drift = 0
+
+    @property
+    def humans(self):
+        return self.players + self.spectators
+
+    def _bucket(self, kind, team):
+        if kind == KIND_HLTV:
+            return "hltv"
+        if kind == KIND_BOT:
+            return "bots"
+        if team in (0, 1):
+            return "spectators"
+        return "players"
+
+    def _count(self, entry, delta):
+        bucket = self._bucket(*entry)
+        setattr(self, bucket, getattr(self, bucket) + delta)
+
+    def connect(self, userid, kind, team=0):
+        self.disconnect(userid)
+        entry = [kind, team]
+        self.entries[userid] = entry
+        self._count(entry, 1)
+
+    def disconnect(self, userid):
+        entry = self.entries.pop(userid, None)
+        if entry is not None:
+            self._count(entry, -1)
+
+    def change(self, userid, kind=None, team=None):
+        entry = self.entries.get(userid)
+        if entry is None:
+            self.connect(userid, kind or KIND_HUMAN, team or 0)
+            return
+
+        self._count(entry, -1)
+        if kind is not None:
+            entry[0] = kind
+        if team is not None:
+            entry[1] = team
+        self._count(entry, 1)
+
+    def counts(self):
+        return self.players, self.spectators, self.bots, self.hltv
+
+    def reconcile(self, listing):
+        """
+            Replaces the tracked state with listing, an iterable of
+            (userid, kind, team). Returns True if the counts had drifted.
+        """
+        before = self.counts()
+        self.entries = {}
+        self.players = self.spectators = self.bots = self.hltv = 0
+        for userid, kind, team in listing:
+            self.connect(userid, kind, team)
+
+        self.reconciled = time.time()
+        if self.counts() != before:
+            self.drift += 1
+            return True
+
+        return False
+
+    def update_idle(self, now=None):
+        """
+            The server counts as idle while nobody is playing and fewer than
+            4 people are spectating
+        """
+        if now is None:
+            now = time.time()
+
+        if self.players >= 1:
+            self.idle_start = -1
+            self.idle_duration = 0
+        elif self.spectators < 4 and self.idle_start == -1:
+            self.idle_start = now
+            self.idle_duration = 0
+        elif self.spectators < 4 and self.idle_start >= 0:
+            self.idle_duration = now - self.idle_start
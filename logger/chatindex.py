@@ -0,0 +1,835 @@
+"""
+    Inverted index over the logger's chat.log for moderation searches
+
+    Every chat line becomes a document (file, offset, time) and every word in
+    it a term pointing back at its documents. The speaker's SteamID is
+    indexed as the term "@<steamid>", so SteamID filters are just another
+    term.
+
+    The index lives in <logs>/chat_index/ as immutable segment files plus a
+    manifest naming the live segments and the log files their documents
+    point into:
+
+        magic | u32 docs | u32 terms
+        docs * (u32 file, u64 offset, u32 time)
+        (terms + 1) * u32 term blob offsets
+        (terms + 1) * u64 postings blob offsets
+        term blob (utf-8 terms, sorted)
+        postings blob (varint delta encoded document ids per term)
+
+    The logger buffers new documents and writes them out as a segment every
+    batch_docs documents or batch_seconds. A background thread merges small
+    segments into bigger ones and indexes rotated chat logs from before the
+    index existed. Whatever the live log holds past the last segment is
+    scanned directly at query time, so searches never miss recent chat.
+
+    This module only uses the standard library so it can be run on its own:
+
+        python chatindex.py query /path/to/logs cheat* --steamid "[U:1:1234]" --since 2026-09-01
+        python chatindex.py rebuild /path/to/logs
+"""
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Core Imports
+from array import array
+import threading
+import tempfile
+import argparse
+import struct
+import shutil
+import heapq
+import mmap
+import json
+import time
+import sys
+import os
+import re
+
+try:
+    # Source.Python Imports
+    from listeners.tick import GameThread
+except ImportError:
+    # Run on its own through the CLI
+    GameThread = threading.Thread
+
+try:
+    # Plugin Imports
+    from .logindex import COMPRESSED_SUFFIXES, SEGMENT_PATTERN, segment_key, open_log, parse_time
+except ImportError:
+    # Run on its own, logindex sits next to us
+    from logindex import COMPRESSED_SUFFIXES, SEGMENT_PATTERN, segment_key, open_log, parse_time
+
+# =============================================================================
+# >> FORMAT
+# =============================================================================
+MAGIC = b"SPCHIX1\n"
+HEADER = struct.Struct("<II")
+DOC = struct.Struct("<IQI")
+TERM_OFFSET = struct.Struct("<I")
+POSTING_OFFSET = struct.Struct("<Q")
+
+MANIFEST = "manifest.json"
+SEGMENT_EXTENSION = ".seg"
+
+STEAMID_PREFIX = b"@"
+TOKEN_PATTERN = re.compile(r"\w+")
+MAX_TOKEN = 64
+
+def index_directory(directory, logfile="chat.log"):
+    # No dots in the name, the rotator treats <name>.<name>.<name> as a segment
+    return os.path.join(directory, os.path.splitext(logfile)[0] + "_index")
+
+def tokenize(text):
+    """
+        Case folded words of a message as a set of utf-8 terms
+    """
+    return {
+        token.encode("utf-8") for token in TOKEN_PATTERN.findall(text.casefold())
+        if len(token) <= MAX_TOKEN
+    }
+
+def document_terms(record):
+    terms = set()
+    event = record.get("event")
+    if not isinstance(event, dict):
+        return terms
+
+    message = event.get("message")
+    if isinstance(message, str):
+        terms.update(tokenize(message))
+
+    player = event.get("player")
+    if isinstance(player, dict) and isinstance(player.get("steamid"), str):
+        terms.add(STEAMID_PREFIX + player["steamid"].encode("utf-8"))
+
+    return terms
+
+def document_time(record):
+    timestamp = record.get("time", 0)
+    if not isinstance(timestamp, int) or timestamp < 0:
+        return 0
+    return min(timestamp, 0xFFFFFFFF)
+
+def encode_postings(ids):
+    buffer = bytearray()
+    last = 0
+    for doc in ids:
+        value = doc - last
+        last = doc
+        while value >= 0x80:
+            buffer.append((value & 0x7F) | 0x80)
+            value >>= 7
+        buffer.append(value)
+    return bytes(buffer)
+
+def decode_postings(data):
+    ids = []
+    last = value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            last += value
+            ids.append(last)
+            value = shift = 0
+    return ids
+
+def _little_endian(values):
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+# =============================================================================
+# >> LOG FILES
+# =============================================================================
+def base_name(path):
+    """
+        chat.log.20261018-120000.gz -> chat.log.20261018-120000
+        The index refers to segments by their name before compression
+    """
+    name = os.path.basename(path)
+    base, extension = os.path.splitext(name)
+    return base if extension in COMPRESSED_SUFFIXES else name
+
+def resolve(directory, name):
+    """
+        Current path of a log the index knows by name, None once it's expired
+    """
+    for suffix in ("", *COMPRESSED_SUFFIXES):
+        path = os.path.join(directory, name + suffix)
+        if os.path.exists(path):
+            return path
+    return None
+
+def rotated_segments(directory, logfile):
+    names = set()
+    for name in os.listdir(directory):
+        if name.startswith(logfile + ".") and SEGMENT_PATTERN.search(name):
+            names.add(base_name(name))
+    return sorted(names, key=segment_key)
+
+def scan_records(path, start=0, end=None):
+    """
+        Yields (offset, length, record) for every complete JSON line from start
+        up to end
+    """
+    with open_log(path) as file:
+        file.seek(start)
+        offset = start
+        for line in file:
+            if not line.endswith(b"\n") or (end is not None and offset + len(line) > end):
+                break
+
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+
+            if isinstance(record, dict):
+                yield offset, len(line), record
+            offset += len(line)
+
+def read_lines(path, offsets):
+    """
+        Returns {offset: line} for the lines starting at offsets
+        Offsets are visited in order, so a compressed log is decompressed once
+    """
+    lines = {}
+    with open_log(path) as file:
+        for offset in sorted(offsets):
+            file.seek(offset)
+            lines[offset] = file.readline().rstrip(b"\n").decode("utf-8", "replace")
+    return lines
+
+# =============================================================================
+# >> SEGMENTS
+# =============================================================================
+def write_segment(path, docs, terms):
+    """
+        docs are packed DOC structs, terms yields (term, ascending doc ids) in
+        term order. Written to a temporary file and renamed into place.
+    """
+    term_offsets = array("I", [0])
+    posting_offsets = array("Q", [0])
+    term_blob = bytearray()
+
+    tmp_path = path + ".tmp"
+    with tempfile.TemporaryFile(dir=os.path.dirname(path)) as postings:
+        for term, ids in terms:
+            encoded = encode_postings(ids)
+            postings.write(encoded)
+            posting_offsets.append(posting_offsets[-1] + len(encoded))
+            term_blob += term
+            term_offsets.append(len(term_blob))
+
+        with open(tmp_path, "wb") as file:
+            file.write(MAGIC)
+            file.write(HEADER.pack(len(docs) // DOC.size, len(term_offsets) - 1))
+            file.write(docs)
+            file.write(_little_endian(term_offsets))
+            file.write(_little_endian(posting_offsets))
+            file.write(term_blob)
+            postings.seek(0)
+            shutil.copyfileobj(postings, file, 1024 * 1024)
+            file.flush()
+            os.fsync(file.fileno())
+
+    os.replace(tmp_path, path)
+
+class Segment(object):
+    """
+        Read only view of a segment file through mmap
+        Term lookups are a binary search over the term blob, nothing is read
+        up front beyond the header
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self.data[:len(MAGIC)] != MAGIC:
+            self.data.close()
+            raise ValueError(f"{path} is not a chat index segment")
+
+        self.docs, self.terms = HEADER.unpack_from(self.data, len(MAGIC))
+        self.docs_at = len(MAGIC) + HEADER.size
+        self.term_offsets_at = self.docs_at + self.docs * DOC.size
+        self.posting_offsets_at = self.term_offsets_at + (self.terms + 1) * TERM_OFFSET.size
+        self.term_blob_at = self.posting_offsets_at + (self.terms + 1) * POSTING_OFFSET.size
+        self.postings_at = self.term_blob_at + self._term_offset(self.terms)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.data.close()
+
+    def _term_offset(self, index):
+        return TERM_OFFSET.unpack_from(self.data, self.term_offsets_at + index * TERM_OFFSET.size)[0]
+
+    def term(self, index):
+        start, end = self._term_offset(index), self._term_offset(index + 1)
+        return self.data[self.term_blob_at + start:self.term_blob_at + end]
+
+    def postings(self, index):
+        start, end = struct.unpack_from("<QQ", self.data, self.posting_offsets_at + index * POSTING_OFFSET.size)
+        return decode_postings(self.data[self.postings_at + start:self.postings_at + end])
+
+    def doc(self, index):
+        """
+            (file id, offset, time) of a document
+        """
+        return DOC.unpack_from(self.data, self.docs_at + index * DOC.size)
+
+    def _lower_bound(self, term):
+        low, high = 0, self.terms
+        while low < high:
+            middle = (low + high) // 2
+            if self.term(middle) < term:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def lookup(self, term, prefix=False):
+        """
+            Sorted doc ids containing term, or any term starting with it
+        """
+        index = self._lower_bound(term)
+        if not prefix:
+            if index < self.terms and self.term(index) == term:
+                return self.postings(index)
+            return []
+
+        ids = []
+        while index < self.terms and self.term(index).startswith(term):
+            ids.extend(self.postings(index))
+            index += 1
+        return sorted(set(ids))
+
+# =============================================================================
+# >> MANIFEST
+# =============================================================================
+def load_manifest(path):
+    try:
+        with open(os.path.join(path, MANIFEST)) as file:
+            manifest = json.load(file)
+    except FileNotFoundError:
+        manifest = {}
+
+    manifest.setdefault("next_segment", 1)
+    manifest.setdefault("next_file", 1)
+    manifest.setdefault("segments", [])
+    # file id -> {"name": log name before compression, "indexed": offset}
+    manifest.setdefault("files", {})
+    manifest.setdefault("live", None)
+    return manifest
+
+def save_manifest(path, manifest):
+    manifest_path = os.path.join(path, MANIFEST)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w") as file:
+        json.dump(manifest, file, sort_keys=True)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, manifest_path)
+
+class Batch(object):
+    """
+        Documents waiting to be written out as one segment
+    """
+    def __init__(self):
+        self.docs = bytearray()
+        self.terms = {}
+        self.count = 0
+        self.started = 0.0
+
+    def add(self, file_id, offset, record):
+        if self.count == 0:
+            self.started = time.monotonic()
+
+        doc = self.count
+        self.docs += DOC.pack(file_id, offset, document_time(record))
+        for term in document_terms(record):
+            self.terms.setdefault(term, []).append(doc)
+        self.count += 1
+
+    def write(self, path):
+        write_segment(path, self.docs, sorted(self.terms.items()))
+
+def _term_stream(segment, number):
+    for index in range(segment.terms):
+        yield segment.term(index), number, index
+
+# =============================================================================
+# >> INDEXER
+# =============================================================================
+class ChatIndex(object):
+    """
+        Keeps the index of a chat log up to date as the logger writes it
+
+        open/add/close/rotated are called from the log writer thread, same as
+        LogIndexer. Merging segments and indexing old rotated logs happen on a
+        thread of its own. The manifest is only touched under self.lock.
+    """
+    def __init__(self, directory, logfile="chat.log", batch_docs=512, batch_seconds=60.0, merge_factor=8):
+        self.directory = directory
+        self.logfile = logfile
+        self.path = index_directory(directory, logfile)
+        self.batch_docs = batch_docs
+        self.batch_seconds = batch_seconds
+        self.merge_factor = max(2, merge_factor)
+
+        self.lock = threading.Lock()
+        self.manifest = None
+        self.batch = Batch()
+        # Where the next line of the live log starts
+        self.position = 0
+
+        self.wake = threading.Event()
+        self.running = False
+        self.thread = None
+        self.errors = 0
+
+    def start(self):
+        os.makedirs(self.path, exist_ok=True)
+        self.manifest = load_manifest(self.path)
+        self._remove_orphans()
+
+        self.running = True
+        self.thread = GameThread(target=self._run, name="logger-chat-index")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self, timeout=5):
+        if self.thread is None:
+            return
+
+        self.running = False
+        self.wake.set()
+        self.thread.join(timeout)
+        self.thread = None
+
+    def _remove_orphans(self):
+        # Segments written right before a crash, never added to the manifest
+        live = set(self.manifest["segments"])
+        for name in os.listdir(self.path):
+            if name.endswith(".tmp") or (name.endswith(SEGMENT_EXTENSION) and name not in live):
+                try:
+                    os.remove(os.path.join(self.path, name))
+                except OSError:
+                    pass
+
+    def _new_segment(self):
+        name = f"{self.manifest['next_segment']:08d}{SEGMENT_EXTENSION}"
+        self.manifest["next_segment"] += 1
+        return name
+
+    def _new_file(self, name, indexed=0):
+        file_id = str(self.manifest["next_file"])
+        self.manifest["next_file"] += 1
+        self.manifest["files"][file_id] = {"name": name, "indexed": indexed}
+        return file_id
+
+    # =========================================================================
+    # >> LOG WRITER INTERFACE
+    # =========================================================================
+    def open(self, offset):
+        with self.lock:
+            live = self.manifest["files"].get(self.manifest["live"])
+            if live is None or live["indexed"] > offset:
+                # First run, or the log was truncated or replaced behind our
+                # back. Its documents point into content that's gone, without
+                # an entry they're skipped and dropped by the next merge.
+                self.manifest["files"].pop(self.manifest["live"], None)
+                self.manifest["live"] = self._new_file(self.logfile)
+                save_manifest(self.path, self.manifest)
+                live = self.manifest["files"][self.manifest["live"]]
+            indexed = live["indexed"]
+
+        self.position = indexed
+        if indexed < offset:
+            # Written while we weren't indexing
+            self._catch_up(offset)
+        self.position = offset
+
+    def add(self, offset, length, record):
+        if offset != self.position:
+            self._catch_up(offset)
+
+        self.batch.add(int(self.manifest["live"]), offset, record)
+        self.position = offset + length
+
+        if self.batch.count >= self.batch_docs or time.monotonic() - self.batch.started >= self.batch_seconds:
+            self.flush()
+
+    def close(self):
+        self.flush()
+
+    def rotated(self, target):
+        self.flush()
+        name = base_name(target)
+        with self.lock:
+            # Segment names get reused once the old one expires, forget the old
+            # log so its documents can't point into the new one
+            for file_id, entry in list(self.manifest["files"].items()):
+                if entry["name"] == name and file_id != self.manifest["live"]:
+                    del self.manifest["files"][file_id]
+
+            live = self.manifest["files"].get(self.manifest["live"])
+            if live is not None:
+                live["name"] = name
+            self.manifest["live"] = self._new_file(self.logfile)
+            save_manifest(self.path, self.manifest)
+        self.position = 0
+
+    def _catch_up(self, offset):
+        path = os.path.join(self.directory, self.logfile)
+        file_id = int(self.manifest["live"])
+        try:
+            for start, length, record in scan_records(path, self.position, offset):
+                self.batch.add(file_id, start, record)
+        except OSError as e:
+            print(f"Logger: could not index {path}: {e}")
+        self.position = offset
+
+    def flush(self):
+        if self.batch.count == 0:
+            return
+
+        batch, self.batch = self.batch, Batch()
+        with self.lock:
+            name = self._new_segment()
+
+        try:
+            batch.write(os.path.join(self.path, name))
+        except OSError as e:
+            print(f"Logger: failed to write chat index segment {name}: {e}")
+            self.errors += 1
+            return
+
+        with self.lock:
+            self.manifest["segments"].append(name)
+            self.manifest["files"][self.manifest["live"]]["indexed"] = self.position
+            save_manifest(self.path, self.manifest)
+        self.wake.set()
+
+    # =========================================================================
+    # >> BACKGROUND THREAD
+    # =========================================================================
+    def _run(self):
+        while self.running:
+            try:
+                if not self._backfill() and not self._merge():
+                    self.wake.wait(60)
+                    self.wake.clear()
+            except Exception as e:
+                # One bad pass mustn't stop merges and backfill for good
+                print(f"Logger: chat index maintenance failed: {e}")
+                self.errors += 1
+                self.wake.wait(60)
+                self.wake.clear()
+
+    def _backfill(self):
+        """
+            Indexes one rotated log the index has never seen
+            Returns whether there was one
+        """
+        with self.lock:
+            known = {entry["name"] for entry in self.manifest["files"].values()}
+
+        for name in reversed(rotated_segments(self.directory, self.logfile)):
+            if name in known:
+                continue
+
+            path = resolve(self.directory, name)
+            if path is None:
+                continue
+
+            with self.lock:
+                if any(entry["name"] == name for entry in self.manifest["files"].values()):
+                    # Renamed from the live log since we looked
+                    continue
+                file_id = self._new_file(name)
+                segment = self._new_segment()
+
+            batch = Batch()
+            end = 0
+            for offset, length, record in scan_records(path):
+                batch.add(int(file_id), offset, record)
+                end = offset + length
+                if not self.running:
+                    # Left unindexed, the next run starts over
+                    with self.lock:
+                        self.manifest["files"].pop(file_id, None)
+                    return False
+
+            if batch.count:
+                batch.write(os.path.join(self.path, segment))
+
+            with self.lock:
+                if file_id not in self.manifest["files"]:
+                    # rotated() gave the name to the log it used to be, which
+                    # is indexed already
+                    self._discard(segment)
+                    return True
+
+                if batch.count:
+                    self.manifest["segments"].append(segment)
+                self.manifest["files"][file_id]["indexed"] = end
+                save_manifest(self.path, self.manifest)
+            return True
+
+        return False
+
+    def _discard(self, segment):
+        try:
+            os.remove(os.path.join(self.path, segment))
+        except OSError:
+            pass
+
+    def _merge(self):
+        """
+            Merges the merge_factor smallest segments into one, dropping the
+            documents of logs that have expired since
+            Returns whether anything was merged
+        """
+        with self.lock:
+            if len(self.manifest["segments"]) < self.merge_factor:
+                return False
+
+            sizes = sorted((os.path.getsize(os.path.join(self.path, name)), name) for name in self.manifest["segments"])
+            chosen = [name for _, name in sizes[:self.merge_factor]]
+            chosen.sort(key=self.manifest["segments"].index)
+            files = dict(self.manifest["files"])
+            live = self.manifest["live"]
+            target = self._new_segment()
+
+        alive = {int(file_id) for file_id, entry in files.items() if file_id == live or resolve(self.directory, entry["name"]) is not None}
+
+        segments = [Segment(os.path.join(self.path, name)) for name in chosen]
+        try:
+            docs = bytearray()
+            remaps = []
+            for segment in segments:
+                remap = array("l")
+                for index in range(segment.docs):
+                    doc = segment.doc(index)
+                    if doc[0] in alive:
+                        remap.append(len(docs) // DOC.size)
+                        docs += DOC.pack(*doc)
+                    else:
+                        remap.append(-1)
+                remaps.append(remap)
+
+            if docs:
+                write_segment(os.path.join(self.path, target), docs, self._merged_terms(segments, remaps))
+        finally:
+            for segment in segments:
+                segment.close()
+
+        with self.lock:
+            position = self.manifest["segments"].index(chosen[0])
+            self.manifest["segments"] = [name for name in self.manifest["segments"] if name not in chosen]
+            if docs:
+                self.manifest["segments"].insert(position, target)
+            for file_id in list(self.manifest["files"]):
+                if file_id != self.manifest["live"] and file_id in files and int(file_id) not in alive:
+                    del self.manifest["files"][file_id]
+            save_manifest(self.path, self.manifest)
+
+        for name in chosen:
+            try:
+                os.remove(os.path.join(self.path, name))
+            except OSError:
+                pass
+
+        return True
+
+    @staticmethod
+    def _merged_terms(segments, remaps):
+        streams = [_term_stream(segment, number) for number, segment in enumerate(segments)]
+
+        current, ids = None, []
+        for term, number, index in heapq.merge(*streams):
+            if term != current:
+                if ids:
+                    yield current, ids
+                current, ids = term, []
+
+            remap = remaps[number]
+            ids.extend(remap[doc] for doc in segments[number].postings(index) if remap[doc] >= 0)
+
+        if ids:
+            yield current, ids
+
+# =============================================================================
+# >> QUERIES
+# =============================================================================
+def query_terms(words, steamid=None):
+    """
+        Returns [(term, prefix)] for the words of a query
+        A trailing * matches every word starting with what comes before it
+    """
+    terms = []
+    for word in words:
+        prefix = word.endswith("*")
+        tokens = sorted(tokenize(word.rstrip("*")))
+        for token in tokens:
+            terms.append((token, prefix and token == tokens[-1]))
+
+    if steamid:
+        terms.append((STEAMID_PREFIX + steamid.encode("utf-8"), False))
+
+    return terms
+
+def _matches(terms, record):
+    found = document_terms(record)
+    for term, prefix in terms:
+        if prefix:
+            if not any(candidate.startswith(term) for candidate in found):
+                return False
+        elif term not in found:
+            return False
+    return True
+
+def _search_segment(segment, terms, since, until):
+    ids = None
+    # Rarest terms first so the intersection shrinks quickly
+    for postings in sorted((segment.lookup(term, prefix) for term, prefix in terms), key=len):
+        ids = set(postings) if ids is None else ids.intersection(postings)
+        if not ids:
+            return
+
+    for index in ids:
+        file_id, offset, timestamp = segment.doc(index)
+        if (since is None or timestamp >= since) and (until is None or timestamp <= until):
+            yield timestamp, file_id, offset
+
+def search(directory, words, steamid=None, since=None, until=None, limit=50, logfile="chat.log"):
+    """
+        Returns the newest limit raw JSON lines of logfile containing every
+        word (and said by steamid), oldest first
+    """
+    terms = query_terms(words, steamid)
+    if not terms:
+        return []
+
+    path = index_directory(directory, logfile)
+    for attempt in range(2):
+        manifest = load_manifest(path)
+        hits = []
+        try:
+            for name in manifest["segments"]:
+                with Segment(os.path.join(path, name)) as segment:
+                    hits.extend(_search_segment(segment, terms, since, until))
+            break
+        except FileNotFoundError:
+            # A merge replaced a segment under us, its replacement is in the new manifest
+            if attempt:
+                raise
+
+    files = {int(file_id): entry for file_id, entry in manifest["files"].items()}
+
+    # The tail of the live log that hasn't made it into a segment yet
+    live = files.get(int(manifest["live"])) if manifest["live"] is not None else None
+    live_path = os.path.join(directory, logfile)
+    if live is not None and os.path.exists(live_path):
+        for offset, _, record in scan_records(live_path, live["indexed"]):
+            timestamp = document_time(record)
+            if (since is None or timestamp >= since) and (until is None or timestamp <= until) and _matches(terms, record):
+                hits.append((timestamp, int(manifest["live"]), offset))
+
+    hits.sort(reverse=True)
+
+    # Read back lines until we have limit of them, skipping expired logs
+    lines = []
+    while hits and len(lines) < limit:
+        chosen, hits = hits[:limit - len(lines)], hits[limit - len(lines):]
+        by_file = {}
+        for timestamp, file_id, offset in chosen:
+            by_file.setdefault(file_id, {})[offset] = timestamp
+
+        for file_id, offsets in by_file.items():
+            entry = files.get(file_id)
+            log_path = resolve(directory, entry["name"]) if entry is not None else None
+            if log_path is None:
+                continue
+
+            for offset, line in read_lines(log_path, offsets).items():
+                lines.append((offsets[offset], file_id, offset, line))
+
+    lines.sort()
+    return [line for *_, line in lines]
+
+def rebuild(directory, logfile="chat.log"):
+    """
+        Throws the index away and indexes every chat log from scratch
+        Only run this while the logger isn't loaded
+    """
+    path = index_directory(directory, logfile)
+    shutil.rmtree(path, ignore_errors=True)
+
+    index = ChatIndex(directory, logfile)
+    os.makedirs(path, exist_ok=True)
+    index.manifest = load_manifest(path)
+    index.running = True
+    while index._backfill():
+        pass
+    while index._merge():
+        pass
+
+    live_path = os.path.join(directory, logfile)
+    if os.path.exists(live_path):
+        index.open(os.path.getsize(live_path))
+        index.close()
+
+    return index.manifest
+
+# =============================================================================
+# >> CLI
+# =============================================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search the logger's chat logs through their inverted index")
+    commands = parser.add_subparsers(dest="command")
+
+    query_parser = commands.add_parser("query", help="Print chat lines containing every word, a trailing * matches prefixes")
+    query_parser.add_argument("directory", help="The logs directory")
+    query_parser.add_argument("words", nargs="*")
+    query_parser.add_argument("--steamid")
+    query_parser.add_argument("--since", help="Unix time or ISO date")
+    query_parser.add_argument("--until", help="Unix time or ISO date")
+    query_parser.add_argument("--limit", type=int, default=50)
+    query_parser.add_argument("--logfile", default="chat.log")
+
+    rebuild_parser = commands.add_parser("rebuild", help="Index every chat log from scratch, with the logger unloaded")
+    rebuild_parser.add_argument("directory")
+    rebuild_parser.add_argument("--logfile", default="chat.log")
+
+    args = parser.parse_args(argv)
+    if args.command == "query":
+        started = time.perf_counter()
+        lines = search(
+            args.directory, args.words, args.steamid,
+            parse_time(args.since), parse_time(args.until), args.limit, args.logfile
+        )
+        for line in lines:
+            print(line)
+        print(f"{len(lines)} lines in {(time.perf_counter() - started) * 1000:.1f}ms", file=sys.stderr)
+    elif args.command == "rebuild":
+        manifest = rebuild(args.directory, args.logfile)
+        print(f"{len(manifest['files'])} files in {len(manifest['segments'])} segments")
+    else:
+        parser.print_help()
+        return 1
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Core Imports
+from array import array
+import time
+
+# =============================================================================
+# >> VERDICTS
+# =============================================================================
+ALLOW = 0
+DROP = 1
+# Dropped, and the player has been flooding long enough to be muted
+MUTE = 2
+# The message that was just allowed, being sent to another recipient
+REPEAT = 3
+
+# =============================================================================
+# >> CHAT LIMITER
+# =============================================================================
+class ChatLimiter(object):
+    """
+        Token bucket per player slot: rate messages per second with bursts of
+        up to burst messages. State lives in preallocated arrays indexed by
+        slot so checking a message is O(1) and allocation free.
+
+        Every run of dropped messages counts as a strike. strikes within
+        strike_window seconds escalate to MUTE.
+
+        The engine sends a SayText2 per recipient, so the same message seen
+        again on the same tick is coalesced: it gets the first copy's verdict
+        and doesn't cost another token.
+    """
+    def __init__(self, rate=1.0, burst=5, strikes=3, strike_window=60.0, max_slots=65):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.strikes = int(strikes)
+        self.strike_window = float(strike_window)
+        self.max_slots = max_slots
+
+        self.tokens = array("d", [self.burst]) * max_slots
+        self.updated = array("d", [0.0]) * max_slots
+        self.flooding = array("B", [0]) * max_slots
+        self.strike_count = array("H", [0]) * max_slots
+        self.strike_start = array("d", [0.0]) * max_slots
+        # Drops since the last drain_drops()
+        self.dropped = array("L", [0]) * max_slots
+
+        self.last_tick = array("l", [-1]) * max_slots
+        self.last_verdict = array("B", [ALLOW]) * max_slots
+        self.last_message = [None] * max_slots
+
+        self.total_dropped = 0
+
+    def reset(self, slot):
+        if not 0 <= slot < self.max_slots:
+            return
+
+        self.tokens[slot] = self.burst
+        self.updated[slot] = 0.0
+        self.flooding[slot] = 0
+        self.strike_count[slot] = 0
+        self.strike_start[slot] = 0.0
+        self.dropped[slot] = 0
+        self.last_tick[slot] = -1
+        self.last_message[slot] = None
+
+    def check(self, slot, message=None, tick=None, now=None):
+        if self.rate <= 0 or not 0 <= slot < self.max_slots:
+            return ALLOW
+
+        if tick is not None and tick == self.last_tick[slot] and message == self.last_message[slot]:
+            return REPEAT if self.last_verdict[slot] == ALLOW else DROP
+
+        self.last_tick[slot] = -1 if tick is None else tick
+        self.last_message[slot] = message
+        verdict = self.last_verdict[slot] = self._take(slot, now)
+        return verdict
+
+    def _take(self, slot, now):
+        if now is None:
+            now = time.monotonic()
+
+        tokens = self.tokens[slot]
+        if self.updated[slot]:
+            tokens = min(self.burst, tokens + (now - self.updated[slot]) * self.rate)
+        self.updated[slot] = now
+
+        if tokens >= 1.0:
+            self.tokens[slot] = tokens - 1.0
+            self.flooding[slot] = 0
+            return ALLOW
+
+        self.tokens[slot] = tokens
+        self.dropped[slot] += 1
+        self.total_dropped += 1
+
+        if self.flooding[slot]:
+            return DROP
+
+        # First drop of a new flood
+        self.flooding[slot] = 1
+        if now - self.strike_start[slot] > self.strike_window:
+            self.strike_start[slot] = now
+            self.strike_count[slot] = 0
+
+        self.strike_count[slot] += 1
+        if self.strikes > 0 and self.strike_count[slot] >= self.strikes:
+            self.strike_count[slot] = 0
+            return MUTE
+
+        return DROP
+
+    def drain_drops(self):
+        """
+            Yields (slot, dropped) for every slot that lost messages since the
+            last call, so floods are reported once instead of per message
+        """
+        for slot in range(self.max_slots):
+            dropped = self.dropped[slot]
+            if dropped:
+                self.dropped[slot] = 0
+                yield slot, dropped
@@ -0,0 +1,92 @@
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Core Imports
+from array import array
+import time
+
+# =============================================================================
+# >> FRAME TIME HISTOGRAM
+# =============================================================================
+class FrameTimeHistogram(object):
+    """
+        Fixed bucket histogram of the time between server ticks
+        Buckets are resolution seconds wide up to limit, anything slower goes
+        in one overflow bucket. Sampling does no allocation beyond the float
+        perf_counter hands back.
+    """
+    def __init__(self, resolution=0.0001, limit=0.1, gap=5.0):
+        self.resolution = resolution
+        self.scale = 1.0 / resolution
+        self.buckets = int(round(limit / resolution))
+        self.counts = array("L", [0]) * (self.buckets + 1)
+        # Longer than this between ticks means the server was hibernating or
+        # changing level, not hitching
+        self.gap = gap
+
+        self.last = 0.0
+        self.samples = 0
+        self.max = 0.0
+        self.over_budget = 0
+        self.budget = 0.0
+
+    def reset(self, budget=0.0):
+        for index in range(len(self.counts)):
+            self.counts[index] = 0
+
+        self.last = 0.0
+        self.samples = 0
+        self.max = 0.0
+        self.over_budget = 0
+        self.budget = budget
+
+    def tick(self):
+        now = time.perf_counter()
+        last = self.last
+        self.last = now
+        if last:
+            self.sample(now - last)
+
+    def sample(self, elapsed):
+        if elapsed <= 0 or elapsed > self.gap:
+            return
+
+        index = int(elapsed * self.scale)
+        if index > self.buckets:
+            index = self.buckets
+
+        self.counts[index] += 1
+        self.samples += 1
+        if elapsed > self.max:
+            self.max = elapsed
+        if self.budget and elapsed > self.budget:
+            self.over_budget += 1
+
+    def percentile(self, percent):
+        """
+            Upper edge of the bucket holding the given percentile, in seconds
+        """
+        if self.samples == 0:
+            return 0.0
+
+        target = self.samples * percent / 100.0
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= target:
+                if index == self.buckets:
+                    return self.max
+                return min((index + 1) * self.resolution, self.max)
+
+        return self.max
+
+    def summary(self):
+        return {
+            "ticks": self.samples,
+            "p50_ms": round(self.percentile(50) * 1000, 2),
+            "p95_ms": round(self.percentile(95) * 1000, 2),
+            "p99_ms": round(self.percentile(99) * 1000, 2),
+            "max_ms": round(self.max * 1000, 2),
+            "budget_ms": round(self.budget * 1000, 2),
+            "over_budget": self.over_budget
+        }
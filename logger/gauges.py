@@ -0,0 +1,129 @@
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Source.Python Imports
+from listeners.tick import GameThread
+
+# Core Imports
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+import threading
+import time
+
+# =============================================================================
+# >> GAUGES
+# =============================================================================
+class Gauges(object):
+    """
+        Holds the current value of every server gauge so they can be published
+        as one consistent snapshot instead of a file per value
+    """
+    # name -> (prometheus metric, help text)
+    METRICS = {
+        "players": ("srcds_players", "Human players on red or blu"),
+        "spectators": ("srcds_spectators", "Human players in spectate or unassigned"),
+        "bots": ("srcds_bots", "Bots connected to the server"),
+        "hltv": ("srcds_hltv", "SourceTV clients connected to the server"),
+        "idle": ("srcds_idle_seconds", "Seconds the server has been without players")
+    }
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}
+        self.published = None
+        self.updated = 0
+
+    def set(self, **values):
+        with self.lock:
+            for name, value in values.items():
+                if self.values.get(name) != value:
+                    self.values[name] = value
+                    self.updated = int(time.time())
+
+    def snapshot(self):
+        with self.lock:
+            snapshot = dict(self.values)
+            snapshot["time"] = self.updated
+            return snapshot
+
+    def take_changes(self):
+        """
+            Returns the snapshot if anything changed since it was last taken,
+            otherwise None
+        """
+        with self.lock:
+            values = dict(self.values)
+            if values == self.published:
+                return None
+
+            self.published = values
+            snapshot = dict(values)
+            snapshot["time"] = self.updated
+            return snapshot
+
+    def render_prometheus(self):
+        snapshot = self.snapshot()
+        lines = []
+        for name, (metric, help_text) in self.METRICS.items():
+            if name not in snapshot:
+                continue
+
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {snapshot[name]}")
+
+        if "currentmap" in snapshot:
+            map_name = str(snapshot["currentmap"]).replace("\\", "\\\\").replace("\"", "\\\"")
+            lines.append("# HELP srcds_map_info Map currently loaded on the server")
+            lines.append("# TYPE srcds_map_info gauge")
+            lines.append(f"srcds_map_info{{map=\"{map_name}\"}} 1")
+
+        lines.append("# HELP srcds_gauges_updated_seconds Unix time the gauges last changed")
+        lines.append("# TYPE srcds_gauges_updated_seconds gauge")
+        lines.append(f"srcds_gauges_updated_seconds {snapshot['time']}")
+
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+# =============================================================================
+# >> METRICS ENDPOINT
+# =============================================================================
+class _MetricsHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+
+        body = self.server.gauges.render_prometheus()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Don't spam the server console on every scrape
+        pass
+
+class MetricsServer(object):
+    """
+        Serves the gauges in the Prometheus text exposition format
+        Meant to be bound to localhost for a collector running on the same box
+    """
+    def __init__(self, gauges, address="127.0.0.1", port=9105):
+        self.server = _MetricsHTTPServer((address, port), _MetricsHandler)
+        self.server.gauges = gauges
+        self.thread = None
+
+    def start(self):
+        self.thread = GameThread(target=self.server.serve_forever, name="logger-metrics")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread = None
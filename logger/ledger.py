@@ -0,0 +1,298 @@
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Source.Python Imports
+from listeners.tick import GameThread
+
+# Core Imports
+import sqlite3
+import queue
+import time
+
+# =============================================================================
+# >> SCHEMA
+# =============================================================================
+KIND_SESSION = "session"
+KIND_TEAM = "team"
+KIND_CLASS = "class"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS spans (
+    id INTEGER PRIMARY KEY,
+    steamid TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    value TEXT,
+    started INTEGER NOT NULL,
+    ended INTEGER,
+    seen INTEGER,
+    reason TEXT
+);
+CREATE INDEX IF NOT EXISTS spans_player ON spans (steamid, kind, value);
+CREATE INDEX IF NOT EXISTS spans_open ON spans (steamid) WHERE ended IS NULL;
+"""
+
+CLOSE_SPANS = """
+UPDATE spans SET ended = MAX(started, ?), reason = ?
+WHERE steamid = ? AND ended IS NULL AND kind IN ({kinds})
+"""
+
+# Spans whose disconnect we never saw end when they were last known to be alive
+CLOSE_LOST_SPANS = """
+UPDATE spans SET ended = MAX(started, COALESCE(seen, started)), reason = 'lost'
+WHERE steamid = ? AND ended IS NULL
+"""
+
+OPEN_SPAN = "INSERT INTO spans (steamid, kind, value, started, seen) VALUES (?, ?, ?, ?, ?)"
+
+STOP = object()
+
+# =============================================================================
+# >> SESSION LEDGER
+# =============================================================================
+class SessionLedger(object):
+    """
+        Keeps track of who is connected and since when, and records every
+        session/team/class span to a SQLite database in WAL mode.
+
+        The in-memory state answers disconnect playtime instantly. Database
+        writes are queued and committed in batches from a worker thread. When
+        path is None nothing is persisted.
+    """
+    def __init__(self, path=None, commit_interval=1.0, batch_size=500):
+        self.path = path
+        self.commit_interval = commit_interval
+        self.batch_size = batch_size
+
+        # steamid -> connection time
+        self.sessions = {}
+        # steamid -> current team/class name
+        self.teams = {}
+        self.classes = {}
+
+        self.queue = queue.Queue()
+        self.connection = None
+        self.thread = None
+        self.errors = 0
+
+    def start(self, connected, now=None):
+        """
+            Opens the database and rebuilds the live state from the spans left
+            open by the previous run. connected is the set of steamids on the
+            server right now, anyone else's open spans are closed as lost.
+        """
+        if self.path is None:
+            return
+
+        if now is None:
+            now = int(time.time())
+
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+
+        rows = self.connection.execute(
+            "SELECT steamid, kind, value, started FROM spans WHERE ended IS NULL ORDER BY started"
+        ).fetchall()
+
+        lost = set()
+        for steamid, kind, value, started in rows:
+            if steamid not in connected:
+                lost.add(steamid)
+            elif kind == KIND_SESSION:
+                self.sessions[steamid] = started
+            elif kind == KIND_TEAM:
+                self.teams[steamid] = value
+            elif kind == KIND_CLASS:
+                self.classes[steamid] = value
+
+        for steamid in lost:
+            self.connection.execute(CLOSE_LOST_SPANS, (steamid,))
+
+        # Players that joined while we weren't loaded
+        for steamid in connected:
+            if steamid not in self.sessions:
+                self.sessions[steamid] = now
+                self.connection.execute(OPEN_SPAN, (steamid, KIND_SESSION, None, now, now))
+
+        self.connection.commit()
+
+        self.thread = GameThread(target=self._run, name="logger-ledger")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self, timeout=5):
+        if self.thread is None:
+            return
+
+        self.heartbeat()
+        self.queue.put(STOP)
+        self.thread.join(timeout)
+        self.thread = None
+
+    # =========================================================================
+    # >> EVENTS
+    # =========================================================================
+    def connect(self, steamid, name=None, now=None):
+        if now is None:
+            now = int(time.time())
+
+        self.sessions[steamid] = now
+        self.teams.pop(steamid, None)
+        self.classes.pop(steamid, None)
+        self._queue(CLOSE_LOST_SPANS, (steamid,))
+        self._queue(OPEN_SPAN, (steamid, KIND_SESSION, name, now, now))
+
+    def disconnect(self, steamid, reason=None, now=None):
+        """
+            Closes everything steamid had open
+            Returns the session's playtime in seconds, None if we never saw it start
+        """
+        if now is None:
+            now = int(time.time())
+
+        started = self.sessions.pop(steamid, None)
+        self.teams.pop(steamid, None)
+        self.classes.pop(steamid, None)
+        self._close(steamid, (KIND_SESSION, KIND_TEAM, KIND_CLASS), now, reason)
+
+        if started is None:
+            return None
+        return now - started
+
+    def team(self, steamid, team, now=None):
+        self._change(self.teams, KIND_TEAM, steamid, team, now)
+
+    def player_class(self, steamid, player_class, now=None):
+        self._change(self.classes, KIND_CLASS, steamid, player_class, now)
+
+    def prune(self, connected, now=None):
+        """
+            Drops anyone we think is connected but isn't, their disconnect
+            event went missing
+        """
+        for steamid in [steamid for steamid in self.sessions if steamid not in connected]:
+            self.disconnect(steamid, "missed_disconnect", now)
+
+    def heartbeat(self, now=None):
+        """
+            Marks every open span as still alive, so spans left open by a
+            crash end roughly when the server went down
+        """
+        if now is None:
+            now = int(time.time())
+
+        self._queue("UPDATE spans SET seen = ? WHERE ended IS NULL", (now,))
+
+    def _change(self, current, kind, steamid, value, now):
+        if now is None:
+            now = int(time.time())
+
+        if current.get(steamid) == value:
+            return
+
+        current[steamid] = value
+        self._close(steamid, (kind,), now, "changed")
+        self._queue(OPEN_SPAN, (steamid, kind, value, now, now))
+
+    def _close(self, steamid, kinds, now, reason):
+        query = CLOSE_SPANS.format(kinds=", ".join("?" * len(kinds)))
+        self._queue(query, (now, reason, steamid, *kinds))
+
+    def _queue(self, query, args):
+        if self.thread is not None:
+            self.queue.put((query, args))
+
+    # =========================================================================
+    # >> REPORTS
+    # =========================================================================
+    def _reader(self):
+        connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        connection.execute("PRAGMA query_only=1")
+        return connection
+
+    def totals(self, steamid, now=None):
+        """
+            Returns {kind: {value: (spans, seconds)}} for steamid
+            Open spans count up to now
+        """
+        if now is None:
+            now = int(time.time())
+
+        totals = {}
+        connection = self._reader()
+        try:
+            rows = connection.execute(
+                "SELECT kind, value, COUNT(*), SUM(COALESCE(ended, ?) - started) "
+                "FROM spans WHERE steamid = ? GROUP BY kind, value",
+                (now, steamid)
+            )
+            for kind, value, count, seconds in rows:
+                if kind == KIND_SESSION:
+                    # Sessions store the player name as the value, sum them up
+                    spans, total = totals.setdefault(kind, {}).get(None, (0, 0))
+                    totals[kind][None] = (spans + count, total + seconds)
+                else:
+                    totals.setdefault(kind, {})[value] = (count, seconds)
+        finally:
+            connection.close()
+
+        return totals
+
+    def top(self, limit=10, since=0, now=None):
+        """
+            Returns [(steamid, seconds)] for the players with the most playtime
+        """
+        if now is None:
+            now = int(time.time())
+
+        connection = self._reader()
+        try:
+            return connection.execute(
+                "SELECT steamid, SUM(COALESCE(ended, ?) - started) AS total FROM spans "
+                "WHERE kind = ? AND started >= ? GROUP BY steamid ORDER BY total DESC LIMIT ?",
+                (now, KIND_SESSION, since, limit)
+            ).fetchall()
+        finally:
+            connection.close()
+
+    # =========================================================================
+    # >> WORKER THREAD
+    # =========================================================================
+    def _run(self):
+        pending = 0
+        last_commit = time.monotonic()
+
+        while True:
+            timeout = None
+            if pending:
+                timeout = max(0, self.commit_interval - (time.monotonic() - last_commit))
+
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is not None and item is not STOP:
+                try:
+                    self.connection.execute(*item)
+                    pending += 1
+                except sqlite3.Error as e:
+                    print(f"Logger: session ledger write failed: {e}")
+                    self.errors += 1
+
+            elapsed = time.monotonic() - last_commit
+            if pending and (item is None or item is STOP or pending >= self.batch_size or elapsed >= self.commit_interval):
+                try:
+                    self.connection.commit()
+                except sqlite3.Error as e:
+                    print(f"Logger: session ledger commit failed: {e}")
+                    self.errors += 1
+                pending = 0
+                last_commit = time.monotonic()
+
+            if item is STOP:
+                break
+
+        self.connection.close()
+        self.connection = None
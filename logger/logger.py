@@ -2,12 +2,15 @@
 # >> IMPORTS
 # =============================================================================
 # Source.Python Imports
+from commands.typed import TypedServerCommand
+from cvars import ConVar
 from events import Event
-from engines.server import global_vars
+from engines.server import global_vars, engine_server
 from listeners import *
 from listeners.tick import Repeat
 from listeners.tick import GameThread
 from messages.hooks import HookUserMessage
+from net_channel import NetFlow
 from players.entity import Player
 from paths import LOG_PATH
 from filters.players import PlayerIter
@@ -15,24 +18,243 @@ from filters.players import PlayerIter
 # Core Imports
 import time
 import os.path
-import json
+
+# Plugin Imports
+from .writer import LogWriter, FileSink, JsonCodec, LEGACY_GAUGES, OVERFLOW_POLICIES, OVERFLOW_DROP_OLDEST
+from .writer import LogRotator, ROTATE_POLICIES, ROTATE_NONE, ROTATE_MAP, COMPRESSORS, COMPRESS_NONE, COMPRESS_GZIP
+from .sinks import DatagramSink, PROTOCOLS, PROTOCOL_INFLUX
+from .binlog import BinaryCodec
+from .gauges import Gauges, MetricsServer
+from .census import PlayerCensus, KIND_HUMAN, KIND_BOT, KIND_HLTV
+from .ledger import SessionLedger, KIND_SESSION
+from .frametime import FrameTimeHistogram
+from .netstats import NetStatsSampler
+from .logindex import query as query_log, log_files, parse_time
+from .chatindex import ChatIndex, search as search_chat_index
+from .chatlimit import ChatLimiter, ALLOW, REPEAT, MUTE
 
 # =============================================================================
-# >> IMPORTS
+# >> GLOBAL VARIABLES
 # =============================================================================
 CURRENT_MAP_START = 0
-CONNECTED_PLAYERS = {}
-SERVER_IDLE_START = -1
-SERVER_IDLE_DURATION = 0
+LEDGER = SessionLedger()
+FRAME_TIMES = FrameTimeHistogram()
+NETSTATS = None
+CHAT_LIMITER = ChatLimiter(rate=0)
+CHAT_INDEX = None
+CENSUS = PlayerCensus()
 LOG_PLAYERS_LOOP = None
+LOG_PLAYERS_INTERVAL = 0
+LOG_WRITER = None
+GAUGES = Gauges()
+METRICS_SERVER = None
+
+# ConVars
+CVAR_QUEUE_SIZE = None
+CVAR_BATCH_SIZE = None
+CVAR_FLUSH_INTERVAL = None
+CVAR_FSYNC = None
+CVAR_OVERFLOW = None
+CVAR_ROTATE = None
+CVAR_ROTATE_SIZE = None
+CVAR_COMPRESS = None
+CVAR_KEEP = None
+CVAR_FILE = None
+CVAR_GAUGE_FILES = None
+CVAR_FILE_FORMAT = None
+CVAR_INDEX_SECONDS = None
+CVAR_DATAGRAM = None
+CVAR_DATAGRAM_PROTOCOL = None
+CVAR_DATAGRAM_MTU = None
+CVAR_METRICS_ADDRESS = None
+CVAR_METRICS_PORT = None
+CVAR_CENSUS_RECONCILE = None
+CVAR_LEDGER = None
+CVAR_TICK_BUDGET = None
+CVAR_NETSTATS_INTERVAL = None
+CVAR_CHAT_RATE = None
+CVAR_CHAT_BURST = None
+CVAR_CHAT_MUTE_STRIKES = None
+CVAR_CHAT_INDEX = None
+CVAR_EMPTY_INTERVAL = None
 
 # =============================================================================
 # >> ON LOAD
 # =============================================================================
 def load():
     global LOG_PLAYERS_LOOP
+    global LOG_PLAYERS_INTERVAL
+    global LOG_WRITER
+    global CVAR_QUEUE_SIZE
+    global CVAR_BATCH_SIZE
+    global CVAR_FLUSH_INTERVAL
+    global CVAR_FSYNC
+    global CVAR_OVERFLOW
+    global CVAR_ROTATE
+    global CVAR_ROTATE_SIZE
+    global CVAR_COMPRESS
+    global CVAR_KEEP
+    global CVAR_FILE
+    global CVAR_GAUGE_FILES
+    global CVAR_FILE_FORMAT
+    global CVAR_INDEX_SECONDS
+    global CVAR_DATAGRAM
+    global CVAR_DATAGRAM_PROTOCOL
+    global CVAR_DATAGRAM_MTU
+    global CVAR_METRICS_ADDRESS
+    global CVAR_METRICS_PORT
+    global METRICS_SERVER
+    global CVAR_CENSUS_RECONCILE
+    global CVAR_EMPTY_INTERVAL
+    global CVAR_LEDGER
+    global CVAR_TICK_BUDGET
+    global CVAR_NETSTATS_INTERVAL
+    global NETSTATS
+    global CVAR_CHAT_RATE
+    global CVAR_CHAT_BURST
+    global CVAR_CHAT_MUTE_STRIKES
+    global CHAT_LIMITER
+    global CVAR_CHAT_INDEX
+    global CHAT_INDEX
+    global LEDGER
+
+    CVAR_QUEUE_SIZE = ConVar("sp_logger_queue_size", "10000", description="Max events held in memory waiting to be written")
+    CVAR_BATCH_SIZE = ConVar("sp_logger_batch_size", "256", description="Flush the log files after this many events")
+    CVAR_FLUSH_INTERVAL = ConVar("sp_logger_flush_interval", "1.0", description="Flush the log files at least this often (seconds)")
+    CVAR_FSYNC = ConVar("sp_logger_fsync", "0", description="fsync the log files after every flush")
+    CVAR_OVERFLOW = ConVar("sp_logger_overflow", OVERFLOW_DROP_OLDEST, description="What to do when the queue is full: " + ", ".join(OVERFLOW_POLICIES))
+
+    CVAR_ROTATE = ConVar("sp_logger_rotate", ROTATE_NONE, description="When to rotate the log files: " + ", ".join(ROTATE_POLICIES))
+    CVAR_ROTATE_SIZE = ConVar("sp_logger_rotate_size", "64", description="Rotate log files larger than this many MB (sp_logger_rotate size)")
+    CVAR_COMPRESS = ConVar("sp_logger_compress", COMPRESS_GZIP, description="Compression for rotated log files: " + ", ".join((COMPRESS_NONE, *COMPRESSORS)))
+    CVAR_KEEP = ConVar("sp_logger_keep", "14", description="Rotated segments to keep per log file, 0 keeps everything")
+    CVAR_FILE = ConVar("sp_logger_file", "1", description="Write events as JSON lines under the logs directory")
+    CVAR_GAUGE_FILES = ConVar("sp_logger_gauge_files", "1", description="Besides gauges.json, keep writing idle, players, bots, spectators and currentmap as a file each")
+    CVAR_FILE_FORMAT = ConVar("sp_logger_file_format", "json", description="Log file format: json (.log) or binary (.blog, see binlog.py)")
+    CVAR_INDEX_SECONDS = ConVar("sp_logger_index_seconds", "300", description="Seconds of events per sparse index block for JSON log files, 0 disables the index")
+    CVAR_DATAGRAM = ConVar("sp_logger_datagram", "", description="Comma separated collectors to send events to, e.g. udp://127.0.0.1:8089 or unix:///run/telegraf.sock")
+    CVAR_DATAGRAM_PROTOCOL = ConVar("sp_logger_datagram_protocol", PROTOCOL_INFLUX, description="Datagram payload format: " + ", ".join(PROTOCOLS))
+    CVAR_DATAGRAM_MTU = ConVar("sp_logger_datagram_mtu", "1400", description="Max bytes per datagram")
+    CVAR_METRICS_ADDRESS = ConVar("sp_logger_metrics_address", "127.0.0.1", description="Address the gauge scrape endpoint listens on")
+    CVAR_METRICS_PORT = ConVar("sp_logger_metrics_port", "0", description="Port for the Prometheus style gauge endpoint, 0 disables it")
+    CVAR_CENSUS_RECONCILE = ConVar("sp_logger_census_reconcile", "60", description="Seconds between full player scans that correct the player counts")
+    CVAR_EMPTY_INTERVAL = ConVar("sp_logger_empty_interval", "30", description="Seconds between player gauge updates while no humans are connected")
+    CVAR_LEDGER = ConVar("sp_logger_ledger", "sessions.db", description="SQLite file under the logs directory for the playtime ledger, empty disables it")
+    CVAR_TICK_BUDGET = ConVar("sp_logger_tick_budget", "1.5", description="Ticks taking longer than this many tick intervals count as over budget")
+    CVAR_NETSTATS_INTERVAL = ConVar("sp_logger_netstats_interval", "2", description="Seconds between network quality samples of each player")
+    CVAR_CHAT_RATE = ConVar("sp_logger_chat_rate", "1", description="Chat messages per second a player may sustain, 0 disables flood control")
+    CVAR_CHAT_BURST = ConVar("sp_logger_chat_burst", "5", description="Chat messages a player may send in a burst")
+    CVAR_CHAT_MUTE_STRIKES = ConVar("sp_logger_chat_mute_strikes", "3", description="Mute players who flood chat this many times within a minute, 0 never mutes")
+    CVAR_CHAT_INDEX = ConVar("sp_logger_chat_index", "1", description="Keep a searchable word index of chat.log, see sp_logger_chat_search")
+
+    overflow = CVAR_OVERFLOW.get_string()
+    if overflow not in OVERFLOW_POLICIES:
+        print(f"Logger: unknown overflow policy \"{overflow}\", using {OVERFLOW_DROP_OLDEST}")
+        overflow = OVERFLOW_DROP_OLDEST
+
+    rotator = None
+    rotate = CVAR_ROTATE.get_string()
+    compress = CVAR_COMPRESS.get_string()
+    if compress != COMPRESS_NONE and compress not in COMPRESSORS:
+        print(f"Logger: unknown compression \"{compress}\", using {COMPRESS_GZIP}")
+        compress = COMPRESS_GZIP
+
+    if rotate not in ROTATE_POLICIES:
+        print(f"Logger: unknown rotation policy \"{rotate}\", not rotating")
+    elif rotate != ROTATE_NONE:
+        rotator = LogRotator(
+            mode=rotate,
+            max_bytes=CVAR_ROTATE_SIZE.get_float() * 1024 * 1024,
+            compress=compress,
+            keep=CVAR_KEEP.get_int()
+        )
+
+    sinks = []
+    if CVAR_FILE.get_bool():
+        codec = BinaryCodec if CVAR_FILE_FORMAT.get_string() == "binary" else JsonCodec
+        indexers = {}
+        if CVAR_CHAT_INDEX.get_bool() and codec is JsonCodec:
+            try:
+                CHAT_INDEX = ChatIndex(LOG_PATH)
+                CHAT_INDEX.start()
+                indexers["chat.log"] = CHAT_INDEX
+            except OSError as e:
+                print(f"Logger: could not open the chat index: {e}")
+                CHAT_INDEX = None
+
+        sinks.append(FileSink(
+            LOG_PATH,
+            fsync=CVAR_FSYNC.get_bool(),
+            rotator=rotator,
+            codec=codec,
+            index_seconds=CVAR_INDEX_SECONDS.get_int(),
+            indexers=indexers,
+            legacy_gauges=LEGACY_GAUGES if CVAR_GAUGE_FILES.get_bool() else ()
+        ))
+
+    protocol = CVAR_DATAGRAM_PROTOCOL.get_string()
+    for address in filter(None, map(str.strip, CVAR_DATAGRAM.get_string().split(","))):
+        try:
+            sinks.append(DatagramSink(address, protocol=protocol, mtu=CVAR_DATAGRAM_MTU.get_int()))
+        except (ValueError, OSError) as e:
+            print(f"Logger: can't send events to {address}: {e}")
+
+    LOG_WRITER = LogWriter(
+        sinks,
+        queue_size=CVAR_QUEUE_SIZE.get_int(),
+        batch_size=CVAR_BATCH_SIZE.get_int(),
+        flush_interval=CVAR_FLUSH_INTERVAL.get_float(),
+        overflow=overflow
+    )
+    LOG_WRITER.start()
+
+    if CVAR_METRICS_PORT.get_int() > 0:
+        try:
+            METRICS_SERVER = MetricsServer(GAUGES, CVAR_METRICS_ADDRESS.get_string(), CVAR_METRICS_PORT.get_int())
+            METRICS_SERVER.start()
+        except OSError as e:
+            print(f"Logger: could not start metrics endpoint: {e}")
+            METRICS_SERVER = None
+
+    ledger_path = CVAR_LEDGER.get_string()
+    LEDGER = SessionLedger(os.path.join(LOG_PATH, ledger_path) if ledger_path else None)
+    try:
+        LEDGER.start({player.steamid for player in PlayerIter("human")})
+    except Exception as e:
+        print(f"Logger: could not open the session ledger: {e}")
+        LEDGER = SessionLedger()
+
+    reset_frame_times()
+
+    CHAT_LIMITER = ChatLimiter(
+        rate=CVAR_CHAT_RATE.get_float(),
+        burst=max(1, CVAR_CHAT_BURST.get_int()),
+        strikes=CVAR_CHAT_MUTE_STRIKES.get_int()
+    )
+
+    NETSTATS = NetStatsSampler(read_net_info, interval=CVAR_NETSTATS_INTERVAL.get_float())
+    for player in PlayerIter("human"):
+        NETSTATS.activate(player.index)
+
+    LOG_PLAYERS_INTERVAL = 5
     LOG_PLAYERS_LOOP = Repeat(log_players)
-    LOG_PLAYERS_LOOP.start(5, execute_on_start=True)
+    LOG_PLAYERS_LOOP.start(LOG_PLAYERS_INTERVAL, execute_on_start=True)
+
+def unload():
+    if LOG_PLAYERS_LOOP is not None:
+        LOG_PLAYERS_LOOP.stop()
+
+    if METRICS_SERVER is not None:
+        METRICS_SERVER.stop()
+
+    LEDGER.stop()
+
+    if LOG_WRITER is not None:
+        LOG_WRITER.stop()
+
+    # After the writer, which hands it its last batch on the way out
+    if CHAT_INDEX is not None:
+        CHAT_INDEX.stop()
 
 # =============================================================================
 # >> UTILITY FUNCTIONS
@@ -43,14 +265,32 @@ def threaded(fn):
         thread.daemon = True
         thread.start()
     return wrapper
-    
-@threaded
-def log_value(logfile, value):
-    with open(os.path.join(LOG_PATH, logfile), "w") as file:
-        file.truncate()
-        file.write(str(value))
 
-@threaded
+def read_net_info(index):
+    info = engine_server.get_player_net_info(index)
+    if info is None:
+        return None
+
+    return (
+        info.get_avg_latency(NetFlow.OUTGOING) * 1000,
+        info.get_avg_loss(NetFlow.INCOMING),
+        info.get_avg_choke(NetFlow.OUTGOING)
+    )
+
+def reset_frame_times():
+    FRAME_TIMES.reset(global_vars.interval_per_tick * CVAR_TICK_BUDGET.get_float())
+
+def readable_duration(seconds):
+    hours, seconds = divmod(int(seconds), 3600)
+    minutes, seconds = divmod(seconds, 60)
+    return f"{hours}h {minutes:02}m {seconds:02}s"
+
+def publish_gauges():
+    # All gauges go out as one snapshot, and only when one of them changed
+    snapshot = GAUGES.take_changes()
+    if snapshot is not None:
+        LOG_WRITER.gauges(snapshot)
+
 def log_json(event_name, event_data, logfile="event.log"):
     timestamp = int(time.time())
 
@@ -59,9 +299,139 @@ def log_json(event_name, event_data, logfile="event.log"):
         "event_name": event_name,
         "event": event_data
     }
-    with open(os.path.join(LOG_PATH, logfile), "a") as file:
-        file.write(json.dumps(message))
-        file.write("\n")
+    LOG_WRITER.put(logfile, message)
+
+# =============================================================================
+# >> COMMANDS
+# =============================================================================
+@TypedServerCommand("sp_logger_status")
+def on_logger_status(command_info):
+    if LOG_WRITER is None:
+        print("Logger: writer not running")
+        return
+
+    stats = LOG_WRITER.stats()
+    print("Logger: " + ", ".join(f"{key}={value}" for key, value in stats.items()))
+
+    players, spectators, bots, hltv = CENSUS.counts()
+    print(f"Logger: players={players}, spectators={spectators}, bots={bots}, hltv={hltv}, drift={CENSUS.drift}, interval={LOG_PLAYERS_INTERVAL}")
+
+@TypedServerCommand("sp_logger_netstats")
+def on_logger_netstats(command_info):
+    if NETSTATS is None or not NETSTATS.active:
+        print("Logger: no players are being sampled")
+        return
+
+    for slot in sorted(NETSTATS.active):
+        summary = NETSTATS.summary(slot)
+        name = Player(slot).name
+        if summary is None:
+            print(f"{name}: no samples yet")
+            continue
+
+        latency, loss, choke = summary["latency"], summary["loss"], summary["choke"]
+        print(
+            f"{name}: latency {latency['avg']:.0f}ms (min {latency['min']:.0f}, p95 {latency['p95']:.0f}), "
+            f"loss {loss['avg'] * 100:.1f}% (p95 {loss['p95'] * 100:.1f}%), "
+            f"choke {choke['avg'] * 100:.1f}% (p95 {choke['p95'] * 100:.1f}%) "
+            f"over {summary['samples']} samples"
+        )
+
+@TypedServerCommand("sp_logger_query")
+def on_logger_query(command_info, steamid: str, since: str="", until: str="", limit: int=50):
+    """
+        Prints the events of a steamid ("-" for anyone) between two times
+        Times are unix timestamps or ISO dates, e.g. 2026-10-13 or 2026-10-13T18:00
+    """
+    try:
+        since, until = parse_time(since), parse_time(until)
+    except ValueError as e:
+        print(f"Logger: {e}")
+        return
+
+    search_logs(None if steamid == "-" else steamid, since, until, limit)
+
+@threaded
+def search_logs(steamid, since, until, limit):
+    remaining = limit
+    for logfile in ("event.log", "connect.log", "chat.log"):
+        for path in log_files(LOG_PATH, logfile):
+            for line in query_log(path, steamid, since, until, remaining):
+                print(line)
+                remaining -= 1
+
+            if remaining <= 0:
+                print(f"Logger: stopped after {limit} events")
+                return
+
+@TypedServerCommand("sp_logger_chat_search")
+def on_logger_chat_search(command_info, words: str, steamid: str="-", since: str="", until: str="", limit: int=50):
+    """
+        Prints the newest chat lines containing every word, e.g. "cheat* aimbot"
+        A trailing * matches prefixes, "-" as steamid matches anyone
+    """
+    if CHAT_INDEX is None:
+        print("Logger: the chat index is disabled (sp_logger_chat_index)")
+        return
+
+    try:
+        since, until = parse_time(since), parse_time(until)
+    except ValueError as e:
+        print(f"Logger: {e}")
+        return
+
+    search_chat(words.split(), None if steamid == "-" else steamid, since, until, limit)
+
+@threaded
+def search_chat(words, steamid, since, until, limit):
+    started = time.perf_counter()
+    try:
+        lines = search_chat_index(LOG_PATH, words, steamid, since, until, limit)
+    except (OSError, ValueError) as e:
+        print(f"Logger: chat search failed: {e}")
+        return
+
+    for line in lines:
+        print(line)
+    print(f"Logger: {len(lines)} chat lines in {(time.perf_counter() - started) * 1000:.1f}ms")
+
+@TypedServerCommand("sp_logger_playtime")
+def on_logger_playtime(command_info, steamid: str):
+    report_playtime(steamid)
+
+@TypedServerCommand("sp_logger_playtime_top")
+def on_logger_playtime_top(command_info, limit: int=10, days: int=0):
+    report_playtime_top(limit, days)
+
+@threaded
+def report_playtime(steamid):
+    if LEDGER.path is None:
+        print("Logger: the session ledger is disabled")
+        return
+
+    totals = LEDGER.totals(steamid)
+    if not totals:
+        print(f"Logger: no sessions recorded for {steamid}")
+        return
+
+    spans, seconds = totals[KIND_SESSION].get(None, (0, 0)) if KIND_SESSION in totals else (0, 0)
+    print(f"Logger: {steamid} played {readable_duration(seconds)} over {spans} sessions")
+    for kind, values in sorted(totals.items()):
+        if kind == KIND_SESSION:
+            continue
+
+        for value, (spans, seconds) in sorted(values.items(), key=lambda item: -item[1][1]):
+            print(f"  {kind} {value}: {readable_duration(seconds)}")
+
+@threaded
+def report_playtime_top(limit, days):
+    if LEDGER.path is None:
+        print("Logger: the session ledger is disabled")
+        return
+
+    since = int(time.time()) - days * 86400 if days > 0 else 0
+    for rank, (steamid, seconds) in enumerate(LEDGER.top(limit, since), 1):
+        print(f"{rank:>3}. {steamid} {readable_duration(seconds)}")
 
 # =============================================================================
 # >> EVENT HANDLERS
@@ -70,8 +440,15 @@ def log_json(event_name, event_data, logfile="event.log"):
 def log_level_init(map_name):
     global CURRENT_MAP_START
     CURRENT_MAP_START = int(time.time())
+
+    # Rotate first so each map starts in a fresh segment
+    if CVAR_ROTATE.get_string() == ROTATE_MAP:
+        LOG_WRITER.rotate()
+
     log_json("level_init", {"level_name": global_vars.map_name})
-    log_value("currentmap", global_vars.map_name)
+    reset_frame_times()
+    GAUGES.set(currentmap=global_vars.map_name)
+    publish_gauges()
 
 @OnLevelEnd
 def log_level_end():
@@ -84,10 +461,24 @@ def log_level_end():
     message = {"level_duration": elapsed, "level_name": global_vars.map_name}
     log_json("level_end", message)
 
+    if FRAME_TIMES.samples:
+        message = FRAME_TIMES.summary()
+        message["level_name"] = global_vars.map_name
+        log_json("level_frametime", message)
+        reset_frame_times()
+
+@OnTick
+def sample_frame_time():
+    FRAME_TIMES.tick()
+    if NETSTATS is not None:
+        NETSTATS.tick()
+
 @Event("player_connect")
 def log_player_connect(event):
     args = event.variables.as_dict()
-    log_players()
+    CENSUS.connect(args['userid'], KIND_BOT if bool(args['bot']) else KIND_HUMAN)
+    update_players()
+
     message = {
         "player": {
             "bot": bool(args['bot']),
@@ -99,16 +490,16 @@ def log_player_connect(event):
     }
     log_json("player_connect", message, logfile="connect.log")
 
-    global CONNECTED_PLAYERS
-    CONNECTED_PLAYERS[args['networkid']] = {
-        "connection_time": int(time.time())
-    }
+    if not bool(args['bot']):
+        LEDGER.connect(args['networkid'], args['name'])
 
 @Event("player_disconnect")
 def log_player_disconnect(event):
     args = event.variables.as_dict()
     player = Player.from_userid(args['userid'])
-    log_players()
+    CENSUS.disconnect(args['userid'])
+    update_players()
+
     message = {
         "player": {
             "name": player.name,
@@ -117,16 +508,23 @@ def log_player_disconnect(event):
         }
     }
 
-    global CONNECTED_PLAYERS
-    try:
-        connection_time = CONNECTED_PLAYERS.pop(player.steamid)['connection_time']
-        total_playtime = int(time.time()) - connection_time
+    playtime = LEDGER.disconnect(player.steamid, args['reason'])
+    if playtime is not None:
+        message.update({"playtime": playtime})
+
+    network = NETSTATS.deactivate(player.index) if NETSTATS is not None else None
+    if network is not None:
+        message.update({"network": network})
 
-        message.update({"playtime": total_playtime})
-    except KeyError:
-        pass
-    finally:
-        log_json("player_disconnect", message)
+    log_json("player_disconnect", message)
+
+@Event("player_activate")
+def sample_player_network(event):
+    args = event.variables.as_dict()
+    player = Player.from_userid(args['userid'])
+    CHAT_LIMITER.reset(player.index)
+    if NETSTATS is not None and not player.is_fake_client():
+        NETSTATS.activate(player.index)
 
 @Event("server_addban")
 def log_player_ban(event):
@@ -172,6 +570,16 @@ def log_chat(recipients, data):
     if data.param2 == "":
         return True
 
+    # Floods are dropped before they cost a Player lookup, a log line or a relay
+    verdict = CHAT_LIMITER.check(data.index, data.param2, global_vars.tick_count)
+    if verdict == REPEAT:
+        return True
+    elif verdict == MUTE:
+        mute_flooder(data.index)
+        return False
+    elif verdict != ALLOW:
+        return False
+
     player = Player(data.index)
     teams = ["unassigned", "spectate", "red", "blue"]
 
@@ -190,6 +598,35 @@ def log_chat(recipients, data):
     log_json("player_chat", message, logfile="chat.log")
     return True
 
+def mute_flooder(index):
+    player = Player(index)
+    player.mute()
+    message = {
+        "player": {
+            "steamid": player.steamid,
+            "name": player.name
+        },
+        "strikes": CHAT_LIMITER.strikes
+    }
+    log_json("player_chat_muted", message, logfile="chat.log")
+
+def log_chat_floods():
+    # One line per flooding player per loop, not one per dropped message
+    for index, dropped in CHAT_LIMITER.drain_drops():
+        try:
+            player = Player(index)
+        except ValueError:
+            continue
+
+        message = {
+            "dropped": dropped,
+            "player": {
+                "steamid": player.steamid,
+                "name": player.name
+            }
+        }
+        log_json("player_chat_flood", message, logfile="chat.log")
+
 @Event("player_changeclass")
 def log_class_change(event):
     args = event.variables.as_dict()
@@ -209,57 +646,81 @@ def log_class_change(event):
     }
     log_json("player_change_class", message)
 
+    if not player.is_bot():
+        LEDGER.player_class(player.steamid, classes[args['class']-1])
+
 @Event("player_team")
 def log_team_change(event):
     args = event.variables.as_dict()
     player = Player.from_userid(args['userid'])
     teams = ["unassigned", "spectate", "red", "blue"]
-    log_players()
     if bool(args['disconnect']):
         return
-    else:
-        message = {
-            "autoassigned": bool(args['autoteam']),
-            "oldteam": args['oldteam'],
-            "oldteam_name": teams[args['oldteam']-1],
-            "player": {
-                "steamid": player.steamid,
-                "name": player.name,
-                "team": player.team,
-                "team_name": teams[player.team-1]
-            }
+
+    kind = player_kind(player)
+    CENSUS.change(args['userid'], kind=kind, team=args['team'])
+    update_players()
+
+    if kind == KIND_HUMAN:
+        LEDGER.team(player.steamid, teams[args['team']])
+
+    message = {
+        "autoassigned": bool(args['autoteam']),
+        "oldteam": args['oldteam'],
+        "oldteam_name": teams[args['oldteam']-1],
+        "player": {
+            "steamid": player.steamid,
+            "name": player.name,
+            "team": player.team,
+            "team_name": teams[player.team-1]
         }
-        log_json("player_change_team", message)
+    }
+    log_json("player_change_team", message)
 
-@threaded
+# =============================================================================
+# >> PLAYER CENSUS
+# =============================================================================
 def log_players():
-    players = bots = spectators = 0
+    # Counts are kept up to date by the events, this only corrects drift
+    if time.time() - CENSUS.reconciled >= CVAR_CENSUS_RECONCILE.get_float():
+        listing = [(player.userid, player_kind(player), player.team, player.steamid) for player in PlayerIter()]
+        CENSUS.reconcile(entry[:3] for entry in listing)
+
+        # Same goes for the sessions, and keep the ledger's open spans alive
+        LEDGER.prune({steamid for _, kind, _, steamid in listing if kind == KIND_HUMAN})
+        LEDGER.heartbeat()
+
+    update_players()
+    log_chat_floods()
+
+def player_kind(player):
+    if player.is_hltv():
+        return KIND_HLTV
+    if player.is_bot():
+        return KIND_BOT
+    return KIND_HUMAN
+
+def update_players():
+    CENSUS.update_idle()
+    players, spectators, bots, hltv = CENSUS.counts()
+    GAUGES.set(idle=int(CENSUS.idle_duration), players=players, bots=bots, spectators=spectators, hltv=hltv)
+    publish_gauges()
+    schedule_log_players()
+
+def schedule_log_players():
+    """
+        Checks the player counts every 5 seconds while people are around and
+        backs off while the server is empty
+    """
+    global LOG_PLAYERS_INTERVAL
+
+    if LOG_PLAYERS_LOOP is None:
+        return
 
-    for player in PlayerIter():
-        if player.is_hltv():
-            continue
+    interval = 5 if CENSUS.humans > 0 else max(5, CVAR_EMPTY_INTERVAL.get_float())
+    if interval == LOG_PLAYERS_INTERVAL:
+        return
 
-        if player.is_bot():
-            bots += 1
-            continue
-        elif player.team == 1 or player.team == 0 and not player.is_bot():
-            spectators += 1
-            continue
-        elif not player.is_bot():
-            players += 1
-
-    global SERVER_IDLE_START
-    global SERVER_IDLE_DURATION
-    if players >= 1:
-        SERVER_IDLE_START = -1
-        SERVER_IDLE_DURATION = 0
-    elif players == 0 and spectators < 4 and SERVER_IDLE_START == -1:
-        SERVER_IDLE_START = time.time()
-        SERVER_IDLE_DURATION = 0
-    elif players == 0 and spectators < 4 and SERVER_IDLE_START >= 0:
-        SERVER_IDLE_DURATION = time.time() - SERVER_IDLE_START
-
-    log_value("idle", SERVER_IDLE_DURATION)
-    log_value("players", players)
-    log_value("bots", bots)
-    log_value("spectators", spectators)
+    LOG_PLAYERS_INTERVAL = interval
+    LOG_PLAYERS_LOOP.stop()
+    LOG_PLAYERS_LOOP.start(interval)
@@ -0,0 +1,401 @@
+"""
+    Sparse time and SteamID index for the logger's JSON line files
+
+    Every log file gets a sidecar <file>.idx holding one line per block of the
+    log: its byte range, first/last event time and the SteamIDs in it.
+
+        B <start> <end> <first time> <last time> <steamid,steamid,...>
+
+    The logger appends a block whenever it has written block_seconds or
+    block_bytes worth of events. Queries only read the blocks that can match.
+    Parts of a log with no block (the index was missing, or the logger wasn't
+    indexing) are scanned directly and their blocks appended to the index,
+    so a missing index rebuilds itself bit by bit.
+
+    This module only uses the standard library so it can be run on its own:
+
+        python logindex.py query event.log* --steamid "[U:1:1234]" --since "2026-10-13"
+        python logindex.py rebuild event.log
+"""
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Core Imports
+from datetime import datetime
+import argparse
+import gzip
+import lzma
+import sys
+import os
+import re
+
+# =============================================================================
+# >> FORMAT
+# =============================================================================
+INDEX_SUFFIX = ".idx"
+COMPRESSED_SUFFIXES = {".gz": gzip.open, ".xz": lzma.open}
+
+# Rotated segments are named <logfile>.<YYYYmmdd-HHMMSS>[-n][.gz|.xz] and
+# never get written to again, so every gap in them can be indexed
+SEGMENT_PATTERN = re.compile(r"\.(\d{8}-\d{6})(?:-(\d+))?(\.gz|\.xz)?$")
+
+STEAMID_PATTERN = re.compile(rb'"steamid": "([^"]+)"')
+TIME_PATTERN = re.compile(rb'^\{"time": (\d+)')
+
+READ_SIZE = 1024 * 1024
+
+def index_path(path):
+    """
+        event.log.20261018-120000.gz and the uncompressed segment share an index
+    """
+    base, extension = os.path.splitext(path)
+    if extension in COMPRESSED_SUFFIXES:
+        path = base
+    return path + INDEX_SUFFIX
+
+def segment_key(path):
+    """
+        (stamp, n) of a rotated segment, what sorts them oldest first.
+        Comparing names would put <stamp>-1.gz before <stamp>.gz
+    """
+    match = SEGMENT_PATTERN.search(path)
+    return match.group(1), int(match.group(2) or 0)
+
+def open_log(path):
+    opener = COMPRESSED_SUFFIXES.get(os.path.splitext(path)[1], open)
+    return opener(path, "rb")
+
+def log_size(path):
+    """
+        Size of the uncompressed content
+    """
+    if os.path.splitext(path)[1] not in COMPRESSED_SUFFIXES:
+        return os.path.getsize(path)
+
+    with open_log(path) as file:
+        return file.seek(0, os.SEEK_END)
+
+def steamids_in(value):
+    """
+        Every "steamid" in a logger record, however deeply nested
+    """
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key == "steamid" and isinstance(item, str):
+                yield item
+            elif isinstance(item, (dict, list)):
+                yield from steamids_in(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from steamids_in(item)
+
+def format_block(start, end, first, last, steamids):
+    steamids = ",".join(sorted(steamid for steamid in steamids if steamid and steamid != "BOT"))
+    return f"B\t{start}\t{end}\t{first}\t{last}\t{steamids}\n"
+
+def load_blocks(path):
+    """
+        Returns the blocks of an index sorted by offset as
+        (start, end, first time, last time, frozenset of steamids)
+    """
+    blocks = []
+    try:
+        with open(path) as file:
+            for line in file:
+                parts = line.rstrip("\n").split("\t")
+                if len(parts) != 6 or parts[0] != "B":
+                    # Half written line from a crash
+                    continue
+
+                steamids = frozenset(parts[5].split(",")) if parts[5] else frozenset()
+                blocks.append((int(parts[1]), int(parts[2]), int(parts[3]), int(parts[4]), steamids))
+    except FileNotFoundError:
+        pass
+
+    blocks.sort()
+    # Drop anything overlapping a block we already have
+    unique = []
+    for block in blocks:
+        if not unique or block[0] >= unique[-1][1]:
+            unique.append(block)
+    return unique
+
+# =============================================================================
+# >> INDEX WRITER
+# =============================================================================
+class LogIndexer(object):
+    """
+        Builds the index of a log file as the logger writes it
+        Only one is ever open per log file, owned by the writer thread
+    """
+    def __init__(self, path, block_seconds=300, block_bytes=READ_SIZE):
+        self.path = path
+        self.block_seconds = block_seconds
+        self.block_bytes = block_bytes
+        self._reset(0)
+
+    def _reset(self, offset):
+        self.start = self.end = offset
+        self.first = self.last = None
+        self.steamids = set()
+
+    def open(self, offset):
+        self._reset(offset)
+
+    def add(self, offset, length, record):
+        if offset != self.end:
+            # Something else wrote to the file, start a fresh block
+            self.close()
+            self._reset(offset)
+
+        timestamp = record.get("time", 0)
+        if self.first is None:
+            self.first = timestamp
+        self.last = max(self.last or timestamp, timestamp)
+        self.steamids.update(steamids_in(record.get("event")))
+        self.end = offset + length
+
+        if self.end - self.start >= self.block_bytes or self.last - self.first >= self.block_seconds:
+            self.close()
+
+    def close(self):
+        if self.end > self.start and self.first is not None:
+            with open(self.path, "a") as file:
+                file.write(format_block(self.start, self.end, self.first, self.last, self.steamids))
+
+        self._reset(self.end)
+
+    def rotated(self, target):
+        """
+            The log was renamed to target, take the index with it
+        """
+        self.close()
+        try:
+            os.rename(self.path, index_path(target))
+        except FileNotFoundError:
+            pass
+        self._reset(0)
+
+# =============================================================================
+# >> QUERIES
+# =============================================================================
+def scan_lines(file, start, end, seek=True):
+    """
+        Yields (offset, line) for every complete line in [start, end)
+        Without seek, file has to be at start already
+    """
+    if seek:
+        file.seek(start)
+    offset = start
+    remainder = b""
+    while offset + len(remainder) < end:
+        chunk = file.read(min(READ_SIZE, end - offset - len(remainder)))
+        if not chunk:
+            break
+
+        data = remainder + chunk
+        lines = data.split(b"\n")
+        remainder = lines.pop()
+        for line in lines:
+            yield offset, line
+            offset += len(line) + 1
+
+def skip_to(file, position, target):
+    """
+        Reads file forward from position to target, returns where it got to
+    """
+    while position < target:
+        chunk = file.read(min(READ_SIZE, target - position))
+        if not chunk:
+            break
+        position += len(chunk)
+    return position
+
+def build_blocks(file, start, end, block_seconds=300, block_bytes=READ_SIZE):
+    """
+        Indexes [start, end) of a log straight from its lines
+        Returns the blocks and the offset indexing stopped at
+    """
+    blocks = []
+    block_start = position = start
+    first = last = None
+    steamids = set()
+
+    for offset, line in scan_lines(file, start, end):
+        match = TIME_PATTERN.match(line)
+        timestamp = int(match.group(1)) if match is not None else (last or 0)
+        if first is None:
+            first = timestamp
+        last = max(last or timestamp, timestamp)
+        steamids.update(steamid.decode("utf-8", "replace") for steamid in STEAMID_PATTERN.findall(line))
+        position = offset + len(line) + 1
+
+        if position - block_start >= block_bytes or last - first >= block_seconds:
+            blocks.append((block_start, position, first, last, frozenset(steamids)))
+            block_start = position
+            first = last = None
+            steamids = set()
+
+    if first is not None:
+        blocks.append((block_start, position, first, last, frozenset(steamids)))
+
+    return blocks, position
+
+def covering_blocks(path, persist=True):
+    """
+        Returns blocks covering all of path, indexing whatever isn't yet
+        New blocks are written to the index, except the one at the end of a
+        live log, which is still being written
+    """
+    idx_path = index_path(path)
+    blocks = load_blocks(idx_path)
+    segment = SEGMENT_PATTERN.search(path) is not None
+    if blocks and os.path.splitext(path)[1] in COMPRESSED_SUFFIXES:
+        # Finding the size means decompressing everything, and a compressed
+        # segment with an index was fully indexed before it got rotated
+        size = blocks[-1][1]
+    else:
+        size = log_size(path)
+
+    gaps = []
+    position = 0
+    for start, end, *_ in blocks:
+        if start > position:
+            gaps.append((position, start))
+        position = max(position, end)
+    if position < size:
+        gaps.append((position, size))
+
+    if not gaps:
+        return blocks
+
+    added = []
+    persisted = []
+    with open_log(path) as file:
+        for start, end in gaps:
+            new_blocks, _ = build_blocks(file, start, end)
+            added.extend(new_blocks)
+            if segment or end < size:
+                persisted.extend(new_blocks)
+            else:
+                # The last block of a live log is still growing
+                persisted.extend(new_blocks[:-1])
+
+    if persist and persisted:
+        try:
+            with open(idx_path, "a") as file:
+                for block in persisted:
+                    file.write(format_block(*block))
+        except OSError as e:
+            print(f"Could not update {idx_path}: {e}", file=sys.stderr)
+
+    return sorted(blocks + added)
+
+def query(path, steamid=None, since=None, until=None, limit=None, persist=True):
+    """
+        Yields the raw JSON lines in path matching every filter given
+        Only blocks that can contain a match are read
+    """
+    needle = f'"steamid": "{steamid}"'.encode("utf-8") if steamid else None
+    found = 0
+
+    blocks = [
+        block for block in covering_blocks(path, persist)
+        if (steamid is None or steamid in block[4])
+        and (since is None or block[3] >= since)
+        and (until is None or block[2] <= until)
+    ]
+    if not blocks:
+        return
+
+    # Seeking a compressed stream backwards decompresses it again from the
+    # start, so they're read forward in one pass, the blocks are in order
+    compressed = os.path.splitext(path)[1] in COMPRESSED_SUFFIXES
+    position = 0
+    with open_log(path) as file:
+        for start, end, *_ in blocks:
+            if compressed:
+                position = skip_to(file, position, start)
+            for _, line in scan_lines(file, start, end, seek=not compressed):
+                if needle is not None and needle not in line:
+                    continue
+
+                if since is not None or until is not None:
+                    match = TIME_PATTERN.match(line)
+                    if match is None:
+                        continue
+                    timestamp = int(match.group(1))
+                    if (since is not None and timestamp < since) or (until is not None and timestamp > until):
+                        continue
+
+                yield line.decode("utf-8", "replace")
+                found += 1
+                if limit is not None and found >= limit:
+                    return
+            position = end
+
+def log_files(directory, logfile):
+    """
+        A log and its rotated segments, oldest first
+    """
+    segments = []
+    for name in os.listdir(directory):
+        if name.startswith(logfile + ".") and SEGMENT_PATTERN.search(name):
+            segments.append(name)
+
+    paths = [os.path.join(directory, name) for name in sorted(segments, key=segment_key)]
+    live = os.path.join(directory, logfile)
+    if os.path.exists(live):
+        paths.append(live)
+    return paths
+
+def parse_time(value):
+    """
+        Unix time, or an ISO date like 2026-10-13 or 2026-10-13T18:30 in local time
+    """
+    if value is None or value == "":
+        return None
+    if value.isdigit():
+        return int(value)
+    return int(datetime.fromisoformat(value).timestamp())
+
+# =============================================================================
+# >> CLI
+# =============================================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the logger's JSON line files through their index")
+    commands = parser.add_subparsers(dest="command")
+
+    query_parser = commands.add_parser("query", help="Print the lines matching a steamid and/or time range")
+    query_parser.add_argument("files", nargs="+", help="Log files or rotated segments")
+    query_parser.add_argument("--steamid")
+    query_parser.add_argument("--since", help="Unix time or ISO date")
+    query_parser.add_argument("--until", help="Unix time or ISO date")
+    query_parser.add_argument("--limit", type=int)
+
+    rebuild_parser = commands.add_parser("rebuild", help="Index whatever parts of the files aren't yet")
+    rebuild_parser.add_argument("files", nargs="+")
+
+    args = parser.parse_args(argv)
+    if args.command == "query":
+        since, until = parse_time(args.since), parse_time(args.until)
+        remaining = args.limit
+        for path in args.files:
+            for line in query(path, args.steamid, since, until, remaining):
+                print(line)
+                if remaining is not None:
+                    remaining -= 1
+            if remaining is not None and remaining <= 0:
+                break
+    elif args.command == "rebuild":
+        for path in args.files:
+            blocks = covering_blocks(path)
+            print(f"{path}: {len(blocks)} blocks")
+    else:
+        parser.print_help()
+        return 1
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
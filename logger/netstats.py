@@ -0,0 +1,109 @@
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Core Imports
+from array import array
+import time
+
+# =============================================================================
+# >> NETWORK STATS SAMPLER
+# =============================================================================
+METRICS = ("latency", "loss", "choke")
+
+class NetStatsSampler(object):
+    """
+        Samples latency/loss/choke for every active player slot into fixed
+        size ring buffers. All buffers are preallocated flat arrays indexed by
+        slot * samples, nothing is allocated per sample.
+
+        tick() looks at a single slot per call, so the work is spread over
+        many server frames instead of reading every player at once.
+    """
+    def __init__(self, reader, max_slots=65, samples=120, interval=2.0):
+        # reader(slot) -> (latency ms, loss 0-1, choke 0-1) or None
+        self.reader = reader
+        self.max_slots = max_slots
+        self.samples = samples
+        self.interval = interval
+
+        size = max_slots * samples
+        self.values = {metric: array("f", [0.0]) * size for metric in METRICS}
+        self.heads = array("H", [0]) * max_slots
+        self.counts = array("H", [0]) * max_slots
+        self.due = array("d", [0.0]) * max_slots
+
+        self.active = []
+        self.cursor = 0
+
+    def activate(self, slot):
+        if not 0 <= slot < self.max_slots or slot in self.active:
+            return
+
+        self.heads[slot] = 0
+        self.counts[slot] = 0
+        self.due[slot] = 0.0
+        self.active.append(slot)
+
+    def deactivate(self, slot):
+        """
+            Stops sampling slot and returns its summary
+        """
+        if slot not in self.active:
+            return None
+
+        summary = self.summary(slot)
+        self.active.remove(slot)
+        self.counts[slot] = 0
+        return summary
+
+    def tick(self, now=None):
+        if not self.active:
+            return
+
+        if self.cursor >= len(self.active):
+            self.cursor = 0
+
+        slot = self.active[self.cursor]
+        self.cursor += 1
+
+        if now is None:
+            now = time.monotonic()
+
+        if now < self.due[slot]:
+            return
+
+        self.due[slot] = now + self.interval
+        sample = self.reader(slot)
+        if sample is not None:
+            self.record(slot, *sample)
+
+    def record(self, slot, latency, loss, choke):
+        position = slot * self.samples + self.heads[slot]
+        self.values["latency"][position] = latency
+        self.values["loss"][position] = loss
+        self.values["choke"][position] = choke
+
+        self.heads[slot] = (self.heads[slot] + 1) % self.samples
+        if self.counts[slot] < self.samples:
+            self.counts[slot] += 1
+
+    def summary(self, slot):
+        """
+            Returns {"samples": n, metric: {"min", "avg", "p95"}} over the ring
+            buffer, or None if nothing was sampled yet
+        """
+        count = self.counts[slot]
+        if count == 0:
+            return None
+
+        start = slot * self.samples
+        summary = {"samples": count}
+        for metric in METRICS:
+            values = sorted(self.values[metric][start:start + count])
+            summary[metric] = {
+                "min": round(values[0], 4),
+                "avg": round(sum(values) / count, 4),
+                "p95": round(values[min(count - 1, int(count * 0.95))], 4)
+            }
+
+        return summary
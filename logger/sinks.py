@@ -0,0 +1,209 @@
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Core Imports
+from numbers import Number
+import socket
+import re
+
+# =============================================================================
+# >> PROTOCOLS
+# =============================================================================
+PROTOCOL_INFLUX = "influx"
+PROTOCOL_STATSD = "statsd"
+
+PROTOCOLS = (PROTOCOL_INFLUX, PROTOCOL_STATSD)
+
+# Largest payload we'll ever try to put in a single datagram
+MAX_DATAGRAM = 65000
+
+_STATSD_UNSAFE = re.compile(r"[^A-Za-z0-9_.\-]")
+
+def flatten(data, prefix=""):
+    """
+        Turns {"player": {"steamid": ...}} into {"player_steamid": ...}
+    """
+    for key, value in data.items():
+        name = f"{prefix}_{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            yield from flatten(value, name)
+        else:
+            yield name, value
+
+def _influx_escape(value, characters):
+    value = str(value).replace("\\", "\\\\")
+    for character in characters:
+        value = value.replace(character, "\\" + character)
+    return value
+
+def _influx_field(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, int):
+        return f"{value}i"
+    if isinstance(value, Number):
+        return repr(float(value))
+    value = str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+    return f"\"{value}\""
+
+def influx_line(measurement, fields, tags=None, timestamp=None):
+    """
+        Formats one Influx line protocol point, timestamp in seconds
+    """
+    fields = ",".join(
+        f"{_influx_escape(key, ',= ')}={_influx_field(value)}"
+        for key, value in fields if value is not None
+    )
+    if not fields:
+        return None
+
+    line = _influx_escape(measurement, ", ")
+    for key, value in sorted((tags or {}).items()):
+        line += f",{_influx_escape(key, ',= ')}={_influx_escape(value, ',= ')}"
+
+    line += " " + fields
+    if timestamp is not None:
+        line += f" {int(timestamp) * 1000000000}"
+    return line
+
+def statsd_name(*parts):
+    return ".".join(_STATSD_UNSAFE.sub("_", str(part)) for part in parts if part)
+
+# =============================================================================
+# >> DATAGRAM SINK
+# =============================================================================
+class DatagramSink(object):
+    """
+        Sends events and gauges straight to a collector over UDP or a unix
+        datagram socket, as Influx line protocol or statsd.
+
+        Lines are packed into datagrams of at most mtu bytes. The socket never
+        blocks: if the collector is down or the buffer is full the packet is
+        dropped and counted.
+    """
+    def __init__(self, address, protocol=PROTOCOL_INFLUX, mtu=1400, prefix="srcds", tags=None):
+        if protocol not in PROTOCOLS:
+            raise ValueError(f"Unknown datagram protocol: {protocol}")
+
+        self.name = address
+        self.address = address
+        self.protocol = protocol
+        self.mtu = max(64, min(int(mtu), MAX_DATAGRAM))
+        self.prefix = prefix
+        self.tags = dict(tags or {})
+
+        self.family, self.target = self.parse_address(address)
+        self.socket = None
+
+        self.buffer = []
+        self.buffer_size = 0
+
+        self.sent = 0
+        self.dropped = 0
+
+    @staticmethod
+    def parse_address(address):
+        """
+            udp://host:port or unix:///path/to/socket
+        """
+        if address.startswith("unix://"):
+            return socket.AF_UNIX, address[len("unix://"):]
+
+        if address.startswith("udp://"):
+            address = address[len("udp://"):]
+
+        host, _, port = address.rpartition(":")
+        host = host.strip("[]") or "127.0.0.1"
+        family, _, _, _, target = socket.getaddrinfo(host, int(port), 0, socket.SOCK_DGRAM)[0]
+        return family, target
+
+    def start(self):
+        self.socket = socket.socket(self.family, socket.SOCK_DGRAM)
+        self.socket.setblocking(False)
+
+    def stop(self, timeout=5):
+        self.flush()
+        if self.socket is not None:
+            self.socket.close()
+            self.socket = None
+
+    def stats(self):
+        return {"sent": self.sent, "dropped": self.dropped}
+
+    # =========================================================================
+    # >> FORMATTING
+    # =========================================================================
+    def format_event(self, logfile, record):
+        event_name = record.get("event_name")
+        event = record.get("event") or {}
+
+        if self.protocol == PROTOCOL_STATSD:
+            return [f"{statsd_name(self.prefix, 'event', event_name)}:1|c"]
+
+        tags = dict(self.tags)
+        tags["logfile"] = logfile.rsplit(".", 1)[0]
+        line = influx_line(f"{self.prefix}_{event_name}", flatten(event), tags, record.get("time"))
+        return [line] if line is not None else []
+
+    def format_gauges(self, values):
+        timestamp = values.get("time")
+        gauges = [(name, value) for name, value in sorted(values.items()) if name != "time"]
+
+        if self.protocol == PROTOCOL_STATSD:
+            return [
+                f"{statsd_name(self.prefix, name)}:{value}|g"
+                for name, value in gauges
+                if isinstance(value, Number) and not isinstance(value, bool)
+            ]
+
+        line = influx_line(f"{self.prefix}_gauges", gauges, self.tags, timestamp)
+        return [line] if line is not None else []
+
+    # =========================================================================
+    # >> SINK INTERFACE
+    # =========================================================================
+    def emit(self, logfile, record):
+        for line in self.format_event(logfile, record):
+            self._add(line)
+
+    def gauges(self, values):
+        for line in self.format_gauges(values):
+            self._add(line)
+        self.flush()
+
+    def rotate(self):
+        pass
+
+    def flush(self):
+        if self.buffer:
+            self._send(b"\n".join(self.buffer))
+            self.buffer = []
+            self.buffer_size = 0
+
+    def _add(self, line):
+        data = line.encode("utf-8")
+        if len(data) > MAX_DATAGRAM:
+            self.dropped += 1
+            return
+
+        # +1 for the newline joining it to the previous line
+        if self.buffer and self.buffer_size + 1 + len(data) > self.mtu:
+            self.flush()
+
+        self.buffer.append(data)
+        self.buffer_size += len(data) + (1 if len(self.buffer) > 1 else 0)
+
+        if self.buffer_size >= self.mtu:
+            self.flush()
+
+    def _send(self, packet):
+        if self.socket is None:
+            self.dropped += 1
+            return
+
+        try:
+            self.socket.sendto(packet, self.target)
+            self.sent += 1
+        except OSError:
+            # Collector down, unix socket missing or the send buffer is full
+            self.dropped += 1
@@ -0,0 +1,615 @@
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Source.Python Imports
+from listeners.tick import GameThread
+
+# Core Imports
+from collections import deque
+from datetime import datetime
+import threading
+import queue
+import shutil
+import time
+import json
+import gzip
+import lzma
+import glob
+import os
+
+# Plugin Imports
+from .logindex import LogIndexer, index_path, SEGMENT_PATTERN, INDEX_SUFFIX
+
+# =============================================================================
+# >> OVERFLOW POLICIES
+# =============================================================================
+# Wait (briefly) for the writer to make room, then drop the new event
+OVERFLOW_BLOCK = "block"
+# Throw away the oldest queued event to make room for the new one
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+# Throw away the new event and count it
+OVERFLOW_DROP_NEWEST = "drop_newest"
+
+OVERFLOW_POLICIES = (OVERFLOW_BLOCK, OVERFLOW_DROP_OLDEST, OVERFLOW_DROP_NEWEST)
+
+# =============================================================================
+# >> ROTATION POLICIES
+# =============================================================================
+ROTATE_NONE = "none"
+ROTATE_SIZE = "size"
+ROTATE_DAILY = "daily"
+ROTATE_MAP = "map"
+
+ROTATE_POLICIES = (ROTATE_NONE, ROTATE_SIZE, ROTATE_DAILY, ROTATE_MAP)
+
+COMPRESS_NONE = "none"
+COMPRESS_GZIP = "gzip"
+COMPRESS_XZ = "xz"
+
+COMPRESSORS = {
+    COMPRESS_GZIP: (".gz", gzip.open),
+    COMPRESS_XZ: (".xz", lzma.open)
+}
+
+# Queue marker asking the writer to rotate every open file
+ROTATE_MARKER = object()
+
+class Snapshot(object):
+    # Queued in place of a record to publish a full set of gauge values
+    __slots__ = ("values",)
+
+    def __init__(self, values):
+        self.values = values
+
+# =============================================================================
+# >> LOG ROTATOR
+# =============================================================================
+class LogRotator(object):
+    """
+        Decides when log files get rotated and hands rotated segments to a
+        background thread for compression and retention.
+
+        Rotation is a rename followed by opening a fresh file, so a tailer
+        following the path sees a new inode and the old segment keeps its
+        content until it's compressed.
+    """
+    def __init__(self, mode=ROTATE_NONE, max_bytes=64 * 1024 * 1024, compress=COMPRESS_GZIP, keep=14):
+        if mode not in ROTATE_POLICIES:
+            raise ValueError(f"Unknown rotation policy: {mode}")
+
+        if compress != COMPRESS_NONE and compress not in COMPRESSORS:
+            raise ValueError(f"Unknown compression: {compress}")
+
+        self.mode = mode
+        self.max_bytes = max(1, int(max_bytes))
+        self.compress = compress
+        self.keep = max(0, int(keep))
+
+        self.queue = queue.Queue()
+        self.thread = None
+
+    def start(self, directory):
+        self.thread = GameThread(target=self._run, name="logger-compressor")
+        self.thread.daemon = True
+        self.thread.start()
+
+        # Pick up anything a previous run rotated but never got to compress
+        for path in glob.glob(os.path.join(directory, "*.*.*")):
+            match = SEGMENT_PATTERN.search(path)
+            if match is not None and match.group(3) is None:
+                self.queue.put(path)
+
+    def stop(self, timeout=5):
+        if self.thread is None:
+            return
+
+        self.queue.put(None)
+        self.thread.join(timeout)
+        self.thread = None
+
+    def should_rotate(self, size, opened, incoming):
+        if size == 0:
+            return False
+
+        if self.mode == ROTATE_SIZE:
+            return size + incoming > self.max_bytes
+
+        if self.mode == ROTATE_DAILY:
+            return opened.date() != datetime.now().date()
+
+        return False
+
+    def target(self, path):
+        """
+            The name rotate() will give path, free of any earlier segment
+        """
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        target = f"{path}.{stamp}"
+        suffix = 0
+        while any(os.path.exists(target + ext) for ext in ("", ".gz", ".xz")):
+            suffix += 1
+            target = f"{path}.{stamp}-{suffix}"
+        return target
+
+    def rotate(self, path, target):
+        """
+            Renames path out of the way and queues it for compression
+            Must only be called once the writer has closed its handle
+        """
+        os.rename(path, target)
+        self.queue.put(target)
+        return target
+
+    # =========================================================================
+    # >> COMPRESSOR THREAD
+    # =========================================================================
+    def _run(self):
+        while True:
+            path = self.queue.get()
+            if path is None:
+                break
+
+            try:
+                self._compress(path)
+                self._expire(path)
+            except OSError as e:
+                print(f"Logger: failed to compress {path}: {e}")
+
+    def _compress(self, path):
+        if self.compress == COMPRESS_NONE:
+            return
+
+        extension, opener = COMPRESSORS[self.compress]
+        tmp_path = path + extension + ".tmp"
+        with open(path, "rb") as src, opener(tmp_path, "wb") as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+
+        os.rename(tmp_path, path + extension)
+        os.remove(path)
+
+    def _expire(self, path):
+        if self.keep == 0:
+            return
+
+        base = SEGMENT_PATTERN.sub("", path)
+        segments = []
+        for candidate in glob.glob(glob.escape(base) + ".*"):
+            match = SEGMENT_PATTERN.search(candidate)
+            if match is None or candidate[:match.start()] != base:
+                continue
+            segments.append((match.group(1), int(match.group(2) or 0), candidate))
+
+        segments.sort()
+        expired = [path for _, _, candidate in segments[:-self.keep] for path in (candidate, index_path(candidate))]
+
+        # Indexes of segments that are gone, left behind when a segment used
+        # to expire before its index had been renamed after it. Only those
+        # older than what's kept, the newest may be waiting for its segment.
+        if len(segments) >= self.keep:
+            oldest_kept = segments[-self.keep][:2]
+            for candidate in glob.glob(glob.escape(base) + ".*" + INDEX_SUFFIX):
+                segment = candidate[:-len(INDEX_SUFFIX)]
+                match = SEGMENT_PATTERN.search(segment)
+                if match is None or segment[:match.start()] != base:
+                    continue
+                if (match.group(1), int(match.group(2) or 0)) < oldest_kept:
+                    expired.append(candidate)
+
+        for path in expired:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Logger: failed to expire {path}: {e}")
+
+# =============================================================================
+# >> LOG WRITER
+# =============================================================================
+class LogWriter(object):
+    """
+        Single long lived writer thread for the logger plugin
+        Events are queued in memory by the game thread and handed in order to
+        every sink (files, datagram collectors, ...) from one background thread.
+        Sinks are flushed in batches on a size/time threshold.
+    """
+    def __init__(self, sinks, queue_size=10000, batch_size=256, flush_interval=1.0,
+                 overflow=OVERFLOW_DROP_OLDEST, block_timeout=0.05, overflow_logfile="event.log"):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+
+        self.sinks = list(sinks)
+        self.queue_size = max(1, int(queue_size))
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = max(0.0, float(flush_interval))
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.overflow_logfile = overflow_logfile
+
+        self.queue = deque()
+        self.condition = threading.Condition()
+        self.thread = None
+        self.running = False
+
+        # Counters, only ever read for reporting
+        self.queued = 0
+        self.dispatched = 0
+        self.dropped = 0
+        self.dropped_reported = 0
+
+    def start(self):
+        with self.condition:
+            if self.running:
+                return
+            self.running = True
+
+        for sink in self.sinks:
+            sink.start()
+
+        self.thread = GameThread(target=self._run, name="logger-writer")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self, timeout=5):
+        """
+            Stops accepting events, drains whatever is queued and closes the sinks
+        """
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
+
+        for sink in self.sinks:
+            sink.stop(timeout)
+
+    def rotate(self):
+        """
+            Rotates every open log file once all events queued before this
+            call have been written
+        """
+        with self.condition:
+            if not self.running:
+                return
+
+            self.queue.append((None, ROTATE_MARKER))
+            self.condition.notify_all()
+
+    def gauges(self, values):
+        """
+            Publishes a full snapshot of gauge values to every sink
+        """
+        return self.put(None, Snapshot(values))
+
+    def put(self, logfile, record):
+        """
+            Queues a record for logfile. Never blocks longer than block_timeout.
+            Returns False if the record was dropped.
+        """
+        with self.condition:
+            if not self.running:
+                self.dropped += 1
+                return False
+
+            if len(self.queue) >= self.queue_size:
+                if self.overflow == OVERFLOW_DROP_OLDEST:
+                    self.queue.popleft()
+                    self.dropped += 1
+                elif self.overflow == OVERFLOW_BLOCK:
+                    self.condition.wait_for(lambda: len(self.queue) < self.queue_size, self.block_timeout)
+                    if len(self.queue) >= self.queue_size:
+                        self.dropped += 1
+                        return False
+                else:
+                    self.dropped += 1
+                    return False
+
+            self.queue.append((logfile, record))
+            self.queued += 1
+            self.condition.notify_all()
+
+        return True
+
+    def stats(self):
+        with self.condition:
+            stats = {
+                "queued": self.queued,
+                "dispatched": self.dispatched,
+                "dropped": self.dropped,
+                "pending": len(self.queue)
+            }
+
+        for sink in self.sinks:
+            for key, value in sink.stats().items():
+                stats[f"{sink.name}_{key}"] = value
+
+        return stats
+
+    # =========================================================================
+    # >> WRITER THREAD
+    # =========================================================================
+    def _run(self):
+        pending_count = 0
+        last_flush = time.monotonic()
+
+        while True:
+            with self.condition:
+                if not self.queue and self.running:
+                    timeout = None
+                    if pending_count:
+                        timeout = self.flush_interval - (time.monotonic() - last_flush)
+
+                    if timeout is None or timeout > 0:
+                        self.condition.wait(timeout)
+
+                batch = []
+                while self.queue and len(batch) < self.batch_size:
+                    batch.append(self.queue.popleft())
+
+                if batch:
+                    # Wake up anyone waiting on a full queue
+                    self.condition.notify_all()
+
+                stopping = not self.running
+                drained = not self.queue
+
+            for logfile, record in batch:
+                if record is ROTATE_MARKER:
+                    self._dispatch("flush")
+                    self._dispatch("rotate")
+                    pending_count = 0
+                    last_flush = time.monotonic()
+                elif isinstance(record, Snapshot):
+                    self._dispatch("gauges", record.values)
+                else:
+                    self._dispatch("emit", logfile, record)
+                    pending_count += 1
+
+            with self.condition:
+                self.dispatched += len(batch)
+
+            elapsed = time.monotonic() - last_flush
+            if pending_count >= self.batch_size or elapsed >= self.flush_interval or stopping:
+                self._report_dropped()
+                self._dispatch("flush")
+                pending_count = 0
+                last_flush = time.monotonic()
+
+            if stopping and drained:
+                break
+
+    def _dispatch(self, method, *args):
+        # One broken sink must not take the others (or this thread) down
+        for sink in self.sinks:
+            try:
+                getattr(sink, method)(*args)
+            except Exception as e:
+                print(f"Logger: {sink.name} sink failed in {method}: {e}")
+
+    def _report_dropped(self):
+        dropped = self.dropped
+        if dropped == self.dropped_reported:
+            return
+
+        record = {
+            "time": int(time.time()),
+            "event_name": "logger_dropped",
+            "event": {"dropped": dropped - self.dropped_reported, "total_dropped": dropped}
+        }
+        self.dropped_reported = dropped
+        self._dispatch("emit", self.overflow_logfile, record)
+
+# =============================================================================
+# >> FILE SINK
+# =============================================================================
+class JsonCodec(object):
+    """
+        One JSON object per line, what telegraf and friends tail
+    """
+    extension = ".log"
+    indexable = True
+
+    def begin(self, empty):
+        return b""
+
+    def encode(self, record):
+        return (json.dumps(record) + "\n").encode("utf-8")
+
+# Gauges the logger used to write as a file each, holding just the value,
+# before gauges.json. Readers like telegraf's file input still read them.
+LEGACY_GAUGES = ("idle", "players", "bots", "spectators", "currentmap")
+
+class FileSink(object):
+    """
+        Appends events to their log file under directory, as JSON lines by
+        default. codec is a class, every open file gets its own instance.
+        One handle is kept open per log file and rotated through the rotator
+    """
+    name = "file"
+
+    def __init__(self, directory, fsync=False, rotator=None, gauge_file="gauges.json", codec=JsonCodec,
+                 index_seconds=0, indexers=None, legacy_gauges=LEGACY_GAUGES):
+        self.directory = directory
+        self.fsync = bool(fsync)
+        self.rotator = rotator
+        self.gauge_file = gauge_file
+        # Also written to a file of their own whenever they change
+        self.legacy_gauges = tuple(legacy_gauges)
+        self.legacy_values = {}
+        self.codec = codec
+        # Sparse index block length, 0 disables the index
+        self.index_seconds = index_seconds if getattr(codec, "indexable", False) else 0
+        # logfile -> extra indexer fed the same way as the sparse index, like
+        # the chat index. Shares LogIndexer's open/add/close/rotated interface
+        self.extra_indexers = dict(indexers or {}) if getattr(codec, "indexable", False) else {}
+
+        self.pending = {}
+        self.handles = {}
+        self.codecs = {}
+        self.indexers = {}
+        # logfile -> [size, opened datetime] for the currently open segment
+        self.segments = {}
+
+        self.written = 0
+        self.failed = 0
+
+    def start(self):
+        if self.rotator is not None:
+            self.rotator.start(self.directory)
+
+    def stop(self, timeout=5):
+        self._close()
+        if self.rotator is not None:
+            self.rotator.stop(timeout)
+
+    def stats(self):
+        return {"written": self.written, "failed": self.failed, "open_files": len(self.handles)}
+
+    def emit(self, logfile, record):
+        # Encoded at flush time, once we know which segment it lands in
+        self.pending.setdefault(logfile, []).append(record)
+
+    def gauges(self, values):
+        # Written as a whole and renamed into place, so readers either see the
+        # old or the new snapshot, never a partial file
+        self._replace(self.gauge_file, (json.dumps(values, sort_keys=True) + "\n").encode("utf-8"))
+
+        for name in self.legacy_gauges:
+            if name in values and self.legacy_values.get(name) != values[name]:
+                self._replace(name, str(values[name]).encode("utf-8"))
+                self.legacy_values[name] = values[name]
+
+    def flush(self):
+        pending, self.pending = self.pending, {}
+        for logfile, records in pending.items():
+            try:
+                file = self._open(logfile)
+                encoded = self._encode(logfile, records)
+                size, opened = self.segments[logfile]
+                if self.rotator is not None and self.rotator.should_rotate(size, opened, sum(len(line) for _, line in encoded)):
+                    self._rotate(logfile)
+                    file = self._open(logfile)
+                    # The new segment may need a fresh string table
+                    encoded = self._encode(logfile, records)
+
+                data = b"".join(line for _, line in encoded)
+                offset = self.segments[logfile][0]
+                file.write(data)
+                file.flush()
+                if self.fsync:
+                    os.fsync(file.fileno())
+                self.segments[logfile][0] += len(data)
+
+                for indexer in self.indexers.get(logfile, ()):
+                    position = offset
+                    for record, line in encoded:
+                        indexer.add(position, len(line), record)
+                        position += len(line)
+            except OSError as e:
+                print(f"Logger: failed to write {len(records)} events to {logfile}: {e}")
+                self._close_handle(logfile)
+                self.failed += len(records)
+                continue
+
+            self.written += len(encoded)
+
+    def rotate(self):
+        for logfile in list(self.handles):
+            self._rotate(logfile)
+
+    def _replace(self, filename, data):
+        path = os.path.join(self.directory, filename)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "wb") as file:
+                file.write(data)
+                if self.fsync:
+                    file.flush()
+                    os.fsync(file.fileno())
+
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Logger: failed to replace {filename}: {e}")
+
+    def _encode(self, logfile, records):
+        codec = self.codecs[logfile]
+        encoded = []
+        for record in records:
+            try:
+                encoded.append((record, codec.encode(record)))
+            except (TypeError, ValueError) as e:
+                print(f"Logger: could not serialize {record!r}: {e}")
+                self.failed += 1
+
+        return encoded
+
+    def path(self, logfile):
+        return os.path.join(self.directory, os.path.splitext(logfile)[0] + self.codec.extension)
+
+    def _open(self, logfile):
+        file = self.handles.get(logfile)
+        if file is None:
+            file = open(self.path(logfile), "ab")
+            stat = os.fstat(file.fileno())
+            codec = self.codec()
+            preamble = codec.begin(stat.st_size == 0)
+            if preamble:
+                file.write(preamble)
+
+            self.handles[logfile] = file
+            self.codecs[logfile] = codec
+            self.segments[logfile] = [stat.st_size + len(preamble), datetime.fromtimestamp(stat.st_mtime)]
+
+            indexers = []
+            if self.index_seconds > 0:
+                indexers.append(LogIndexer(index_path(self.path(logfile)), block_seconds=self.index_seconds))
+            if logfile in self.extra_indexers:
+                indexers.append(self.extra_indexers[logfile])
+            for indexer in indexers:
+                indexer.open(stat.st_size + len(preamble))
+            self.indexers[logfile] = indexers
+
+        return file
+
+    def _rotate(self, logfile):
+        if self.rotator is None:
+            return
+
+        indexers = self.indexers.get(logfile, ())
+        self._close_handle(logfile)
+        path = self.path(logfile)
+        try:
+            if os.path.getsize(path) > 0:
+                # The indexes learn the new name before the segment shows
+                # up under it, so nothing finds it unaccounted for and the
+                # compressor never expires it ahead of its index
+                target = self.rotator.target(path)
+                for indexer in indexers:
+                    indexer.rotated(target)
+                self.rotator.rotate(path, target)
+        except OSError as e:
+            print(f"Logger: failed to rotate {logfile}: {e}")
+
+    def _close_handle(self, logfile):
+        self.segments.pop(logfile, None)
+        self.codecs.pop(logfile, None)
+        for indexer in self.indexers.pop(logfile, ()):
+            try:
+                indexer.close()
+            except OSError as e:
+                print(f"Logger: failed to update the index of {logfile}: {e}")
+
+        file = self.handles.pop(logfile, None)
+        if file is None:
+            return
+
+        try:
+            file.close()
+        except OSError:
+            pass
+
+    def _close(self):
+        for logfile in list(self.handles):
+            self._close_handle(logfile)
@@ -0,0 +1,86 @@
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# SP Imports
+from listeners.tick import GameThread
+
+# Core Imports
+from zipfile import ZipFile, ZIP_DEFLATED
+import time
+import os
+
+# =============================================================================
+# >> ARCHIVE STREAM
+# =============================================================================
+class ArchiveStream(object):
+    """
+        Readable zip archive of members ({arcname: path}) built on the fly
+        A thread compresses each member straight into a pipe, so the archive
+        never touches the disk and every member is read exactly once. Read it
+        like a file, e.g. hand it to boto3's upload_fileobj.
+    """
+    def __init__(self, members, compresslevel=6):
+        self.members = members
+        self.compresslevel = compresslevel
+
+        # Bytes read from the members / handed to the reader
+        self.bytes_in = 0
+        self.bytes_out = 0
+        # Seconds the compressing thread ran, it waits on the reader too
+        self.elapsed = 0.0
+        self.error = None
+
+        read_fd, write_fd = os.pipe()
+        self.reader = os.fdopen(read_fd, "rb")
+        self.writer = os.fdopen(write_fd, "wb")
+
+        self.thread = GameThread(target=self._run, name="match-archive")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def read(self, size=-1):
+        data = self.reader.read(size)
+        self.bytes_out += len(data)
+        if not data or (size is not None and size > 0 and len(data) < size):
+            self._check()
+        return data
+
+    def readable(self):
+        return True
+
+    def close(self):
+        self.reader.close()
+        self.thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _check(self):
+        # A short read means the writer is done, make sure it finished cleanly
+        # or the upload would end up with a truncated archive
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def _run(self):
+        started = time.monotonic()
+        try:
+            # Pipes can't seek, so zipfile writes data descriptors after each
+            # member instead of going back to patch the local headers
+            with ZipFile(self.writer, "w", compression=ZIP_DEFLATED, compresslevel=self.compresslevel) as archive:
+                for arcname, path in self.members.items():
+                    archive.write(path, arcname)
+                    self.bytes_in += os.path.getsize(path)
+        except Exception as e:
+            self.error = e
+        finally:
+            try:
+                self.writer.close()
+            except OSError as e:
+                # The reader went away
+                if self.error is None:
+                    self.error = e
+            self.elapsed = time.monotonic() - started
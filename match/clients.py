@@ -0,0 +1,100 @@
+"""
+    The match plugin's heavy third party libraries, loaded when first needed
+
+    Importing boto3 takes hundreds of milliseconds and tens of MB, which
+    used to happen inside `sp plugin load` with the server running. Nothing
+    needs it before the first upload, so it's imported on first use and
+    warm() does that on a background thread right after the plugin loaded.
+
+    One S3 client is kept for every upload. Building one resolves
+    credentials and endpoints, and clients are safe to share between
+    threads.
+
+    Run on its own it measures what load() no longer pays:
+
+        python clients.py
+"""
+
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Core Imports
+import threading
+import time
+import sys
+
+try:
+    # Source.Python Imports
+    from listeners.tick import GameThread
+except ImportError:
+    # Run on its own for the benchmark
+    GameThread = threading.Thread
+
+# =============================================================================
+# >> CLIENTS
+# =============================================================================
+S3_CLIENT = None
+S3_LOCK = threading.Lock()
+
+def http():
+    import requests
+    return requests
+
+def s3_client():
+    global S3_CLIENT
+
+    with S3_LOCK:
+        if S3_CLIENT is None:
+            import boto3
+            S3_CLIENT = boto3.client("s3")
+        return S3_CLIENT
+
+def warm():
+    """
+        Imports everything in the background so the first upload doesn't
+        have to
+    """
+    def run():
+        started = time.monotonic()
+        try:
+            http()
+            s3_client()
+        except Exception as e:
+            # Tried again by the first upload that needs it
+            print(f"Match: could not warm up the upload clients: {e}")
+            return
+        print(f"Match: upload clients ready in {time.monotonic() - started:.2f}s")
+
+    thread = GameThread(target=run, name="match-warm-clients")
+    thread.daemon = True
+    thread.start()
+    return thread
+
+# =============================================================================
+# >> BENCHMARK
+# =============================================================================
+def max_rss():
+    # Peak RSS in MB, ru_maxrss is KB on Linux
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def main():
+    steps = (
+        ("import requests", http),
+        ("import boto3", lambda: __import__("boto3")),
+        ("boto3.client('s3')", lambda: s3_client()),
+        ("cached client", lambda: s3_client())
+    )
+
+    baseline = max_rss()
+    print(f"{'step':<20} {'ms':>8} {'+MB RSS':>8}")
+    for name, step in steps:
+        before = max_rss()
+        started = time.perf_counter()
+        step()
+        elapsed = time.perf_counter() - started
+        print(f"{name:<20} {elapsed * 1000:>8.1f} {max_rss() - before:>8.1f}")
+    print(f"{'total':<20} {'':>8} {max_rss() - baseline:>8.1f}")
+
+if __name__ == "__main__":
+    sys.exit(main())
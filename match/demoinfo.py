@@ -0,0 +1,139 @@
+"""
+    Reads the header of a Source demo, to tell a finished recording worth
+    uploading from a broken or short one without reading the demo itself
+
+    Run on its own it checks check_demo() against demos it writes to a
+    temporary directory, a valid one and each way one can be unusable:
+
+        python demoinfo.py
+"""
+
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Core Imports
+import tempfile
+import struct
+import mmap
+import sys
+import os
+
+# =============================================================================
+# >> DEMO HEADER
+# =============================================================================
+DEMO_MAGIC = b"HL2DEMO\x00"
+
+# magic, demo protocol, network protocol, server name, client name, map name,
+# game directory, playback seconds, ticks, frames, signon length
+HEADER = struct.Struct("<8sii260s260s260s260sfiii")
+
+class InvalidDemo(Exception):
+    pass
+
+class DemoHeader(object):
+    """
+        The fixed size header at the start of every demo
+
+        The engine writes it with zero ticks and playback time when recording
+        starts and fills them in on tv_stoprecord, so a demo whose recording
+        never stopped cleanly still says 0.
+    """
+    __slots__ = (
+        "demo_protocol", "network_protocol", "server_name", "client_name",
+        "map_name", "game_directory", "playback_time", "ticks", "frames", "signon_length"
+    )
+
+    def __init__(self, data):
+        fields = HEADER.unpack_from(data)
+        if fields[0] != DEMO_MAGIC:
+            raise InvalidDemo("not a demo")
+
+        (
+            _, self.demo_protocol, self.network_protocol, server_name, client_name,
+            map_name, game_directory, self.playback_time, self.ticks, self.frames, self.signon_length
+        ) = fields
+        self.server_name = text(server_name)
+        self.client_name = text(client_name)
+        self.map_name = text(map_name)
+        self.game_directory = text(game_directory)
+
+    @property
+    def duration(self):
+        minutes, seconds = divmod(int(self.playback_time), 60)
+        return f"{minutes:02}:{seconds:02}"
+
+    def __repr__(self):
+        return f"<DemoHeader {self.map_name} {self.duration} {self.ticks} ticks>"
+
+def text(field):
+    return field.split(b"\x00", 1)[0].decode("utf-8", errors="replace")
+
+def read_header(path):
+    """
+        Parses the header of the demo at path, mapping only the header and
+        never reading the body. Raises InvalidDemo if it isn't one.
+    """
+    with open(path, "rb") as file:
+        try:
+            with mmap.mmap(file.fileno(), HEADER.size, access=mmap.ACCESS_READ) as data:
+                return DemoHeader(data)
+        except ValueError:
+            # mmap can't map past the end of the file
+            raise InvalidDemo(f"shorter than a demo header ({HEADER.size} bytes)") from None
+
+def check_demo(path, min_seconds=0):
+    """
+        The demo's header if it's worth uploading, InvalidDemo saying why not
+        otherwise
+    """
+    header = read_header(path)
+    if header.ticks <= 0 or header.playback_time <= 0:
+        raise InvalidDemo("recording never finished, the header has no ticks")
+    if header.playback_time < min_seconds:
+        raise InvalidDemo(f"only {header.playback_time:.0f}s long")
+    return header
+
+# =============================================================================
+# >> SELF CHECK
+# =============================================================================
+def demo_bytes(magic=DEMO_MAGIC, playback_time=1800.0, ticks=119000, body=4096):
+    header = HEADER.pack(
+        magic, 3, 24, b"scrims.tf", b"SourceTV", b"cp_process_final", b"tf",
+        playback_time, ticks, ticks, 0
+    )
+    return header + b"\x00" * body
+
+# name -> (demo contents, what check_demo says: None if it's usable, part of
+# the InvalidDemo message otherwise)
+CASES = {
+    "valid": (demo_bytes(), None),
+    "zero ticks": (demo_bytes(playback_time=0.0, ticks=0), "never finished"),
+    "too short": (demo_bytes(playback_time=30.0, ticks=2000), "only 30s long"),
+    "bad magic": (demo_bytes(magic=b"HL2DEMX\x00"), "not a demo"),
+    "truncated": (demo_bytes()[:HEADER.size // 2], "shorter than a demo header"),
+    "empty": (b"", "shorter than a demo header")
+}
+
+def main(min_seconds=60):
+    failed = 0
+    with tempfile.TemporaryDirectory() as directory:
+        for name, (data, expected) in CASES.items():
+            path = os.path.join(directory, name.replace(" ", "_") + ".dem")
+            with open(path, "wb") as file:
+                file.write(data)
+
+            try:
+                outcome = repr(check_demo(path, min_seconds))
+                ok = expected is None
+            except InvalidDemo as e:
+                outcome = f"InvalidDemo: {e}"
+                ok = expected is not None and expected in str(e)
+
+            failed += not ok
+            print(f"{'ok' if ok else 'FAIL':<4} {name:<10} {outcome}")
+
+    print(f"{len(CASES) - failed}/{len(CASES)} passed")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Core Imports
+import errno
+import time
+import os
+
+# =============================================================================
+# >> FINALIZE
+# =============================================================================
+COPY_CHUNK = 1024 * 1024
+
+def open_handles(path):
+    """
+        How many of our own file descriptors point at path, None where
+        /proc isn't there to tell
+    """
+    try:
+        fds = os.listdir("/proc/self/fd")
+    except OSError:
+        return None
+
+    real_path = os.path.realpath(path)
+    count = 0
+    for fd in fds:
+        try:
+            if os.readlink(f"/proc/self/fd/{fd}") == real_path:
+                count += 1
+        except OSError:
+            # Closed while we were looking
+            pass
+    return count
+
+def wait_closed(path, timeout=30, poll=0.25, settle=2.0):
+    """
+        Waits for the engine to close the demo after tv_stoprecord, which
+        only runs once the command buffer gets to it and then rewrites the
+        header. Without /proc it waits for the file to stop changing for
+        settle seconds instead. Returns False on timeout.
+    """
+    deadline = time.monotonic() + timeout
+    last = None
+    unchanged_since = None
+    while time.monotonic() < deadline:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            time.sleep(poll)
+            continue
+
+        handles = open_handles(path)
+        if handles == 0:
+            return True
+
+        if handles is None:
+            current = (stat.st_size, stat.st_mtime_ns)
+            if current != last:
+                last = current
+                unchanged_since = time.monotonic()
+            elif time.monotonic() - unchanged_since >= settle:
+                return True
+
+        time.sleep(poll)
+    return False
+
+def copy_throttled(source, destination, rate=0):
+    """
+        Copies source to destination at no more than rate bytes per second
+        on average, through a temporary file so destination is never half
+        written
+    """
+    tmp_path = destination + ".tmp"
+    started = time.monotonic()
+    copied = 0
+    with open(source, "rb") as reader, open(tmp_path, "wb") as writer:
+        while True:
+            chunk = reader.read(COPY_CHUNK)
+            if not chunk:
+                break
+
+            writer.write(chunk)
+            copied += len(chunk)
+            if rate > 0:
+                ahead = copied / rate - (time.monotonic() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+
+        writer.flush()
+        os.fsync(writer.fileno())
+
+    os.replace(tmp_path, destination)
+    return copied
+
+def move_file(source, destination, rate=0):
+    """
+        Renames source to destination, copying it over (throttled) and
+        removing it only when they're on different filesystems. Returns
+        "renamed" or "copied".
+    """
+    try:
+        os.replace(source, destination)
+        return "renamed"
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+
+    copy_throttled(source, destination, rate)
+    os.remove(source)
+    return "copied"
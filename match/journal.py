@@ -0,0 +1,419 @@
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# SP Imports
+from listeners.tick import GameThread
+
+# Core Imports
+import threading
+import random
+import json
+import time
+import os
+
+# Plugin Imports
+from .pipeline import UploadGraph
+
+# =============================================================================
+# >> JOB STATES
+# =============================================================================
+STATUS_PENDING = "pending"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+TERMINAL = (STATUS_DONE, STATUS_FAILED)
+
+class NotDue(Exception):
+    # The stage is waiting on its backoff or on a stage it requires
+    pass
+
+def process_token():
+    """
+        Tells this process from any earlier one, even one that got the same
+        pid, e.g. srcds restarted in a fresh container
+    """
+    try:
+        with open("/proc/self/stat") as file:
+            # starttime, the 22nd field, counting from after the command name
+            started = file.read().rsplit(")", 1)[1].split()[19]
+    except (OSError, IndexError):
+        started = ""
+    return f"{os.getpid()}:{started}"
+
+# Marks the stages this process is running, a plugin reload keeps the process
+# and the threads of the stages the old journal started
+PROCESS = process_token()
+
+# =============================================================================
+# >> UPLOAD JOB
+# =============================================================================
+class UploadJob(object):
+    """
+        One match's uploads, saved as JSON under the journal directory
+
+            context  what the stages need to know about the match
+            stages   name -> {status, attempts, next_attempt, result, error,
+                     running}, running is the PROCESS running it right now
+            state    name -> scratch space a stage keeps across attempts,
+                     e.g. the parts of a multipart upload
+            metrics  name -> what its last attempt took, see record_attempt()
+    """
+    def __init__(self, path, data):
+        self.path = path
+        self.data = data
+        # Held while changing data, stages run on threads of their own
+        self.lock = threading.RLock()
+        # Stages whose thread is still going, maybe past their timeout
+        self.active = set()
+
+    @property
+    def name(self):
+        return self.data["match"]
+
+    @property
+    def context(self):
+        return self.data["context"]
+
+    def stage(self, name):
+        return self.data["stages"][name]
+
+    def state(self, name):
+        """
+            A copy of the stage's scratch space, hand it back through
+            save_state() to persist it
+        """
+        with self.lock:
+            return json.loads(json.dumps(self.data["state"].get(name, {})))
+
+    def save_state(self, name, state):
+        with self.lock:
+            self.data["state"][name] = json.loads(json.dumps(state))
+            self.save()
+
+    def record_attempt(self, name, metrics):
+        """
+            Keeps metrics of a stage's latest attempt, adding its elapsed
+            time to what earlier attempts took
+        """
+        with self.lock:
+            previous = self.data.setdefault("metrics", {}).get(name, {})
+            metrics = dict(metrics)
+            metrics["total_elapsed"] = round(previous.get("total_elapsed", 0) + metrics.get("elapsed", 0), 3)
+            self.data["metrics"][name] = metrics
+            self.save()
+
+    def reload(self):
+        """
+            Reads the job back from disk, where a stopped journal's stages
+            still write their outcome. Returns False once it's gone.
+        """
+        with self.lock:
+            try:
+                with open(self.path) as file:
+                    self.data = json.load(file)
+            except FileNotFoundError:
+                return False
+        return True
+
+    def running(self):
+        # Stages some journal is running right now
+        return [name for name, stage in self.data["stages"].items() if stage.get("running")]
+
+    def finished(self):
+        return all(stage["status"] in TERMINAL for stage in self.data["stages"].values())
+
+    def save(self):
+        with self.lock:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as file:
+                json.dump(self.data, file, indent=2, sort_keys=True)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, self.path)
+
+# =============================================================================
+# >> UPLOAD JOURNAL
+# =============================================================================
+class UploadJournal(object):
+    """
+        Keeps every match's uploads on disk until they succeed, so a crash,
+        a plugin reload or an unreachable logs.tf/demos.tf/S3 only delays
+        them
+
+        A worker thread hands every due job to a thread of its own, which
+        runs the job's stages through an UploadGraph, so any number of matches
+        upload side by side and a slow one doesn't hold up the next. A
+        failed stage is retried after backoff * 2^attempts seconds (capped at
+        max_backoff) and given up on after max_attempts. A stage that requires
+        others runs once each of them succeeded or failed at least once, and
+        isn't run again when they succeed later. Jobs left over from a
+        previous run are picked up again by start(). on_complete(job) is
+        called once every stage of a job is done or given up on.
+
+        stop() doesn't wait for stages that are running, an upload can take
+        many minutes. They're marked as running in the job, and a journal
+        started again in the same process (a plugin reload) leaves them to
+        the old threads, reading the job back until they're through.
+    """
+    def __init__(self, directory, max_attempts=8, backoff=30, max_backoff=3600, workers=3, on_complete=None):
+        self.directory = directory
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.workers = workers
+        self.on_complete = on_complete
+
+        # name -> (fn(job, values), requires, timeout)
+        self.stages = {}
+        self.jobs = {}
+        # Names of the jobs a thread is working through right now
+        self.processing = set()
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.running = False
+        self.thread = None
+
+    def add_stage(self, name, fn, requires=(), timeout=None):
+        self.stages[name] = (fn, tuple(requires), timeout)
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        for filename in sorted(os.listdir(self.directory)):
+            if not filename.endswith(".json"):
+                continue
+
+            path = os.path.join(self.directory, filename)
+            try:
+                with open(path) as file:
+                    job = UploadJob(path, json.load(file))
+            except (OSError, ValueError) as e:
+                print(f"Match: skipping unreadable upload job {filename}: {e}")
+                continue
+
+            # Stages added since the job was written start out pending
+            for name in self.stages:
+                job.data["stages"].setdefault(name, self._new_stage())
+            for stage in job.data["stages"].values():
+                if stage.get("running") != PROCESS:
+                    # Died with the process that was running it
+                    stage["running"] = None
+            self.jobs[job.name] = job
+
+        if self.jobs:
+            print(f"Match: resuming uploads of {', '.join(self.jobs)}")
+
+        self.running = True
+        self.thread = GameThread(target=self._run, name="match-uploads")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self, timeout=5):
+        if self.thread is None:
+            return
+
+        self.running = False
+        self.wake.set()
+        self.thread.join(timeout)
+        self.thread = None
+
+    @staticmethod
+    def _new_stage():
+        return {"status": STATUS_PENDING, "attempts": 0, "next_attempt": 0, "result": None, "error": None, "running": None}
+
+    def submit(self, name, context, state=None):
+        """
+            Queues the uploads of a match, state seeds the stages' scratch
+            space, e.g. with an upload started while the match was running
+        """
+        data = {
+            "match": name,
+            "created": int(time.time()),
+            "context": context,
+            "stages": {stage: self._new_stage() for stage in self.stages},
+            "state": dict(state or {})
+        }
+        job = UploadJob(os.path.join(self.directory, f"{name}.json"), data)
+        job.save()
+
+        with self.lock:
+            self.jobs[name] = job
+        self.wake.set()
+        return job
+
+    def pending(self):
+        with self.lock:
+            return list(self.jobs.values())
+
+    def idle(self):
+        # Jobs no thread is working on
+        with self.lock:
+            return [job for name, job in self.jobs.items() if name not in self.processing]
+
+    # =========================================================================
+    # >> WORKER THREAD
+    # =========================================================================
+    def _run(self):
+        while self.running:
+            now = time.time()
+            elsewhere = False
+            for job in self.idle():
+                if not job.active and job.running():
+                    # Still running on a stopped journal's threads
+                    if not job.reload():
+                        # Which completed it
+                        with self.lock:
+                            self.jobs.pop(job.name, None)
+                        continue
+                    for name in self.stages:
+                        job.data["stages"].setdefault(name, self._new_stage())
+                    elsewhere = elsewhere or bool(job.running())
+
+                if job.finished():
+                    # Its last stage finished after its pass timed out on
+                    # it, or it was already finished when start() read it
+                    self._complete(job)
+                    continue
+
+                next_attempt = self._next_attempt(job)
+                if next_attempt is None or next_attempt > now:
+                    continue
+
+                with self.lock:
+                    self.processing.add(job.name)
+                thread = GameThread(target=self._process, args=(job,), name=f"match-uploads-{job.name}")
+                thread.daemon = True
+                thread.start()
+
+            # Jobs being processed call wake when they're done
+            waits = [self._next_attempt(job) for job in self.idle()]
+            waits = [attempt - time.time() for attempt in waits if attempt is not None]
+            if elsewhere:
+                # Nothing wakes us when they're done
+                waits.append(5)
+            self.wake.wait(max(1, min(waits)) if waits else None)
+            self.wake.clear()
+
+    def _next_attempt(self, job):
+        """
+            When the next of job's stages can run, None if none can
+            Stages whose requirements haven't been tried yet don't count
+        """
+        due = []
+        for name, (_, requires, _) in self.stages.items():
+            stage = job.stage(name)
+            if stage["status"] != STATUS_PENDING:
+                continue
+
+            if name in job.active or stage.get("running") or not all(self._tried(job, required) for required in requires):
+                # Picked up again once what it waits on calls wake
+                continue
+
+            due.append(stage["next_attempt"])
+        return min(due) if due else None
+
+    @staticmethod
+    def _tried(job, name):
+        """
+            Whether stages requiring name can go ahead: it's done, given up
+            on, or failed at least once and is only waiting on its backoff.
+            Dependents don't wait out every retry of what they require.
+        """
+        stage = job.stage(name)
+        return stage["status"] in TERMINAL or stage["attempts"] > 0
+
+    def _process(self, job):
+        try:
+            graph = UploadGraph(workers=self.workers)
+            for name, (fn, requires, timeout) in self.stages.items():
+                graph.add(name, self._wrap(job, name, fn, requires), requires=requires, timeout=timeout)
+
+            # Stages record their own outcome, one that timed out does so
+            # whenever its thread gets there
+            graph.run()
+
+            # Once stopped, a journal started after this one completes it
+            if job.finished() and self.running:
+                self._complete(job)
+        finally:
+            with self.lock:
+                self.processing.discard(job.name)
+            self.wake.set()
+
+    def _wrap(self, job, name, fn, requires):
+        def run(values):
+            stage = job.stage(name)
+            if stage["status"] == STATUS_DONE:
+                return stage["result"]
+            if stage["status"] == STATUS_FAILED:
+                return None
+
+            if not self.running or name in job.active or stage.get("running") or stage["next_attempt"] > time.time():
+                raise NotDue(name)
+            if not all(self._tried(job, required) for required in requires):
+                raise NotDue(name)
+
+            # Results of earlier runs, not just this pass, None for what
+            # hasn't succeeded (yet)
+            values = {required: job.stage(required)["result"] for required in requires}
+
+            with job.lock:
+                stage["running"] = PROCESS
+                job.save()
+
+            job.active.add(name)
+            try:
+                try:
+                    result = fn(job, values)
+                except Exception as e:
+                    self._failed(job, name, e)
+                    raise
+
+                with job.lock:
+                    stage["status"] = STATUS_DONE
+                    stage["result"] = result
+                    stage["error"] = None
+                    stage["running"] = None
+                    job.save()
+            finally:
+                job.active.discard(name)
+                # Whatever was waiting on this stage may be able to go now,
+                # or the whole job may be finished. Only once its outcome is
+                # saved, or the worker could look before it is.
+                self.wake.set()
+            return result
+
+        return run
+
+    def _failed(self, job, name, error):
+        with job.lock:
+            stage = job.stage(name)
+            stage["attempts"] += 1
+            stage["error"] = str(error)
+            stage["running"] = None
+            if stage["attempts"] >= self.max_attempts:
+                stage["status"] = STATUS_FAILED
+                print(f"Match: giving up on {name} for {job.name} after {stage['attempts']} attempts: {error}")
+            else:
+                delay = min(self.max_backoff, self.backoff * 2 ** (stage["attempts"] - 1))
+                stage["next_attempt"] = time.time() + delay * random.uniform(1.0, 1.1)
+                print(f"Match: {name} for {job.name} failed ({error}), retrying in {delay:.0f}s")
+
+            job.save()
+
+    def _complete(self, job):
+        summary = ", ".join(f"{name} {stage['status']}" for name, stage in job.data["stages"].items())
+        print(f"Match: uploads of {job.name} finished: {summary}")
+
+        if self.on_complete is not None:
+            try:
+                self.on_complete(job)
+            except Exception as e:
+                print(f"Match: completing uploads of {job.name} failed: {e}")
+
+        with self.lock:
+            self.jobs.pop(job.name, None)
+
+        try:
+            os.remove(job.path)
+        except OSError as e:
+            print(f"Match: could not remove upload job {job.path}: {e}")
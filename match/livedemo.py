@@ -0,0 +1,158 @@
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# SP Imports
+from listeners.tick import GameThread
+
+# Core Imports
+import threading
+import hashlib
+import base64
+import time
+import os
+
+# Plugin Imports
+from .multipart import PART_SIZE
+
+# =============================================================================
+# >> LIVE DEMO UPLOAD
+# =============================================================================
+class LiveDemoUpload(object):
+    """
+        Uploads a demo to bucket/key while it's still being recorded
+
+        The demo only ever grows, except for its header, which the engine
+        rewrites on tv_stoprecord. So part 1 (holding the header) is left for
+        the end and parts 2, 3, ... are uploaded as soon as the file has grown
+        past them, at no more than rate bytes per second on average.
+
+        state() is in the format upload_multipart() resumes from, which
+        finishes the upload off at match end: it re-reads the file, skips every
+        part whose md5 still matches and uploads part 1 and the tail. A match
+        that never ends has to abort() it, S3 keeps (and bills) the parts of
+        an unfinished upload until it's aborted.
+    """
+    def __init__(self, get_client, bucket, key, path, part_size=PART_SIZE, rate=0, poll=5.0):
+        # Called on the upload thread, building an S3 client isn't cheap
+        self.get_client = get_client
+        self.client = None
+        self.bucket = bucket
+        self.key = key
+        self.path = path
+        self.part_size = part_size
+        self.rate = rate
+        self.poll = poll
+
+        self.upload_id = None
+        self.parts = []
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.aborting = False
+        self.thread = None
+        self.error = None
+
+    def start(self):
+        self.thread = GameThread(target=self._run, name="match-live-demo")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        # Doesn't wait, a part may be halfway up. join() when it matters.
+        self.stopping.set()
+
+    def abort(self):
+        """
+            Throws the upload away once the part in flight is done, on the
+            upload thread. Doesn't wait either.
+        """
+        self.aborting = True
+        self.stopping.set()
+
+    def join(self, timeout=None):
+        """
+            Waits for the part in flight and returns the upload's state
+        """
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+        return self.state()
+
+    def state(self):
+        with self.lock:
+            if self.upload_id is None:
+                return {}
+            return {"upload_id": self.upload_id, "part_size": self.part_size, "parts": list(self.parts)}
+
+    def _run(self):
+        try:
+            self._upload_parts()
+        finally:
+            if self.aborting:
+                self._abort()
+
+    def _abort(self):
+        with self.lock:
+            upload_id, self.upload_id = self.upload_id, None
+            self.parts = []
+        if upload_id is None:
+            return
+
+        try:
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=upload_id)
+        except Exception as e:
+            print(f"Match: could not abort the live demo upload of {self.key}: {e}")
+
+    def _upload_parts(self):
+        try:
+            self.client = self.get_client()
+            response = self.client.create_multipart_upload(Bucket=self.bucket, Key=self.key, ContentType="application/octet-stream")
+            with self.lock:
+                self.upload_id = response["UploadId"]
+        except Exception as e:
+            print(f"Match: could not start the live demo upload: {e}")
+            self.error = e
+            return
+
+        number = 2
+        while not self.stopping.is_set():
+            try:
+                size = os.path.getsize(self.path)
+            except OSError:
+                size = 0
+
+            # Only parts the demo has fully grown past, never the last one
+            if number * self.part_size >= size:
+                self.stopping.wait(self.poll)
+                continue
+
+            started = time.monotonic()
+            try:
+                self._upload(number)
+            except Exception as e:
+                # Whatever didn't make it up gets uploaded at match end
+                print(f"Match: live demo upload of part {number} failed: {e}")
+                self.error = e
+                self.stopping.wait(self.poll)
+                continue
+
+            number += 1
+            if self.rate > 0:
+                self.stopping.wait(max(0, self.part_size / self.rate - (time.monotonic() - started)))
+
+    def _upload(self, number):
+        with open(self.path, "rb") as file:
+            file.seek((number - 1) * self.part_size)
+            data = file.read(self.part_size)
+
+        digest = hashlib.md5(data)
+        response = self.client.upload_part(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self.upload_id,
+            PartNumber=number,
+            Body=data,
+            ContentMD5=base64.b64encode(digest.digest()).decode("ascii")
+        )
+
+        with self.lock:
+            self.parts.append({"number": number, "etag": response["ETag"], "md5": digest.hexdigest(), "size": len(data)})
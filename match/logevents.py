@@ -0,0 +1,299 @@
+"""
+    Classifies game log lines once for everything that wants them
+
+    The match plugin hooks engine_server.LogPrint and hands every line to
+    LOG_DISPATCHER. Subscribers register for the record types they care
+    about and get small structured records instead of re-matching the raw
+    text themselves:
+
+        from match.logevents import LOG_DISPATCHER, KILL
+
+        def on_kill(record):
+            print(record.attacker.name, "killed", record.victim.name)
+
+        LOG_DISPATCHER.subscribe(on_kill, KILL)
+
+    Subscribing to LINE gets the raw line, unparsed. A line is only run
+    through the patterns of types that have subscribers, and each pattern
+    only after a plain substring check, so lines nobody asked for cost a
+    handful of `in` tests. Subscribers run on the game thread, inside the
+    hook, so they have to be quick.
+
+    This module only uses the standard library, so it can benchmark itself
+    against a recorded log:
+
+        python logevents.py /path/to/matches/some-match.log
+"""
+
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Core Imports
+from collections import namedtuple
+import argparse
+import time
+import sys
+import re
+
+# =============================================================================
+# >> RECORD TYPES
+# =============================================================================
+LINE = "line"
+KILL = "kill"
+DAMAGE = "damage"
+HEAL = "heal"
+UBER = "uber"
+CAPTURE = "capture"
+ROUND = "round"
+SAY = "say"
+
+Player = namedtuple("Player", ("name", "userid", "steamid", "team"))
+
+Kill = namedtuple("Kill", ("attacker", "victim", "weapon", "properties"))
+Damage = namedtuple("Damage", ("attacker", "victim", "damage", "weapon", "airshot", "properties"))
+Heal = namedtuple("Heal", ("healer", "target", "healing"))
+Uber = namedtuple("Uber", ("medic", "medigun"))
+Capture = namedtuple("Capture", ("team", "cp", "cpname", "cappers"))
+Round = namedtuple("Round", ("event", "properties"))
+Say = namedtuple("Say", ("player", "message", "team_only"))
+
+# =============================================================================
+# >> PATTERNS
+# =============================================================================
+# "name<userid><steamid><Team>", the name may contain anything
+PLAYER = r'"(.*?)<(\d+)><([^>]*)><([^>]*)>"'
+
+KILL_PATTERN = re.compile(rf'^{PLAYER} killed {PLAYER} with "([^"]*)"(.*)$')
+DAMAGE_PATTERN = re.compile(rf'^{PLAYER} triggered "damage" against {PLAYER}(.*)$')
+HEAL_PATTERN = re.compile(rf'^{PLAYER} triggered "healed" against {PLAYER} \(healing "(\d+)"\)')
+UBER_PATTERN = re.compile(rf'^{PLAYER} triggered "chargedeployed"(.*)$')
+CAPTURE_PATTERN = re.compile(r'^Team "([^"]*)" triggered "pointcaptured"(.*)$')
+ROUND_PATTERN = re.compile(r'^World triggered "([^"]*)"(.*)$')
+SAY_PATTERN = re.compile(rf'^{PLAYER} (say|say_team) "(.*)"$')
+
+PROPERTY_PATTERN = re.compile(r'\((\w+) "([^"]*)"\)')
+CAPPER_PATTERN = re.compile(r'^player\d+$')
+PLAYER_PATTERN = re.compile(r'^(.*?)<(\d+)><([^>]*)><([^>]*)>$')
+
+def parse_properties(text):
+    # (key "value") (key "value") ...
+    return dict(PROPERTY_PATTERN.findall(text))
+
+def player(groups):
+    name, userid, steamid, team = groups
+    return Player(name, int(userid), steamid, team)
+
+def parse_kill(line):
+    match = KILL_PATTERN.match(line)
+    if match is None:
+        return None
+
+    groups = match.groups()
+    return Kill(player(groups[0:4]), player(groups[4:8]), groups[8], parse_properties(groups[9]))
+
+def parse_damage(line):
+    match = DAMAGE_PATTERN.match(line)
+    if match is None:
+        return None
+
+    groups = match.groups()
+    properties = parse_properties(groups[8])
+    return Damage(
+        player(groups[0:4]),
+        player(groups[4:8]),
+        int(properties.get("damage", 0)),
+        properties.get("weapon", ""),
+        properties.get("airshot") == "1",
+        properties
+    )
+
+def parse_heal(line):
+    match = HEAL_PATTERN.match(line)
+    if match is None:
+        return None
+
+    groups = match.groups()
+    return Heal(player(groups[0:4]), player(groups[4:8]), int(groups[8]))
+
+def parse_uber(line):
+    match = UBER_PATTERN.match(line)
+    if match is None:
+        return None
+
+    groups = match.groups()
+    return Uber(player(groups[0:4]), parse_properties(groups[4]).get("medigun", ""))
+
+def parse_capture(line):
+    match = CAPTURE_PATTERN.match(line)
+    if match is None:
+        return None
+
+    team, rest = match.groups()
+    properties = parse_properties(rest)
+    cappers = []
+    for key, value in properties.items():
+        if CAPPER_PATTERN.match(key):
+            capper = PLAYER_PATTERN.match(value)
+            if capper is not None:
+                cappers.append(player(capper.groups()))
+    return Capture(team, properties.get("cp", ""), properties.get("cpname", ""), tuple(cappers))
+
+def parse_round(line):
+    match = ROUND_PATTERN.match(line)
+    if match is None:
+        return None
+
+    event, rest = match.groups()
+    return Round(event, parse_properties(rest))
+
+def parse_say(line):
+    match = SAY_PATTERN.match(line)
+    if match is None:
+        return None
+
+    groups = match.groups()
+    return Say(player(groups[0:4]), groups[5], groups[4] == "say_team")
+
+# type -> (substring every line of that type contains, parser), in the order
+# they're tried. Chat is free text that can look like any other line, so it's
+# always recognised first, whether anybody subscribed to it or not.
+PARSERS = {
+    SAY: ('" say', parse_say),
+    DAMAGE: ('triggered "damage" against', parse_damage),
+    KILL: ('" killed "', parse_kill),
+    HEAL: ('triggered "healed" against', parse_heal),
+    UBER: ('triggered "chargedeployed"', parse_uber),
+    CAPTURE: ('triggered "pointcaptured"', parse_capture),
+    ROUND: ('World triggered "', parse_round)
+}
+
+# =============================================================================
+# >> LOG DISPATCHER
+# =============================================================================
+class LogDispatcher(object):
+    """
+        Parses each log line at most once and hands the record to the
+        subscribers of its type
+    """
+    def __init__(self):
+        # type -> [callback]
+        self.subscribers = {}
+        # (type, marker, parser) of the types somebody subscribed to
+        self.active = ()
+        self.line_subscribers = ()
+
+    def subscribe(self, callback, *types):
+        for record_type in types:
+            if record_type != LINE and record_type not in PARSERS:
+                raise ValueError(f"Unknown log record type {record_type}")
+
+            callbacks = self.subscribers.setdefault(record_type, [])
+            if callback not in callbacks:
+                callbacks.append(callback)
+
+        self._update()
+        return callback
+
+    def unsubscribe(self, callback, *types):
+        # Every type it's subscribed to unless told otherwise
+        for record_type in types or tuple(self.subscribers):
+            callbacks = self.subscribers.get(record_type, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+        self._update()
+
+    def _update(self):
+        # Rebuilt rather than changed so dispatch() never sees half an update
+        self.line_subscribers = tuple(self.subscribers.get(LINE, ()))
+        active = [
+            (record_type, marker, parser)
+            for record_type, (marker, parser) in PARSERS.items()
+            if self.subscribers.get(record_type)
+        ]
+        if active and not self.subscribers.get(SAY):
+            # Still recognised, so chat can't pass for another type
+            active.insert(0, (SAY,) + PARSERS[SAY])
+        self.active = tuple(active)
+
+    def parse(self, line):
+        """
+            (type, record) of a line, (None, None) if none of the subscribed
+            types matches
+        """
+        for record_type, marker, parser in self.active:
+            if marker in line:
+                record = parser(line)
+                if record is not None:
+                    return record_type, record
+        return None, None
+
+    def dispatch(self, line):
+        for callback in self.line_subscribers:
+            self._call(callback, line)
+
+        if not self.active:
+            return
+
+        record_type, record = self.parse(line.rstrip("\n"))
+        if record is None:
+            return
+
+        # Chat nobody subscribed to was only parsed to rule it out
+        for callback in self.subscribers.get(record_type, ()):
+            self._call(callback, record)
+
+    @staticmethod
+    def _call(callback, value):
+        # One broken subscriber mustn't take the others, or the hook, down
+        try:
+            callback(value)
+        except Exception as e:
+            print(f"Match: log subscriber {getattr(callback, '__name__', callback)} failed: {e}")
+
+LOG_DISPATCHER = LogDispatcher()
+
+# =============================================================================
+# >> BENCHMARK
+# =============================================================================
+# What the match log writer puts in front of every line
+LOG_PREFIX = re.compile(r'^L \d\d/\d\d/\d{4} - \d\d:\d\d:\d\d: ')
+
+def benchmark(path, rounds=5):
+    with open(path, encoding="utf-8", errors="replace") as file:
+        lines = [LOG_PREFIX.sub("", line) for line in file]
+
+    dispatcher = LogDispatcher()
+    counts = dict.fromkeys(PARSERS, 0)
+
+    def counter(record_type):
+        def count(record):
+            counts[record_type] += 1
+        return count
+
+    for record_type in PARSERS:
+        dispatcher.subscribe(counter(record_type), record_type)
+
+    best = None
+    for _ in range(rounds):
+        counts.update(dict.fromkeys(PARSERS, 0))
+        started = time.perf_counter()
+        for line in lines:
+            dispatcher.dispatch(line)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+
+    return len(lines), best, counts
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure how fast a match log is classified into records")
+    parser.add_argument("path", help="A match log, as written to matches/")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    lines, elapsed, counts = benchmark(args.path, args.rounds)
+    print(f"{lines} lines in {elapsed * 1000:.1f}ms, {lines / elapsed:,.0f} lines/s")
+    print(", ".join(f"{record_type} {count}" for record_type, count in counts.items()))
+
+if __name__ == "__main__":
+    sys.exit(main())
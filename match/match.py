@@ -14,41 +14,57 @@ from filters.players import PlayerIter, Player
 from memory import get_virtual_function
 from memory.hooks import PreHook
 from messages import SayText2
-from paths import GAME_PATH
+from paths import GAME_PATH, LOG_PATH
 from entities.entity import Entity
 from weapons.entity import Weapon
 from messages import VGUIMenu
 
 # Core Imports
-from os.path import join
-from shutil import move
+from os.path import join, getsize, isfile
 from time import time
 from enum import Enum
 from datetime import datetime, timedelta
-from zipfile import ZipFile
+import threading
 import re
 import json
 import math
 import warnings
 
-# Third Party Libraries
-import requests
-import boto3
+# Plugin Imports
+from .matchlog import MatchLogWriter
+from .archive import ArchiveStream
+from .journal import UploadJournal, STATUS_DONE
+from .multipart import upload_multipart
+from .livedemo import LiveDemoUpload
+from .matchinfo import Match
+from .logevents import LOG_DISPATCHER, LINE
+from .stats import MatchStats, format_summary
+from .retention import RetentionManager, MB
+from .finalize import wait_closed, move_file
+from .clients import http, s3_client, warm
+from .telemetry import StageMeter, UploadTelemetry, attempt_metrics
+from .demoinfo import check_demo, InvalidDemo
 
 # =============================================================================
 # >> MATCH VARIABLES
 # =============================================================================
 MATCH_IN_PROGRESS = False
 MATCH_COUNTDOWN_IN_PROGRESS = False
-MATCH_NAME = None
-MATCH_MAP_NAME = ""
-MATCH_LOG_URL = None
-
-MATCH_RED_TEAM_NAME = ""
-MATCH_BLUE_TEAM_NAME = ""
-
-MATCH_START_TIME = None
-MATCH_END_TIME = None
+MATCH_LOG = None
+
+# The match being recorded, and the last one that ended
+CURRENT_MATCH = None
+LAST_MATCH = None
+# (match name, logs.tf url) of the last log uploaded, which may be an older
+# match than LAST_MATCH if its uploads are still running
+LAST_LOG = (None, None)
+# Live stats of the match being recorded
+MATCH_STATS = None
+
+UPLOADS = None
+LIVE_DEMO = None
+RETENTION = None
+TELEMETRY = None
 
 # =============================================================================
 # >> CVARS
@@ -58,10 +74,36 @@ CVAR_DISCORD_CHANNEL = ""
 CVAR_LOGSTF_KEY = ""
 CVAR_DEMOSTF_KEY = ""
 CVAR_ARCHIVE_BUCKET = ""
+CVAR_ARCHIVE_RAW = ""
+CVAR_ARCHIVE_COMPRESSION = ""
+CVAR_ARCHIVE_LIVE = ""
+CVAR_ARCHIVE_LIVE_RATE = ""
+CVAR_RETENTION_BUDGET = ""
+CVAR_RETENTION_MIN_FREE = ""
+CVAR_RETENTION_UNARCHIVED = ""
+CVAR_FINALIZE_RATE = ""
+CVAR_MIN_DEMO_SECONDS = ""
 
 CVAR_GAMEMODE = ""
 CVAR_RESERVATION_ID = ""
 
+# =============================================================================
+# >> UPLOAD ENDPOINTS
+# =============================================================================
+# Point these at local stand-ins to test the upload pipeline
+LOGSTF_UPLOAD_URL = "http://logs.tf/upload"
+DEMOSTF_UPLOAD_URL = "https://api.demos.tf/upload"
+DISCORD_API_URL = "https://discordapp.com/api"
+
+# Seconds before upload_all stops waiting on a stage
+UPLOAD_TIMEOUTS = {
+    "demostf": 900,
+    "logstf": 120,
+    "discord": 60,
+    "s3": 1800
+}
+UPLOAD_WORKERS = 3
+
 def threaded(fn):
     def wrapper(*args, **kwargs):
         thread = GameThread(target=fn, args=args, kwargs=kwargs)
@@ -95,7 +137,6 @@ class MatchEnd(ListenerManagerDecorator):
 def on_teamplay_round_start(event):
     global MATCH_IN_PROGRESS
     global MATCH_COUNTDOWN_IN_PROGRESS
-    global MATCH_START_TIME
     
     if MATCH_IN_PROGRESS is True:
         return
@@ -109,7 +150,6 @@ def on_teamplay_round_start(event):
     MATCH_COUNTDOWN_IN_PROGRESS = False
 
     MATCH_IN_PROGRESS = True
-    MATCH_START_TIME = datetime.utcnow()
     MatchStart.manager.notify()
 
 @Event("teamplay_round_restart_seconds")
@@ -123,7 +163,6 @@ def on_teamplay_round_restart_seconds(event):
 @Event("teamplay_game_over") # Only fires when timelimit reached
 def on_tf_game_over(event):
     global MATCH_IN_PROGRESS
-    global MATCH_END_TIME
     global MATCH_COUNTDOWN_IN_PROGRESS
     
     if MATCH_IN_PROGRESS is False:
@@ -137,7 +176,6 @@ def on_tf_game_over(event):
         return
 
     MATCH_IN_PROGRESS = False
-    MATCH_END_TIME = datetime.utcnow()
     MatchEnd.manager.notify()
 
 # TODO Add endmatch command
@@ -151,22 +189,105 @@ def load():
     global CVAR_LOGSTF_KEY
     global CVAR_DEMOSTF_KEY
     global CVAR_ARCHIVE_BUCKET
+    global CVAR_ARCHIVE_RAW
+    global CVAR_ARCHIVE_COMPRESSION
+    global CVAR_ARCHIVE_LIVE
+    global CVAR_ARCHIVE_LIVE_RATE
+    global CVAR_RETENTION_BUDGET
+    global CVAR_RETENTION_MIN_FREE
+    global CVAR_RETENTION_UNARCHIVED
+    global CVAR_FINALIZE_RATE
+    global CVAR_MIN_DEMO_SECONDS
     global CVAR_GAMEMODE
     global CVAR_RESERVATION_ID
+    global UPLOADS
+    global RETENTION
+    global TELEMETRY
     
     CVAR_DISCORD_API_KEY = ConVar("discord_api_key")
     CVAR_DISCORD_CHANNEL = ConVar("discord_channel_id")
     CVAR_LOGSTF_KEY = ConVar("logstf_api_key")
     CVAR_DEMOSTF_KEY = ConVar("demostf_api_key")
     CVAR_ARCHIVE_BUCKET = ConVar("archive_s3_bucket")
+    CVAR_ARCHIVE_RAW = ConVar("archive_s3_raw", "0", description="Also upload the bare .dem and .log next to the archive")
+    CVAR_ARCHIVE_COMPRESSION = ConVar("archive_compression", "6", description="zlib level (0-9) for the match archive")
+    CVAR_ARCHIVE_LIVE = ConVar("archive_live_upload", "0", description="Upload the STV demo to the archive bucket while it's recording instead of a zip at match end")
+    CVAR_ARCHIVE_LIVE_RATE = ConVar("archive_live_rate", "2048", description="KB/s the live demo upload may average, 0 for no limit")
+    CVAR_RETENTION_BUDGET = ConVar("match_retention_budget", "0", description="MB of demos and logs to keep in matches/, 0 for no limit")
+    CVAR_RETENTION_MIN_FREE = ConVar("match_retention_min_free", "0", description="MB to keep free on the matches/ volume, 0 for no limit")
+    CVAR_RETENTION_UNARCHIVED = ConVar("match_retention_evict_unarchived", "0", description="Also delete matches that never made it to the archive when archived ones don't free enough")
+    CVAR_MIN_DEMO_SECONDS = ConVar("match_min_demo_seconds", "60", description="Don't upload demos shorter than this many seconds")
+    CVAR_FINALIZE_RATE = ConVar("match_finalize_rate", "32768", description="KB/s to copy the demo into matches/ at when it's on another filesystem, 0 for no limit")
 
     CVAR_GAMEMODE = ConVar("sp_gamemode")
     CVAR_RESERVATION_ID = ConVar("sp_hostname")
 
+    # logs.tf and demos.tf go up side by side, Discord gets posted as soon as
+    # both succeeded or failed once (with whatever links we got, a retry of
+    # the other one doesn't hold it up). The S3 archive isn't linked
+    # from anything users wait on, so it just runs alongside.
+    # Every match's uploads end up as one match_upload event
+    TELEMETRY = UploadTelemetry(join(LOG_PATH, "match_upload.log"))
+    TELEMETRY.load()
+
+    UPLOADS = UploadJournal(join(GAME_PATH, "matches/uploads"), workers=UPLOAD_WORKERS, on_complete=report_uploads)
+    UPLOADS.add_stage(
+        "demostf",
+        metered("demostf", lambda job, results, meter: upload_to_demostf(job_match(job), meter)),
+        timeout=UPLOAD_TIMEOUTS["demostf"]
+    )
+    UPLOADS.add_stage(
+        "logstf",
+        metered("logstf", lambda job, results, meter: upload_to_logstf(job_match(job), meter)),
+        timeout=UPLOAD_TIMEOUTS["logstf"]
+    )
+    UPLOADS.add_stage("s3", metered("s3", archive_match), timeout=UPLOAD_TIMEOUTS["s3"])
+    UPLOADS.add_stage(
+        "discord",
+        metered("discord", lambda job, results, meter: upload_to_discord(
+            job_match(job), results["logstf"], results["demostf"], archive_url(job_match(job)), meter
+        )),
+        requires=("logstf", "demostf"),
+        timeout=UPLOAD_TIMEOUTS["discord"]
+    )
+    # Picks up whatever a crash or reload left unfinished
+    UPLOADS.start()
+
+    LOG_DISPATCHER.subscribe(write_match_log, LINE)
+
+    # Only archived matches make room unless told otherwise, nothing with
+    # uploads left is touched. Off until a budget or minimum is set.
+    RETENTION = RetentionManager(
+        join(GAME_PATH, "matches"),
+        join(GAME_PATH, "matches/retention/manifest.json"),
+        lambda: (CVAR_RETENTION_BUDGET.get_int() * MB, CVAR_RETENTION_MIN_FREE.get_int() * MB),
+        protected_matches,
+        unarchived=lambda: CVAR_RETENTION_UNARCHIVED.get_bool()
+    )
+    RETENTION.start()
+
     execute_server_command("tv_stoprecord")
 
+    # boto3 and requests are imported off the game thread, before any upload
+    warm()
+
 def unload():
     execute_server_command("tv_stoprecord")
+    LOG_DISPATCHER.unsubscribe(write_match_log)
+    close_match_log()
+
+    if MATCH_STATS is not None:
+        MATCH_STATS.unsubscribe(LOG_DISPATCHER)
+
+    if LIVE_DEMO is not None:
+        # The match won't end, nothing finishes the upload off
+        LIVE_DEMO.abort()
+
+    if UPLOADS is not None:
+        UPLOADS.stop()
+
+    if RETENTION is not None:
+        RETENTION.stop()
 
 # =============================================================================
 # >> Commands
@@ -174,46 +295,110 @@ def unload():
 @TypedSayCommand("!logs")
 @TypedClientCommand("sp_logs")
 def on_showlogs(command_info):
-    global MATCH_LOG_URL
+    global LAST_MATCH
+    global LAST_LOG
 
     # https://github.com/Source-Python-Dev-Team/Source.Python/issues/315
     # Seems to crash if people ask for logs too quickly?
-    if MATCH_LOG_URL is None or not isinstance(MATCH_LOG_URL, str):
+    name, log_url = LAST_LOG
+    if LAST_MATCH is None or name != LAST_MATCH.name or not isinstance(log_url, str):
         SayText2("No log exists yet!").send(command_info.index)
         return
     
-    subkeys = {'title': "Logs", 'type': '2', 'msg': MATCH_LOG_URL}
+    subkeys = {'title': "Logs", 'type': '2', 'msg': log_url}
     VGUIMenu("info", subkeys=subkeys, show=True).send(command_info.index)
 
+@TypedServerCommand("sp_match_retention")
+def on_retention(command_info):
+    run_retention()
+
+@threaded
+def run_retention():
+    print(f"Match: retention {RETENTION.run_pass()}")
+
+@TypedServerCommand("sp_match_upload_stats")
+def on_upload_stats(command_info):
+    lines = TELEMETRY.summary()
+    if not lines:
+        print("Match: no uploads recorded yet")
+    for line in lines:
+        print(f"Match: {line}")
+
+@TypedSayCommand("!stats")
+@TypedClientCommand("sp_stats")
+def on_showstats(command_info):
+    global MATCH_STATS
+    global CURRENT_MATCH
+
+    if MATCH_STATS is None or CURRENT_MATCH is None:
+        SayText2("No match is running!").send(command_info.index)
+        return
+
+    stats = MATCH_STATS.player(Player(command_info.index).steamid)
+    if stats is None:
+        SayText2("No stats for you yet!").send(command_info.index)
+        return
+
+    minutes = max((datetime.utcnow() - CURRENT_MATCH.start).total_seconds() / 60, 1)
+    SayText2(
+        f"{ORANGE}{stats['kills']}{WHITE} kills, {ORANGE}{stats['deaths']}{WHITE} deaths, "
+        f"{ORANGE}{stats['damage']}{WHITE} damage ({stats['damage'] / minutes:.0f}/min), "
+        f"{ORANGE}{stats['heals']}{WHITE} heals, {ORANGE}{stats['ubers']}{WHITE} ubers, "
+        f"{ORANGE}{stats['airshots']}{WHITE} airshots"
+    ).send(command_info.index)
+
 # =============================================================================
 # >> ON LOAD
 # =============================================================================
 @MatchStart
 def on_match_start():
-    global MATCH_NAME
-    global MATCH_IN_PROGRESS
-    global MATCH_NAME
-    global MATCH_MAP_NAME
-    global MATCH_RED_TEAM_NAME
-    global MATCH_BLUE_TEAM_NAME
+    global MATCH_LOG
+    global MATCH_STATS
+    global CURRENT_MATCH
+    global LIVE_DEMO
     
     # Stop any existing recording
     execute_server_command("tv_stoprecord")
 
     # Setup the match logs and demo
-    MATCH_RED_TEAM_NAME = ConVar("mp_tournament_redteamname").get_string()
-    MATCH_BLUE_TEAM_NAME = ConVar("mp_tournament_blueteamname").get_string()
-    gametype, MATCH_MAP_NAME, *version = global_vars.map_name.split("_")
-
-    MATCH_NAME = f"{MATCH_RED_TEAM_NAME}-v-{MATCH_BLUE_TEAM_NAME}-{int(time())}-{MATCH_MAP_NAME}".lower()
+    match = CURRENT_MATCH = Match.begin(
+        ConVar("mp_tournament_redteamname").get_string(),
+        ConVar("mp_tournament_blueteamname").get_string(),
+        global_vars.map_name,
+        GAME_PATH,
+        gamemode=CVAR_GAMEMODE.get_string(),
+        reservation_id=CVAR_RESERVATION_ID.get_string()
+    )
 
     # Start demo recording
-    execute_server_command("tv_record", MATCH_NAME)
-    SayText2(f"Recording STV: {ORANGE}{MATCH_NAME}.dem").send()
+    execute_server_command("tv_record", match.name)
+    SayText2(f"Recording STV: {ORANGE}{match.name}.dem").send()
+
+    if LIVE_DEMO is not None:
+        # Never ended, whatever it uploaded is abandoned
+        LIVE_DEMO.abort()
+        LIVE_DEMO = None
+
+    if CVAR_ARCHIVE_LIVE.get_bool() and CVAR_ARCHIVE_BUCKET.get_string():
+        LIVE_DEMO = LiveDemoUpload(
+            s3_client,
+            CVAR_ARCHIVE_BUCKET.get_string(),
+            f"{match.name}/{match.name}.dem",
+            match.recording_path,
+            rate=CVAR_ARCHIVE_LIVE_RATE.get_int() * 1024
+        )
+        LIVE_DEMO.start()
+
+    # Fed from the same log lines as the match log
+    if MATCH_STATS is not None:
+        MATCH_STATS.unsubscribe(LOG_DISPATCHER)
+    MATCH_STATS = MatchStats()
+    MATCH_STATS.subscribe(LOG_DISPATCHER)
 
     # Create log file
-    open(join(GAME_PATH, f"matches/{MATCH_NAME}.log"), "w").close()
-    SayText2(f"Match log: {ORANGE}{MATCH_NAME}.log").send()
+    close_match_log()
+    MATCH_LOG = MatchLogWriter(match.log_path)
+    SayText2(f"Match log: {ORANGE}{match.name}.log").send()
 
     teams = ["un", "spec", "red", "blue"]
     classes = ["scout", "sniper", "soldier", "demoman", "medic", "heavy", "pyro", "spy", "engineer"]
@@ -235,101 +420,280 @@ def on_match_start():
 
 @MatchEnd
 def on_match_end():
+    global LIVE_DEMO
+    global MATCH_STATS
+    global CURRENT_MATCH
+    global LAST_MATCH
+
+    if CURRENT_MATCH is None:
+        return
+
     # Stop recording
     execute_server_command("tv_stoprecord")
+
+    live_demo, LIVE_DEMO = LIVE_DEMO, None
+    if live_demo is not None:
+        live_demo.stop()
+
     SayText2(f"Game over! Uploading logs and demos...").send()
 
-    move(join(GAME_PATH, f"{MATCH_NAME}.dem"), join(GAME_PATH, "matches"))
-    upload_all()
+    # The log has to be complete on disk before anything uploads it
+    close_match_log()
+
+    # From here on the uploads own it, the next match gets its own
+    stats, MATCH_STATS = MATCH_STATS, None
+    stats.unsubscribe(LOG_DISPATCHER)
+
+    match = LAST_MATCH = CURRENT_MATCH.finish(live_demo=live_demo is not None, stats=stats.summary())
+    CURRENT_MATCH = None
+
+    # Moving the demo can mean copying 200 MB, not on the game thread
+    upload_all(match, live_demo)
 
 # =============================================================================
 # >> Upload Functions
 # =============================================================================
-@threaded
-def upload_all():
-    global MATCH_NAME
-    global CVAR_ARCHIVE_BUCKET
+# Held while moving a demo into matches/, the demo stages may retry that
+# side by side
+FINALIZE_LOCK = threading.Lock()
 
-    # Upload logs to logs.tf and demos.tf
-    demostf_url = upload_to_demostf()
-    logstf_url = upload_to_logstf()
-    s3_url = f"http://{CVAR_ARCHIVE_BUCKET.get_string()}/{MATCH_NAME}/{MATCH_NAME}.zip"
-    upload_to_discord(logstf_url, demostf_url, s3_url)
-
-    # S3 upload / compress could take a while so we don't wanna block notifiyng users if this is just an long term archive
-    upload_to_s3()
+@threaded
+def upload_all(match, live_demo=None):
+    if live_demo is not None:
+        # Done reading the demo by its recording path before it moves
+        live_demo.join()
+    finalize_match(match)
+    submit_uploads(match, live_demo)
+
+def finalize_match(match):
+    """
+        Waits for the engine to finish the demo and moves it into matches/,
+        unless that happened already. Failing leaves it where it is for the
+        next try.
+    """
+    with FINALIZE_LOCK:
+        if isfile(match.demo_path) or not isfile(match.recording_path):
+            # Moved already, or there's nothing to move
+            return
+        move_demo(match)
+
+def move_demo(match):
+    started = time()
+    if not wait_closed(match.recording_path):
+        print(f"Match: {match.name}.dem still open after tv_stoprecord, moving it anyway")
+
+    try:
+        how = move_file(match.recording_path, match.demo_path, CVAR_FINALIZE_RATE.get_int() * 1024)
+    except OSError as e:
+        # The log still goes up, the demo stages fail and retry
+        print(f"Match: could not move {match.name}.dem into matches/: {e}")
+        return
 
-def upload_to_s3():
-    global MATCH_NAME
+    print(f"Match: {match.name}.dem {how} into matches/ in {time() - started:.1f}s")
+
+def submit_uploads(match, live_demo):
+    state = {}
+    if live_demo is not None:
+        # The S3 stage finishes off what was uploaded during the match
+        state["s3"] = live_demo.join()
+    UPLOADS.submit(match.name, match.to_dict(), state)
+
+def job_match(job):
+    return Match.from_dict(job.context, GAME_PATH)
+
+def metered(name, fn):
+    """
+        Runs fn(job, results, meter) as the stage name, keeping what each
+        attempt took with the job
+    """
+    def run(job, results):
+        meter = StageMeter()
+        try:
+            result = fn(job, results, meter)
+        except Exception as e:
+            job.record_attempt(name, attempt_metrics(meter.elapsed(), meter.bytes, "failed", error=str(e)))
+            raise
+
+        job.record_attempt(name, attempt_metrics(meter.elapsed(), meter.bytes, "done"))
+        return result
+
+    return run
+
+def report_uploads(job):
+    match = job_match(job)
+    metrics = job.data.get("metrics", {})
+
+    stages = {}
+    for name, metric in metrics.items():
+        stages[name] = dict(metric)
+
+    for name, stage in job.data["stages"].items():
+        stage_metrics = stages.setdefault(name, {})
+        stage_metrics["outcome"] = stage["status"]
+        # The last attempt of a stage given up on isn't a retry
+        stage_metrics["retries"] = stage["attempts"] if stage["status"] == STATUS_DONE else max(0, stage["attempts"] - 1)
+        if stage["error"]:
+            stage_metrics["error"] = stage["error"]
+
+    TELEMETRY.record({
+        "match": match.name,
+        "map": match.level,
+        "reservation_id": match.reservation_id,
+        "live_demo": match.live_demo,
+        "elapsed": int(time() - job.data["created"]),
+        "stages": stages
+    })
+
+def protected_matches():
+    names = {job.name for job in UPLOADS.pending()}
+    # Recording, or ended and not journaled yet
+    for match in (CURRENT_MATCH, LAST_MATCH):
+        if match is not None:
+            names.add(match.name)
+    return names
+
+def usable_demo(match):
+    """
+        The demo's header, None if it's broken or too short to upload
+
+        Raises OSError if it can't be read, e.g. it never made it into
+        matches/, so the stage fails and the journal retries it
+    """
+    # Moving it when the match ended may have failed, try again
+    finalize_match(match)
+    try:
+        return check_demo(match.demo_path, CVAR_MIN_DEMO_SECONDS.get_float())
+    except InvalidDemo as e:
+        print(f"Match: not uploading {match.name}.dem: {e}")
+        return None
+
+def archive_url(match):
+    extension = "dem" if match.live_demo else "zip"
+    return f"http://{CVAR_ARCHIVE_BUCKET.get_string()}/{match.name}/{match.name}.{extension}"
+
+def archive_match(job, results, meter):
+    match = job_match(job)
+    url = upload_to_s3(match, job, meter)
+    # The first thing retention gets rid of when space runs out
+    RETENTION.archived(match.name)
+    return url
+
+def upload_to_s3(match, job, meter):
     global CVAR_ARCHIVE_BUCKET
     warnings.filterwarnings("ignore", category=ResourceWarning, message="unclosed.*<ssl.SSLSocket.*>")
 
-    demo_path = join(GAME_PATH, f"matches/{MATCH_NAME}.dem")
-    log_path = join(GAME_PATH, f"matches/{MATCH_NAME}.log")
-    zip_path = join(GAME_PATH, f"matches/{MATCH_NAME}.zip")
-    
-    s3 = boto3.client("s3")
-    with open(log_path, "rb") as file:
-        response = s3.put_object(Bucket=CVAR_ARCHIVE_BUCKET.get_string(), Body=file, Key=f"{MATCH_NAME}/{MATCH_NAME}.log")
-        raise_for_status(response)
-
-    with open(demo_path, "rb") as file:
-        response = s3.put_object(Bucket=CVAR_ARCHIVE_BUCKET.get_string(), Body=file, Key=f"{MATCH_NAME}/{MATCH_NAME}.dem")
-        raise_for_status(response)
+    name = match.name
+    demo_path = match.demo_path
+    log_path = match.log_path
     
-    zip = ZipFile(zip_path, "w")
-    zip.write(demo_path)
-    zip.write(log_path)
-    
-    with open(zip_path, "rb") as file:
-        response = s3.put_object(Bucket=CVAR_ARCHIVE_BUCKET.get_string(), Body=file, Key=f"{MATCH_NAME}/{MATCH_NAME}.zip")
-        raise_for_status(response)
+    s3 = s3_client()
+    demo = usable_demo(match)
+    if match.live_demo:
+        # Most of the demo went up while it was recording, only the header
+        # part and the tail are left. The log goes up as is.
+        state = job.state("s3")
+        if demo is not None:
+            with open(demo_path, "rb") as file:
+                sent = upload_multipart(
+                    s3,
+                    CVAR_ARCHIVE_BUCKET.get_string(),
+                    f"{name}/{name}.dem",
+                    file,
+                    state,
+                    lambda: job.save_state("s3", state),
+                    content_type="application/octet-stream"
+                )
+            meter.add(sent)
+        elif state.get("upload_id"):
+            # Throw away what went up while it was recording
+            s3.abort_multipart_upload(Bucket=CVAR_ARCHIVE_BUCKET.get_string(), Key=f"{name}/{name}.dem", UploadId=state["upload_id"])
+            job.save_state("s3", {})
+
+        with open(log_path, "rb") as file:
+            response = s3.put_object(Bucket=CVAR_ARCHIVE_BUCKET.get_string(), Body=file, Key=f"{name}/{name}.log")
+            raise_for_status(response)
+        meter.add(getsize(log_path))
+
+        return archive_url(match)
+
+    if CVAR_ARCHIVE_RAW.get_bool():
+        with open(log_path, "rb") as file:
+            response = s3.put_object(Bucket=CVAR_ARCHIVE_BUCKET.get_string(), Body=file, Key=f"{name}/{name}.log")
+            raise_for_status(response)
+        meter.add(getsize(log_path))
+
+        if demo is not None:
+            with open(demo_path, "rb") as file:
+                response = s3.put_object(Bucket=CVAR_ARCHIVE_BUCKET.get_string(), Body=file, Key=f"{name}/{name}.dem")
+                raise_for_status(response)
+            meter.add(getsize(demo_path))
+
+    # Compressed on the fly and streamed up part by part, nothing is written
+    # to disk and the demo is only read once. The archive comes out the same
+    # every time, so a retry skips the parts the journal says are uploaded.
+    members = {
+        f"{name}.dem": demo_path,
+        f"{name}.log": log_path
+    }
+    if demo is None:
+        # The log is still worth keeping
+        del members[f"{name}.dem"]
+    state = job.state("s3")
+    with ArchiveStream(members, compresslevel=CVAR_ARCHIVE_COMPRESSION.get_int()) as archive:
+        sent = upload_multipart(
+            s3,
+            CVAR_ARCHIVE_BUCKET.get_string(),
+            f"{name}/{name}.zip",
+            archive,
+            state,
+            lambda: job.save_state("s3", state),
+            content_type="application/zip"
+        )
+    meter.add(sent)
+
+    # Compressing runs alongside the upload, its time overlaps with s3's
+    job.record_attempt("zip", attempt_metrics(archive.elapsed, archive.bytes_in, "done", bytes_out=archive.bytes_out))
     
-    return f"http://{CVAR_ARCHIVE_BUCKET.get_string()}/{MATCH_NAME}/{MATCH_NAME}.zip"
-
-def upload_to_logstf():
-    global MATCH_NAME
-    global MATCH_MAP_NAME
-    global MATCH_LOG_URL
-    global MATCH_RED_TEAM_NAME
-    global MATCH_BLUE_TEAM_NAME
+    return archive_url(match)
+
+def upload_to_logstf(match, meter):
+    global LAST_LOG
     global CVAR_LOGSTF_KEY
     
     logs_tf_data = {
-        "title": f"{MATCH_RED_TEAM_NAME} vs {MATCH_BLUE_TEAM_NAME}",
-        "map": global_vars.map_name,
+        "title": match.title,
+        "map": match.level,
         "key": CVAR_LOGSTF_KEY.get_string(),
         "uploader": "SourcePython Match Plugin by Zeus"
     }
-    log_path = join(GAME_PATH, f"matches/{MATCH_NAME}.log")
-
-    with open(log_path, "rb") as file:
-        response = requests.post("http://logs.tf/upload", data=logs_tf_data, files={"logfile": file})
+    with open(match.log_path, "rb") as file:
+        response = http().post(LOGSTF_UPLOAD_URL, data=logs_tf_data, files={"logfile": file})
         response.raise_for_status()
+    meter.add(getsize(match.log_path))
 
     log_id = response.json()['log_id']
     log_url = f"http://logs.tf/{log_id}"
-    MATCH_LOG_URL = log_url
+    LAST_LOG = (match.name, log_url)
     SayText2(f"Logs uploaded to: {ORANGE}{log_url}{WHITE}.\nType {ORANGE}!logs {WHITE}to see stats.").send()
 
     return log_url
 
-def upload_to_demostf():
-    global MATCH_NAME
-    global MATCH_RED_TEAM_NAME
-    global MATCH_BLUE_TEAM_NAME
-    
+def upload_to_demostf(match, meter):
+    # Discord gets posted without a demo link
+    if usable_demo(match) is None:
+        return None
+
     demos_tf_data = {
-        "name": f"{MATCH_RED_TEAM_NAME} vs {MATCH_BLUE_TEAM_NAME}",
-        "red": MATCH_RED_TEAM_NAME,
-        "blu": MATCH_BLUE_TEAM_NAME,
+        "name": match.title,
+        "red": match.red,
+        "blu": match.blue,
         "key": CVAR_DEMOSTF_KEY.get_string()
     }
     
-    demo_path = join(GAME_PATH, f"matches/{MATCH_NAME}.dem")
-    with open(demo_path, "rb") as file:
-        response = requests.post("https://api.demos.tf/upload", data=demos_tf_data, files={"demo": file})
+    with open(match.demo_path, "rb") as file:
+        response = http().post(DEMOSTF_UPLOAD_URL, data=demos_tf_data, files={"demo": file})
         response.raise_for_status()
+    meter.add(getsize(match.demo_path))
     
     demo_id = re.search("[0-9]+$", response.text).group()
     demo_url = f"https://demos.tf/{demo_id}"
@@ -337,24 +701,32 @@ def upload_to_demostf():
 
     return demo_url
 
-def upload_to_discord(logstf_url, demostf_url, archive_url):
-    global MATCH_START_TIME
-    global MATCH_END_TIME
-    global MATCH_MAP_NAME
-    global MATCH_RED_TEAM_NAME
-    global MATCH_BLUE_TEAM_NAME
-    
+def upload_to_discord(match, logstf_url, demostf_url, archive_url, meter):
     global CVAR_DISCORD_CHANNEL
-    global CVAR_GAMEMODE
-    global CVAR_RESERVATION_ID
 
-    elapsed_seconds = (MATCH_END_TIME - MATCH_START_TIME).seconds
+    elapsed_seconds = (match.end - match.start).seconds
     elapsed_time = f"{math.floor(elapsed_seconds/60):02}:{elapsed_seconds % 60:02}"
-    reservation_id = CVAR_RESERVATION_ID.get_string()
+    reservation_id = match.reservation_id
+
+    try:
+        demo = usable_demo(match)
+    except OSError as e:
+        # The demo stages keep retrying, the post doesn't wait for them
+        print(f"Match: could not read {match.name}.dem: {e}")
+        demo = None
+    if demo is None and match.live_demo:
+        # The archive was just the demo, and it didn't go up
+        archive_url = None
     
+    # Any upload that failed is left out rather than holding up the post
+    links = [
+        f"[**{label}**]({url})" if url else f"~~{label}~~"
+        for label, url in (("Logs", logstf_url), ("Demo", demostf_url), ("Archive", archive_url))
+    ]
+
     embed = {
-        "title": f"{MATCH_RED_TEAM_NAME} vs {MATCH_BLUE_TEAM_NAME}",
-        "description": f"*{CVAR_GAMEMODE.get_string()}*\n\n[**Logs**]({logstf_url}) • [**Demo**]({demostf_url}) • [**Archive**]({archive_url})",
+        "title": match.title,
+        "description": f"*{match.gamemode}*\n\n" + " • ".join(links),
         "fields": [
             {
                 "name": "Duration",
@@ -363,7 +735,7 @@ def upload_to_discord(logstf_url, demostf_url, archive_url):
             },
             {
                 "name": "Map",
-                "value": f"{MATCH_MAP_NAME.capitalize()}",
+                "value": f"{match.map.capitalize()}",
                 "inline": True
             },
             {
@@ -372,24 +744,50 @@ def upload_to_discord(logstf_url, demostf_url, archive_url):
                 "inline": True
             }
         ],
-        "timestamp": MATCH_START_TIME.isoformat()
+        "timestamp": match.start.isoformat()
     }
+
+    # What the demo itself says, read from its header
+    if demo is not None:
+        embed["fields"].append({
+            "name": "Demo",
+            "value": f"{demo.map_name} • {demo.duration} • {demo.ticks:,} ticks",
+            "inline": False
+        })
+
+    # Our own numbers, there whether or not logs.tf made it
+    if match.stats and match.stats["players"]:
+        score = match.stats["score"]
+        embed["fields"].append({
+            "name": "Score",
+            "value": f"RED {score.get('Red', 0)} - {score.get('Blue', 0)} BLU",
+            "inline": False
+        })
+        embed["fields"].append({
+            "name": "Stats",
+            "value": format_summary(match.stats, elapsed_seconds),
+            "inline": False
+        })
+
     channel_id = CVAR_DISCORD_CHANNEL.get_string()
-    create_message(channel_id, {"embed": embed})
+    response = create_message(channel_id, {"embed": embed})
+    response.raise_for_status()
+    meter.add(len(response.request.body or ""))
 
 @PreHook(get_virtual_function(engine_server, 'LogPrint'))
 def on_log_print(args):
-    global MATCH_IN_PROGRESS
-    global MATCH_NAME
-
-    if MATCH_IN_PROGRESS is True and MATCH_NAME is not None:
-        message = args[1]
-        with open(join(GAME_PATH, f"matches/{MATCH_NAME}.log"), "a") as file:
-            datestamp = datetime.now().strftime("%m/%d/%Y - %H:%M:%S")
-            file.write(f"L {datestamp}: {message}")
+    # Every line is classified once here, see logevents for subscribing
+    LOG_DISPATCHER.dispatch(args[1])
 
     return EventAction.BLOCK
 
+def write_match_log(line):
+    global MATCH_IN_PROGRESS
+    global MATCH_LOG
+
+    if MATCH_IN_PROGRESS is True and MATCH_LOG is not None:
+        MATCH_LOG.write(line)
+
 # =============================================================================
 # >> Util Functions
 # =============================================================================
@@ -399,6 +797,13 @@ def log_print(message):
 
     engine_server.log_print(message)
 
+def close_match_log():
+    global MATCH_LOG
+
+    if MATCH_LOG is not None:
+        MATCH_LOG.close()
+        MATCH_LOG = None
+
 def create_message(channel_id, message_data, files=None):
     global CVAR_DISCORD_API_KEY
 
@@ -407,12 +812,12 @@ def create_message(channel_id, message_data, files=None):
         "authorization": "Bot " + token,
         "Content-Type": 'application/json'
     }
-    base_url = "https://discordapp.com/api"
+    base_url = DISCORD_API_URL
 
     if isinstance(message_data, dict):
         message_data = json.dumps(message_data)
 
-    return requests.post(
+    return http().post(
         f"{base_url}/channels/{channel_id}/messages",
         data=message_data,
         files=files,
@@ -0,0 +1,117 @@
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Core Imports
+from os.path import join
+from datetime import datetime
+from time import time
+
+# =============================================================================
+# >> MATCH
+# =============================================================================
+class Match(object):
+    """
+        Everything known about one match, fixed once it's created
+
+        The uploads get handed their own Match, so a rematch starting while
+        they're still running can't change what they upload. finish() returns
+        a new Match rather than changing this one. to_dict()/from_dict() is
+        how it's kept in the upload journal.
+    """
+    __slots__ = (
+        "name", "map", "level", "red", "blue", "start", "end",
+        "gamemode", "reservation_id", "live_demo", "directory", "stats"
+    )
+
+    def __init__(self, name, map, level, red, blue, start, directory, end=None, gamemode="", reservation_id="", live_demo=False, stats=None):
+        set_field = super().__setattr__
+        set_field("name", name)
+        set_field("map", map)
+        set_field("level", level)
+        set_field("red", red)
+        set_field("blue", blue)
+        set_field("start", start)
+        set_field("end", end)
+        set_field("gamemode", gamemode)
+        set_field("reservation_id", reservation_id)
+        set_field("live_demo", live_demo)
+        # The game directory, tv_record writes the demo there
+        set_field("directory", directory)
+        # MatchStats.summary() as of the end of the match
+        set_field("stats", stats)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"Match.{name} can't be changed")
+
+    def __repr__(self):
+        return f"<Match {self.name}>"
+
+    @classmethod
+    def begin(cls, red, blue, level, directory, gamemode="", reservation_id=""):
+        gametype, map_name, *version = level.split("_")
+        name = f"{red}-v-{blue}-{int(time())}-{map_name}".lower()
+        return cls(name, map_name, level, red, blue, datetime.utcnow(), directory, gamemode=gamemode, reservation_id=reservation_id)
+
+    def finish(self, live_demo=False, stats=None):
+        return Match(
+            self.name, self.map, self.level, self.red, self.blue, self.start, self.directory,
+            end=datetime.utcnow(),
+            gamemode=self.gamemode,
+            reservation_id=self.reservation_id,
+            live_demo=live_demo,
+            stats=stats
+        )
+
+    @property
+    def finished(self):
+        return self.end is not None
+
+    @property
+    def title(self):
+        return f"{self.red} vs {self.blue}"
+
+    @property
+    def recording_path(self):
+        return join(self.directory, f"{self.name}.dem")
+
+    @property
+    def demo_path(self):
+        return join(self.directory, "matches", f"{self.name}.dem")
+
+    @property
+    def log_path(self):
+        return join(self.directory, "matches", f"{self.name}.log")
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "map": self.map,
+            "level": self.level,
+            "red": self.red,
+            "blue": self.blue,
+            "start": self.start.isoformat(),
+            "end": self.end.isoformat() if self.end is not None else None,
+            "gamemode": self.gamemode,
+            "reservation_id": self.reservation_id,
+            "live_demo": self.live_demo,
+            "directory": self.directory,
+            "stats": self.stats
+        }
+
+    @classmethod
+    def from_dict(cls, data, directory=None):
+        # Jobs journaled before the directory was recorded fall back to ours
+        return cls(
+            data["name"],
+            data["map"],
+            data["level"],
+            data["red"],
+            data["blue"],
+            datetime.fromisoformat(data["start"]),
+            data.get("directory") or directory,
+            end=datetime.fromisoformat(data["end"]) if data.get("end") else None,
+            gamemode=data.get("gamemode", ""),
+            reservation_id=data.get("reservation_id", ""),
+            live_demo=bool(data.get("live_demo")),
+            stats=data.get("stats")
+        )
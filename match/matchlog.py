@@ -0,0 +1,93 @@
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# SP Imports
+from listeners.tick import GameThread
+
+# Core Imports
+from datetime import datetime
+import threading
+import time
+
+# =============================================================================
+# >> MATCH LOG WRITER
+# =============================================================================
+class MatchLogWriter(object):
+    """
+        Writes the match log through one open handle
+        write() runs on the game thread for every log line, so it only
+        prefixes the line and appends it to a buffer. A background thread
+        writes the buffer out every flush_interval seconds, or sooner once
+        max_buffer lines are waiting.
+    """
+    def __init__(self, path, flush_interval=0.5, max_buffer=512):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+
+        self.file = open(path, "w", encoding="utf-8", errors="replace")
+        self.buffer = []
+        self.lock = threading.Lock()
+        # Held while touching the file, close() and the thread may both flush
+        self.file_lock = threading.Lock()
+        self.wake = threading.Event()
+        self.closed = False
+
+        # The log timestamp only changes once a second
+        self.second = None
+        self.prefix = ""
+
+        self.lines = 0
+        self.thread = GameThread(target=self._run, name="match-log")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def write(self, message):
+        now = int(time.time())
+        if now != self.second:
+            self.second = now
+            self.prefix = datetime.fromtimestamp(now).strftime("L %m/%d/%Y - %H:%M:%S: ")
+
+        with self.lock:
+            if self.closed:
+                return
+            self.buffer.append(self.prefix + message)
+            waiting = len(self.buffer)
+
+        if waiting >= self.max_buffer:
+            self.wake.set()
+
+    def flush(self):
+        with self.lock:
+            buffer, self.buffer = self.buffer, []
+
+        if buffer:
+            with self.file_lock:
+                self.file.write("".join(buffer))
+                self.file.flush()
+            self.lines += len(buffer)
+
+    def close(self, timeout=5):
+        """
+            Writes out everything buffered and closes the file
+            Once this returns the log is complete on disk
+        """
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+
+        self.wake.set()
+        self.thread.join(timeout)
+        self.flush()
+        with self.file_lock:
+            self.file.close()
+
+    def _run(self):
+        while not self.closed:
+            self.wake.wait(self.flush_interval)
+            self.wake.clear()
+            try:
+                self.flush()
+            except (OSError, ValueError) as e:
+                print(f"Match: failed to write {self.path}: {e}")
@@ -0,0 +1,103 @@
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Core Imports
+import hashlib
+import base64
+
+# =============================================================================
+# >> RESUMABLE MULTIPART UPLOAD
+# =============================================================================
+# S3 needs at least 5 MB per part except the last
+PART_SIZE = 16 * 1024 * 1024
+
+class UploadExpired(Exception):
+    # The multipart upload we were resuming no longer exists on the server
+    pass
+
+def read_part(stream, size):
+    chunks = []
+    remaining = size
+    while remaining > 0:
+        chunk = stream.read(remaining)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+def error_code(exception):
+    # botocore's ClientError without importing botocore
+    return getattr(exception, "response", {}).get("Error", {}).get("Code")
+
+def upload_multipart(client, bucket, key, stream, state, save, part_size=PART_SIZE, content_type=None):
+    """
+        Uploads stream to bucket/key part by part, resuming whatever upload
+        state describes
+
+        state is a dict the caller persists through save(), called after every
+        finished part. It records the upload id and (number, etag, md5, size)
+        of every part. The stream must produce the same bytes every time. A
+        part whose md5 matches the one already uploaded is skipped, anything
+        else is uploaded again. Every part carries a Content-MD5 so the server
+        rejects anything corrupted on the way.
+
+        Raises UploadExpired (after resetting state) when the server forgot
+        about the upload, the next attempt starts over. Returns the number of
+        bytes actually sent, skipped parts don't count.
+    """
+    if state.get("upload_id") is None or state.get("part_size") != part_size:
+        extra = {"ContentType": content_type} if content_type else {}
+        response = client.create_multipart_upload(Bucket=bucket, Key=key, **extra)
+        state.clear()
+        state.update(upload_id=response["UploadId"], part_size=part_size, parts=[])
+        save()
+
+    uploaded = {part["number"]: part for part in state["parts"]}
+    parts = []
+    sent = 0
+    number = 1
+    while True:
+        data = read_part(stream, part_size)
+        if not data and number > 1:
+            break
+
+        digest = hashlib.md5(data)
+        part = uploaded.get(number)
+        if part is None or part["md5"] != digest.hexdigest() or part["size"] != len(data):
+            try:
+                response = client.upload_part(
+                    Bucket=bucket,
+                    Key=key,
+                    UploadId=state["upload_id"],
+                    PartNumber=number,
+                    Body=data,
+                    ContentMD5=base64.b64encode(digest.digest()).decode("ascii")
+                )
+            except Exception as e:
+                if error_code(e) == "NoSuchUpload":
+                    state.clear()
+                    save()
+                    raise UploadExpired(f"multipart upload of {key} expired") from e
+                raise
+
+            part = {"number": number, "etag": response["ETag"], "md5": digest.hexdigest(), "size": len(data)}
+            sent += len(data)
+            uploaded[number] = part
+            state["parts"] = sorted(uploaded.values(), key=lambda item: item["number"])
+            save()
+
+        parts.append(part)
+        number += 1
+        if len(data) < part_size:
+            break
+
+    client.complete_multipart_upload(
+        Bucket=bucket,
+        Key=key,
+        UploadId=state["upload_id"],
+        MultipartUpload={"Parts": [{"ETag": part["etag"], "PartNumber": part["number"]} for part in parts]}
+    )
+    state.clear()
+    save()
+    return sent
@@ -0,0 +1,131 @@
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# SP Imports
+from listeners.tick import GameThread
+
+# Core Imports
+import threading
+import time
+
+# =============================================================================
+# >> STAGE RESULTS
+# =============================================================================
+STATUS_OK = "ok"
+STATUS_FAILED = "failed"
+STATUS_TIMEOUT = "timeout"
+
+class StageResult(object):
+    __slots__ = ("name", "status", "value", "error", "elapsed")
+
+    def __init__(self, name, status, value=None, error=None, elapsed=0.0):
+        self.name = name
+        self.status = status
+        self.value = value
+        self.error = error
+        self.elapsed = elapsed
+
+    def __str__(self):
+        text = f"{self.name} {self.status} after {self.elapsed:.1f}s"
+        if self.error is not None:
+            text += f": {self.error}"
+        return text
+
+class Stage(object):
+    __slots__ = ("name", "fn", "requires", "timeout")
+
+    def __init__(self, name, fn, requires=(), timeout=None):
+        self.name = name
+        self.fn = fn
+        self.requires = tuple(requires)
+        self.timeout = timeout
+
+# =============================================================================
+# >> UPLOAD GRAPH
+# =============================================================================
+class UploadGraph(object):
+    """
+        Runs upload stages as soon as the stages they require are done, at
+        most workers at a time
+
+        A stage is called with {name: value} of the stages it requires, value
+        is None for any that failed or timed out, so it can carry on with what
+        it got. A stage running past its timeout is reported as such and its
+        dependents go ahead without it. Its thread can't be stopped and
+        finishes in the background.
+    """
+    def __init__(self, workers=3):
+        self.workers = max(1, workers)
+        self.stages = {}
+
+    def add(self, name, fn, requires=(), timeout=None):
+        for required in requires:
+            if required not in self.stages:
+                raise ValueError(f"Stage {name} requires unknown stage {required}")
+
+        self.stages[name] = Stage(name, fn, requires, timeout)
+
+    def run(self):
+        """
+            Runs every stage, returns {name: StageResult} once all of them
+            finished or timed out
+        """
+        condition = threading.Condition()
+        pending = dict(self.stages)
+        # name -> (started, deadline)
+        running = {}
+        finished = []
+        results = {}
+
+        def execute(stage, values, started):
+            try:
+                result = StageResult(stage.name, STATUS_OK, stage.fn(values))
+            except Exception as e:
+                result = StageResult(stage.name, STATUS_FAILED, error=e)
+
+            result.elapsed = time.monotonic() - started
+            with condition:
+                finished.append(result)
+                condition.notify()
+
+        with condition:
+            while pending or running:
+                for stage in list(pending.values()):
+                    if len(running) >= self.workers:
+                        break
+                    if not all(required in results for required in stage.requires):
+                        continue
+
+                    del pending[stage.name]
+                    values = {required: results[required].value for required in stage.requires}
+                    started = time.monotonic()
+                    deadline = started + stage.timeout if stage.timeout else None
+                    running[stage.name] = (started, deadline)
+
+                    thread = GameThread(target=execute, args=(stage, values, started), name=f"match-upload-{stage.name}")
+                    thread.daemon = True
+                    thread.start()
+
+                if not running:
+                    # Nothing left can ever become ready
+                    break
+
+                deadlines = [deadline for _, deadline in running.values() if deadline is not None]
+                timeout = max(0, min(deadlines) - time.monotonic()) if deadlines else None
+                if not finished:
+                    condition.wait(timeout)
+
+                for result in finished:
+                    # Late results of stages that already timed out are dropped
+                    if result.name in running:
+                        del running[result.name]
+                        results[result.name] = result
+                finished.clear()
+
+                now = time.monotonic()
+                for name, (started, deadline) in list(running.items()):
+                    if deadline is not None and now >= deadline:
+                        del running[name]
+                        results[name] = StageResult(name, STATUS_TIMEOUT, elapsed=now - started)
+
+        return {name: results[name] for name in self.stages if name in results}
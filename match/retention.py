@@ -0,0 +1,244 @@
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# SP Imports
+from listeners.tick import GameThread
+
+# Core Imports
+import threading
+import shutil
+import json
+import time
+import os
+
+# =============================================================================
+# >> RETENTION REPORT
+# =============================================================================
+MB = 1024 * 1024
+
+class RetentionReport(object):
+    __slots__ = ("reclaimed", "evicted", "used", "free", "shortfall", "elapsed")
+
+    def __init__(self):
+        self.reclaimed = 0
+        self.evicted = []
+        self.used = 0
+        self.free = 0
+        # Bytes still over the limits with nothing left that may be evicted
+        self.shortfall = 0
+        self.elapsed = 0.0
+
+    def __str__(self):
+        text = f"reclaimed {self.reclaimed / MB:.0f} MB"
+        if self.evicted:
+            text += f" from {', '.join(self.evicted)}"
+        text += f", {self.used / MB:.0f} MB used, {self.free / MB:.0f} MB free"
+        if self.shortfall:
+            text += f", still {self.shortfall / MB:.0f} MB over with nothing left to evict"
+        return text
+
+# =============================================================================
+# >> RETENTION MANAGER
+# =============================================================================
+class RetentionManager(object):
+    """
+        Deletes old matches from directory to keep it under a byte budget and
+        the volume above a minimum of free space
+
+        limits() returns (budget, min_free) in bytes, 0 for no limit, and is
+        asked every pass so ConVar changes apply right away. protected()
+        returns the names of matches that mustn't be touched: the one
+        recording and any with uploads in the journal.
+
+        Only matches whose archive upload went through (see archived()) go,
+        oldest first. Matches that never made it to the archive, which
+        includes everything recorded before retention existed, are only
+        deleted if unarchived() says so and the archived ones weren't
+        enough, again oldest first.
+
+        The manifest (at manifest_path, outside directory, or saving it would
+        change the directory's mtime) remembers every match's files and
+        sizes. A pass only lists the directory when its mtime changed, and
+        only stats files it hasn't seen and those of matches that aren't
+        archived yet, as only those can still grow.
+    """
+    def __init__(self, directory, manifest_path, limits, protected, unarchived=None, interval=300):
+        self.directory = directory
+        self.limits = limits
+        self.protected = protected
+        self.unarchived = unarchived or (lambda: False)
+        self.interval = interval
+
+        self.path = manifest_path
+        self.manifest = {"directory_mtime": None, "matches": {}}
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.running = False
+        self.thread = None
+        self.last_report = None
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        try:
+            with open(self.path) as file:
+                self.manifest = json.load(file)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"Match: rebuilding unreadable retention manifest: {e}")
+
+        self.running = True
+        self.thread = GameThread(target=self._run, name="match-retention")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self, timeout=5):
+        if self.thread is None:
+            return
+
+        self.running = False
+        self.wake.set()
+        self.thread.join(timeout)
+        self.thread = None
+
+    def archived(self, name):
+        """
+            Marks a match as safely uploaded, it's evicted before anything else
+        """
+        with self.lock:
+            self.manifest["matches"].setdefault(name, self._new_match())["archived"] = True
+            self._save()
+
+    def _run(self):
+        while self.running:
+            try:
+                self.run_pass()
+            except Exception as e:
+                print(f"Match: retention pass failed: {e}")
+
+            self.wake.wait(self.interval)
+            self.wake.clear()
+
+    @staticmethod
+    def _new_match():
+        return {"files": {}, "created": time.time(), "archived": False}
+
+    # =========================================================================
+    # >> PASS
+    # =========================================================================
+    def run_pass(self):
+        started = time.monotonic()
+        report = RetentionReport()
+        budget, min_free = self.limits()
+
+        with self.lock:
+            self._refresh()
+            matches = self.manifest["matches"]
+            report.used = sum(sum(match["files"].values()) for match in matches.values())
+            report.free = shutil.disk_usage(self.directory).free
+
+            excess = max(report.used - budget if budget else 0, min_free - report.free if min_free else 0)
+            if excess > 0:
+                protected = set(self.protected())
+                unarchived = self.unarchived()
+                candidates = [
+                    name for name in matches
+                    if name not in protected and matches[name]["files"] and (unarchived or matches[name]["archived"])
+                ]
+                # Archived before given up on, oldest first within each
+                candidates.sort(key=lambda name: (not matches[name]["archived"], matches[name]["created"]))
+
+                for name in candidates:
+                    if report.reclaimed >= excess:
+                        break
+
+                    if not matches[name]["archived"]:
+                        print(f"Match: evicting {name}, which never made it to the archive")
+
+                    reclaimed = self._evict(name)
+                    report.reclaimed += reclaimed
+                    report.evicted.append(name)
+
+                report.used -= report.reclaimed
+                report.free += report.reclaimed
+                report.shortfall = max(0, excess - report.reclaimed)
+
+            self._save()
+
+        report.elapsed = time.monotonic() - started
+        self.last_report = report
+        if report.evicted or report.shortfall:
+            print(f"Match: retention {report}")
+        return report
+
+    def _refresh(self):
+        matches = self.manifest["matches"]
+        mtime = os.stat(self.directory).st_mtime_ns
+        if mtime != self.manifest["directory_mtime"]:
+            self.manifest["directory_mtime"] = mtime
+
+            seen = {}
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if not entry.is_file(follow_symlinks=False) or entry.name.endswith(".tmp"):
+                        continue
+                    name = os.path.splitext(entry.name)[0]
+                    seen.setdefault(name, []).append(entry.name)
+
+            for name in list(matches):
+                if name not in seen:
+                    # Gone, unless it's an archived mark whose files are yet
+                    # to show up
+                    if matches[name]["files"] or not matches[name]["archived"]:
+                        del matches[name]
+
+            for name, filenames in seen.items():
+                match = matches.setdefault(name, self._new_match())
+                for filename in list(match["files"]):
+                    if filename not in filenames:
+                        del match["files"][filename]
+                for filename in filenames:
+                    if filename not in match["files"]:
+                        self._stat(match, filename)
+
+        # Archived files don't change anymore, the rest may still be growing
+        for match in matches.values():
+            if not match["archived"]:
+                for filename in list(match["files"]):
+                    self._stat(match, filename)
+
+    def _stat(self, match, filename):
+        try:
+            stat = os.stat(os.path.join(self.directory, filename))
+        except FileNotFoundError:
+            match["files"].pop(filename, None)
+            return
+
+        match["files"][filename] = stat.st_size
+        match["created"] = min(match["created"], stat.st_mtime)
+
+    def _evict(self, name):
+        match = self.manifest["matches"][name]
+        reclaimed = 0
+        for filename, size in list(match["files"].items()):
+            try:
+                os.remove(os.path.join(self.directory, filename))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Match: could not evict {filename}: {e}")
+                continue
+
+            reclaimed += size
+            del match["files"][filename]
+
+        if not match["files"]:
+            del self.manifest["matches"][name]
+        return reclaimed
+
+    def _save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(self.manifest, file)
+        os.replace(tmp_path, self.path)
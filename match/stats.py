@@ -0,0 +1,167 @@
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Core Imports
+from array import array
+
+# Plugin Imports
+from .logevents import KILL, DAMAGE, HEAL, UBER, ROUND
+
+# =============================================================================
+# >> MATCH STATS
+# =============================================================================
+COLUMNS = ("kills", "deaths", "damage", "heals", "ubers", "airshots")
+
+# Round events that close a round
+ROUND_ENDS = ("Round_Win", "Round_Stalemate")
+
+class MatchStats(object):
+    """
+        Running per-player totals of a match, fed by the log dispatcher
+
+        Every player gets a slot the first time they show up in the log,
+        keyed by SteamID so a reconnect lands in the same slot. Each stat is
+        one array indexed by slot. When a round ends the arrays are copied,
+        so per-round numbers are the difference of two snapshots.
+
+        Everything runs on the game thread, inside the LogPrint hook.
+    """
+    def __init__(self):
+        # steamid -> slot
+        self.slots = {}
+        self.steamids = []
+        self.names = []
+        self.teams = []
+        self.columns = {column: array("l") for column in COLUMNS}
+        # {"winner", column: copy of the column} at the end of each round
+        self.rounds = []
+
+        self.kills = self.columns["kills"]
+        self.deaths = self.columns["deaths"]
+        self.damage = self.columns["damage"]
+        self.heals = self.columns["heals"]
+        self.ubers = self.columns["ubers"]
+        self.airshots = self.columns["airshots"]
+
+    def subscribe(self, dispatcher):
+        dispatcher.subscribe(self.on_kill, KILL)
+        dispatcher.subscribe(self.on_damage, DAMAGE)
+        dispatcher.subscribe(self.on_heal, HEAL)
+        dispatcher.subscribe(self.on_uber, UBER)
+        dispatcher.subscribe(self.on_round, ROUND)
+
+    def unsubscribe(self, dispatcher):
+        for callback in (self.on_kill, self.on_damage, self.on_heal, self.on_uber, self.on_round):
+            dispatcher.unsubscribe(callback)
+
+    def _slot(self, player):
+        slot = self.slots.get(player.steamid)
+        if slot is None:
+            slot = self.slots[player.steamid] = len(self.steamids)
+            self.steamids.append(player.steamid)
+            self.names.append(player.name)
+            self.teams.append(player.team)
+            for column in self.columns.values():
+                column.append(0)
+        else:
+            # Whatever they're called and playing for now
+            self.names[slot] = player.name
+            self.teams[slot] = player.team
+        return slot
+
+    # =========================================================================
+    # >> LOG RECORDS
+    # =========================================================================
+    def on_kill(self, record):
+        victim = self._slot(record.victim)
+        self.deaths[victim] += 1
+        if record.attacker.steamid != record.victim.steamid:
+            self.kills[self._slot(record.attacker)] += 1
+
+    def on_damage(self, record):
+        attacker = self._slot(record.attacker)
+        self.damage[attacker] += record.damage
+        if record.airshot:
+            self.airshots[attacker] += 1
+
+    def on_heal(self, record):
+        self.heals[self._slot(record.healer)] += record.healing
+
+    def on_uber(self, record):
+        self.ubers[self._slot(record.medic)] += 1
+
+    def on_round(self, record):
+        if record.event not in ROUND_ENDS:
+            return
+
+        snapshot = {column: values[:] for column, values in self.columns.items()}
+        snapshot["winner"] = record.properties.get("winner")
+        self.rounds.append(snapshot)
+
+    # =========================================================================
+    # >> QUERIES
+    # =========================================================================
+    def player(self, steamid, round_number=None):
+        """
+            {name, team, kills, ...} of a player, for the whole match or the
+            given round (1 based, the last round may still be running), None
+            if they haven't done anything yet
+        """
+        slot = self.slots.get(steamid)
+        if slot is None:
+            return None
+
+        if round_number is None:
+            current, previous = self.columns, None
+        else:
+            current = self.rounds[round_number - 1] if round_number <= len(self.rounds) else self.columns
+            previous = self.rounds[round_number - 2] if round_number >= 2 else None
+
+        stats = {"steamid": steamid, "name": self.names[slot], "team": self.teams[slot]}
+        for column in COLUMNS:
+            value = current[column][slot] if slot < len(current[column]) else 0
+            if previous is not None and slot < len(previous[column]):
+                value -= previous[column][slot]
+            stats[column] = value
+        return stats
+
+    def score(self):
+        score = {}
+        for snapshot in self.rounds:
+            if snapshot["winner"]:
+                score[snapshot["winner"]] = score.get(snapshot["winner"], 0) + 1
+        return score
+
+    def summary(self):
+        """
+            The whole match as plain data, to be journaled with the uploads
+        """
+        players = [self.player(steamid) for steamid in self.steamids]
+        # Spectators that only ever got healed by accident don't count
+        players = [player for player in players if player["team"] in ("Red", "Blue")]
+        players.sort(key=lambda player: (player["team"], -player["damage"]))
+
+        return {
+            "score": self.score(),
+            "rounds": [snapshot["winner"] for snapshot in self.rounds],
+            "players": players
+        }
+
+def format_summary(summary, duration, limit=1024):
+    """
+        The summary as a fixed width table for the Discord embed, cut off to
+        fit limit characters
+    """
+    minutes = max(duration / 60, 1)
+    lines = ["```", f"{'Player':<16} {'K':>3} {'D':>3} {'DPM':>4} {'Heals':>6} {'Ub':>2} {'AS':>2}"]
+    for player in summary["players"]:
+        line = (
+            f"{player['name'][:16]:<16} {player['kills']:>3} {player['deaths']:>3}"
+            f" {player['damage'] / minutes:>4.0f} {player['heals']:>6} {player['ubers']:>2} {player['airshots']:>2}"
+        )
+        if sum(len(text) + 1 for text in lines) + len(line) + 5 > limit:
+            break
+        lines.append(line)
+
+    lines.append("```")
+    return "\n".join(lines)
@@ -0,0 +1,125 @@
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Core Imports
+from collections import deque
+import threading
+import json
+import time
+import os
+
+# =============================================================================
+# >> STAGE METER
+# =============================================================================
+class StageMeter(object):
+    """
+        Handed to an upload stage to count what it sends
+    """
+    __slots__ = ("bytes", "started")
+
+    def __init__(self):
+        self.bytes = 0
+        self.started = time.monotonic()
+
+    def add(self, count):
+        self.bytes += count
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+def attempt_metrics(elapsed, size, outcome, **extra):
+    metrics = {
+        "elapsed": round(elapsed, 3),
+        "bytes": size,
+        "throughput": round(size / elapsed) if elapsed > 0 else 0,
+        "outcome": outcome
+    }
+    metrics.update(extra)
+    return metrics
+
+# =============================================================================
+# >> UPLOAD TELEMETRY
+# =============================================================================
+def percentile(values, point):
+    # Nearest rank, values sorted
+    if not values:
+        return 0
+    rank = max(0, min(len(values) - 1, round(point / 100 * len(values) + 0.5) - 1))
+    return values[rank]
+
+class UploadTelemetry(object):
+    """
+        Writes one match_upload event per match to path, in the logger
+        plugin's JSON lines format, and keeps the last window of them per
+        stage for percentiles
+    """
+    def __init__(self, path, window=100):
+        self.path = path
+        self.window = window
+        # stage -> deque of that stage's metrics
+        self.samples = {}
+        self.lock = threading.Lock()
+
+    def load(self):
+        """
+            Picks the rolling window back up from the log
+        """
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                lines = deque(file, maxlen=self.window)
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            print(f"Match: could not read upload telemetry {self.path}: {e}")
+            return
+
+        for line in lines:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            if message.get("event_name") == "match_upload":
+                self._add(message["event"])
+
+    def record(self, event):
+        message = {
+            "time": int(time.time()),
+            "event_name": "match_upload",
+            "event": event
+        }
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as file:
+                file.write(json.dumps(message) + "\n")
+        except OSError as e:
+            print(f"Match: could not write upload telemetry: {e}")
+
+        self._add(event)
+
+    def _add(self, event):
+        with self.lock:
+            for stage, metrics in event.get("stages", {}).items():
+                samples = self.samples.setdefault(stage, deque(maxlen=self.window))
+                samples.append(metrics)
+
+    def summary(self, points=(50, 90, 99)):
+        """
+            One line per stage: outcomes, retries and percentiles of wall time
+            and throughput over the window
+        """
+        with self.lock:
+            samples = {stage: list(values) for stage, values in self.samples.items()}
+
+        lines = []
+        for stage, values in sorted(samples.items()):
+            elapsed = sorted(metrics.get("elapsed", 0) for metrics in values)
+            throughput = sorted(metrics.get("throughput", 0) for metrics in values if metrics.get("bytes"))
+            ok = sum(1 for metrics in values if metrics.get("outcome") == "done")
+            retries = sum(metrics.get("retries", 0) for metrics in values)
+
+            text = f"{stage:<8} n={len(values)} ok={ok} retries={retries}"
+            text += " time " + " ".join(f"p{point}={percentile(elapsed, point):.1f}s" for point in points)
+            if throughput:
+                text += " rate " + " ".join(f"p{point}={percentile(throughput, point) / 1024:.0f}KB/s" for point in points)
+            lines.append(text)
+        return lines
@@ -0,0 +1,26 @@
+"""
+    Lets the plugins' modules import outside of srcds
+
+    Only the Source.Python names the tested modules use are stubbed: their
+    GameThread is a plain thread here. The plugins are namespace packages
+    under the repository root, imported the way Source.Python does.
+"""
+import threading
+import types
+import sys
+import os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+try:
+    import listeners.tick
+except ImportError:
+    listeners = types.ModuleType("listeners")
+    listeners.__path__ = []
+    tick = types.ModuleType("listeners.tick")
+    tick.GameThread = threading.Thread
+    listeners.tick = tick
+    sys.modules["listeners"] = listeners
+    sys.modules["listeners.tick"] = tick
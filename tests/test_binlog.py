@@ -0,0 +1,46 @@
+import io
+
+import pytest
+
+from logger.binlog import BinaryCodec, read_records
+
+
+def write(codec, records):
+    data = codec.begin(True)
+    for record in records:
+        data += codec.encode(record)
+    return data
+
+
+def test_round_trip():
+    records = [
+        {"time": 1, "event_name": "player_say", "event": {"steamid": "[U:1:1234]", "text": "gg", "team": 2}},
+        {"time": 2, "event_name": "player_death", "event": {"attacker": "[U:1:1]", "crit": True, "damage": -1.5, "assist": None}},
+        {"time": 3, "event_name": "level_init", "event": {"maps": ["cp_process_final", "koth_product_final"]}}
+    ]
+    codec = BinaryCodec()
+    assert list(read_records(io.BytesIO(write(codec, records)))) == records
+
+
+def test_failed_record_gives_back_its_string_ids():
+    codec = BinaryCodec()
+    data = codec.begin(True)
+    data += codec.encode({"time": 1, "event_name": "first", "event": {"a": 1}})
+    strings = dict(codec.strings)
+
+    # Interns "broken" and "key" before it gets to the value it can't encode
+    with pytest.raises(TypeError):
+        codec.encode({"time": 2, "event_name": "broken", "event": {"key": object()}})
+    assert codec.strings == strings
+
+    # Had the ids leaked, these would point at strings the file never defined
+    data += codec.encode({"time": 3, "event_name": "after", "event": {"key": "value"}})
+    records = list(read_records(io.BytesIO(data)))
+    assert records[-1] == {"time": 3, "event_name": "after", "event": {"key": "value"}}
+
+
+def test_partial_record_at_the_end_is_ignored():
+    codec = BinaryCodec()
+    data = write(codec, [{"time": t, "event_name": "tick", "event": {"n": t}} for t in range(3)])
+    records = list(read_records(io.BytesIO(data[:-2]), chunk_size=7))
+    assert [record["time"] for record in records] == [0, 1]
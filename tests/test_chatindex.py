@@ -0,0 +1,126 @@
+import gzip
+import json
+import time
+import os
+
+from logger.chatindex import ChatIndex, search, load_manifest
+from logger.writer import FileSink, LogRotator
+
+
+def chat(timestamp, message, steamid="[U:1:5]"):
+    return {"time": timestamp, "event_name": "player_say", "event": {"player": {"steamid": steamid}, "message": message}}
+
+
+def write_log(path, records, opener=open):
+    with opener(path, "wt") as file:
+        for record in records:
+            file.write(json.dumps(record) + "\n")
+
+
+def open_index(directory, **options):
+    index = ChatIndex(str(directory), **options)
+    os.makedirs(index.path, exist_ok=True)
+    index.manifest = load_manifest(index.path)
+    index.running = True
+    return index
+
+
+def index_live(index, directory):
+    index.open(os.path.getsize(os.path.join(directory, "chat.log")))
+    index.close()
+
+
+def test_words_prefixes_and_steamids(tmp_path):
+    write_log(tmp_path / "chat.log", [
+        chat(1, "good game everyone"),
+        chat(2, "Good luck", "[U:1:6]"),
+        chat(3, "goodbye")
+    ])
+    index_live(open_index(tmp_path), tmp_path)
+
+    assert [json.loads(line)["time"] for line in search(str(tmp_path), ["good"])] == [1, 2]
+    assert [json.loads(line)["time"] for line in search(str(tmp_path), ["good*"])] == [1, 2, 3]
+    assert [json.loads(line)["time"] for line in search(str(tmp_path), ["good"], steamid="[U:1:6]")] == [2]
+    assert [json.loads(line)["time"] for line in search(str(tmp_path), ["good*"], since=2, limit=1)] == [3]
+
+
+def test_backfill_indexes_rotated_logs_compressed_or_not(tmp_path):
+    write_log(tmp_path / "chat.log.20261017-120000.gz", [chat(1, "old news")], gzip.open)
+    write_log(tmp_path / "chat.log.20261018-120000", [chat(2, "old times")])
+    write_log(tmp_path / "chat.log", [chat(3, "new old")])
+
+    index = open_index(tmp_path)
+    while index._backfill():
+        pass
+    index_live(index, tmp_path)
+
+    assert [json.loads(line)["time"] for line in search(str(tmp_path), ["old"])] == [1, 2, 3]
+    names = sorted(entry["name"] for entry in index.manifest["files"].values())
+    assert names == ["chat.log", "chat.log.20261017-120000", "chat.log.20261018-120000"]
+
+
+def test_merge_drops_documents_of_expired_logs(tmp_path):
+    for day in range(1, 5):
+        write_log(tmp_path / f"chat.log.2026100{day}-120000", [chat(day, f"hello day{day}")])
+
+    index = open_index(tmp_path, merge_factor=4)
+    while index._backfill():
+        pass
+    assert len(index.manifest["segments"]) == 4
+
+    os.remove(tmp_path / "chat.log.20261001-120000")
+    assert index._merge()
+    assert len(index.manifest["segments"]) == 1
+    assert len(index.manifest["files"]) == 3
+    assert [json.loads(line)["time"] for line in search(str(tmp_path), ["hello"])] == [2, 3, 4]
+    assert sorted(os.listdir(index.path)) == sorted(["manifest.json", *index.manifest["segments"]])
+
+
+def test_truncated_live_log_doesnt_resolve_old_documents(tmp_path):
+    write_log(tmp_path / "chat.log", [chat(i, f"apple {i}") for i in range(40)])
+    index = open_index(tmp_path)
+    index_live(index, tmp_path)
+    assert len(search(str(tmp_path), ["apple"])) == 40
+
+    write_log(tmp_path / "chat.log", [chat(i, f"banana {i}") for i in range(5)])
+    index_live(index, tmp_path)
+    assert search(str(tmp_path), ["apple"]) == []
+    assert len(search(str(tmp_path), ["banana"])) == 5
+
+
+def test_rotating_while_backfill_runs(tmp_path):
+    """
+        Size rotation with gzip and the maintenance thread running used to
+        let _backfill claim a segment rotated() then deleted, and the
+        KeyError killed the thread
+    """
+    index = ChatIndex(str(tmp_path), batch_docs=20, merge_factor=4)
+    index.start()
+    sink = FileSink(str(tmp_path), rotator=LogRotator("size", max_bytes=4000, compress="gzip", keep=3),
+                    index_seconds=60, indexers={"chat.log": index})
+    sink.start()
+    try:
+        count = 0
+        for _ in range(60):
+            for _ in range(15):
+                count += 1
+                sink.emit("chat.log", chat(count, f"hello number{count}"))
+            sink.flush()
+            index.wake.set()
+            time.sleep(0.005)
+    finally:
+        sink.stop()
+        time.sleep(0.3)
+        alive = index.thread.is_alive()
+        index.stop()
+
+    assert alive and index.errors == 0
+    lines = search(str(tmp_path), ["hello"], limit=10000)
+    assert len(lines) == len(set(lines)) > 0
+    assert all("hello" in line for line in lines)
+    # Every index left behind belongs to a segment that's still there
+    names = set(os.listdir(tmp_path))
+    for name in names:
+        if name.endswith(".idx"):
+            segment = name[:-len(".idx")]
+            assert {segment, segment + ".gz"} & names, name
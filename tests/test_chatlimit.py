@@ -0,0 +1,50 @@
+from logger.chatlimit import ChatLimiter, ALLOW, DROP, MUTE, REPEAT
+
+
+def test_burst_then_rate():
+    limiter = ChatLimiter(rate=1, burst=3)
+    assert [limiter.check(1, now=10.0) for _ in range(4)] == [ALLOW, ALLOW, ALLOW, DROP]
+
+    # One token back after a second, no more than burst after a long pause
+    assert limiter.check(1, now=11.0) == ALLOW
+    assert limiter.check(1, now=11.0) == DROP
+    assert [limiter.check(1, now=100.0) for _ in range(4)] == [ALLOW, ALLOW, ALLOW, DROP]
+
+
+def test_slots_are_independent():
+    limiter = ChatLimiter(rate=1, burst=1)
+    assert limiter.check(1, now=5.0) == ALLOW
+    assert limiter.check(1, now=5.0) == DROP
+    assert limiter.check(2, now=5.0) == ALLOW
+
+
+def test_same_message_on_the_same_tick_is_one_message():
+    limiter = ChatLimiter(rate=1, burst=1)
+    assert limiter.check(1, "gg", tick=7, now=1.0) == ALLOW
+    # Another recipient's copy
+    assert limiter.check(1, "gg", tick=7, now=1.0) == REPEAT
+    assert limiter.check(1, "gg", tick=8, now=1.0) == DROP
+
+
+def test_repeated_floods_mute():
+    limiter = ChatLimiter(rate=1, burst=1, strikes=2, strike_window=60)
+    assert limiter.check(1, now=1.0) == ALLOW
+    assert limiter.check(1, now=1.0) == DROP
+    # Still the same flood, not another strike
+    assert limiter.check(1, now=1.0) == DROP
+
+    assert limiter.check(1, now=3.0) == ALLOW
+    assert limiter.check(1, now=3.0) == MUTE
+
+
+def test_drops_are_drained_once():
+    limiter = ChatLimiter(rate=1, burst=1)
+    for _ in range(3):
+        limiter.check(4, now=1.0)
+    assert list(limiter.drain_drops()) == [(4, 2)]
+    assert list(limiter.drain_drops()) == []
+
+
+def test_disabled_and_out_of_range():
+    assert ChatLimiter(rate=0).check(1, now=1.0) == ALLOW
+    assert ChatLimiter(max_slots=4).check(10, now=1.0) == ALLOW
@@ -0,0 +1,18 @@
+import pytest
+
+from match.demoinfo import CASES, InvalidDemo, check_demo
+
+
+@pytest.mark.parametrize("name", list(CASES))
+def test_check_demo(tmp_path, name):
+    data, expected = CASES[name]
+    path = tmp_path / "match.dem"
+    path.write_bytes(data)
+
+    if expected is None:
+        header = check_demo(str(path), min_seconds=60)
+        assert header.map_name == "cp_process_final"
+        assert header.duration == "30:00"
+    else:
+        with pytest.raises(InvalidDemo, match=expected):
+            check_demo(str(path), min_seconds=60)
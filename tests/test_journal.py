@@ -0,0 +1,163 @@
+import threading
+import json
+import time
+import os
+
+import pytest
+
+from match.journal import UploadJournal, STATUS_DONE, STATUS_FAILED, STATUS_PENDING
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return condition()
+
+
+@pytest.fixture
+def journals():
+    started = []
+    yield started
+    for journal in started:
+        journal.stop()
+
+
+def test_stages_run_and_job_completes(tmp_path, journals):
+    completed = []
+    journal = UploadJournal(str(tmp_path), on_complete=completed.append)
+    journal.add_stage("logstf", lambda job, values: "https://logs.tf/1")
+    journal.add_stage("discord", lambda job, values: values["logstf"], requires=("logstf",))
+    journal.start()
+    journals.append(journal)
+
+    job = journal.submit("match", {})
+    assert wait_for(lambda: completed)
+    assert job.stage("discord")["result"] == "https://logs.tf/1"
+    assert os.listdir(tmp_path) == []
+
+
+def test_failed_stage_backs_off(tmp_path, journals):
+    journal = UploadJournal(str(tmp_path), backoff=30)
+    journal.add_stage("demostf", lambda job, values: 1 / 0)
+    journal.start()
+    journals.append(journal)
+
+    job = journal.submit("match", {})
+    assert wait_for(lambda: job.stage("demostf")["attempts"] == 1)
+    stage = job.stage("demostf")
+    assert stage["status"] == STATUS_PENDING
+    assert "division by zero" in stage["error"]
+    assert 30 <= stage["next_attempt"] - time.time() <= 34
+
+    # Persisted, so a reload keeps waiting it out
+    with open(job.path) as file:
+        assert json.load(file)["stages"]["demostf"]["attempts"] == 1
+
+
+def test_gives_up_after_max_attempts(tmp_path, journals):
+    completed = []
+    journal = UploadJournal(str(tmp_path), max_attempts=2, backoff=0.01, on_complete=completed.append)
+    journal.add_stage("demostf", lambda job, values: 1 / 0)
+    journal.start()
+    journals.append(journal)
+
+    job = journal.submit("match", {})
+    assert wait_for(lambda: completed)
+    assert job.stage("demostf")["status"] == STATUS_FAILED
+    assert job.stage("demostf")["attempts"] == 2
+
+
+def test_dependents_go_ahead_after_the_first_failure(tmp_path, journals):
+    posted = []
+    journal = UploadJournal(str(tmp_path), backoff=30)
+    journal.add_stage("demostf", lambda job, values: 1 / 0)
+    journal.add_stage("logstf", lambda job, values: "https://logs.tf/1")
+    journal.add_stage("discord", lambda job, values: posted.append(dict(values)), requires=("logstf", "demostf"))
+    journal.start()
+    journals.append(journal)
+
+    journal.submit("match", {})
+    # Not held back through demos.tf's backoff
+    assert wait_for(lambda: posted, timeout=3)
+    assert posted == [{"logstf": "https://logs.tf/1", "demostf": None}]
+
+
+def test_stage_finishing_after_its_timeout_completes_the_job(tmp_path, journals):
+    completed = []
+    journal = UploadJournal(str(tmp_path), on_complete=completed.append)
+    journal.add_stage("s3", lambda job, values: time.sleep(1) or "archived", timeout=0.2)
+    journal.start()
+    journals.append(journal)
+
+    job = journal.submit("match", {})
+    assert wait_for(lambda: completed)
+    assert job.stage("s3")["status"] == STATUS_DONE
+    assert not os.path.exists(job.path)
+
+
+def test_finished_job_left_on_disk_completes_on_start(tmp_path, journals):
+    stage = {"status": STATUS_DONE, "attempts": 0, "next_attempt": 0, "result": "ok", "error": None}
+    with open(tmp_path / "match.json", "w") as file:
+        json.dump({"match": "match", "created": 0, "context": {}, "stages": {"logstf": stage}, "state": {}}, file)
+
+    completed = []
+    journal = UploadJournal(str(tmp_path), on_complete=completed.append)
+    journal.add_stage("logstf", lambda job, values: pytest.fail("ran a finished stage"))
+    journal.start()
+    journals.append(journal)
+
+    assert wait_for(lambda: completed)
+    assert os.listdir(tmp_path) == []
+
+
+def test_reload_doesnt_rerun_stages_still_in_flight(tmp_path, journals):
+    """
+        A plugin reload stops one journal and starts another in the same
+        process while the first one's upload threads keep going
+    """
+    calls = []
+    completed = []
+    lock = threading.Lock()
+
+    def record(name):
+        with lock:
+            calls.append(name)
+
+    def journal():
+        journal = UploadJournal(str(tmp_path), on_complete=completed.append)
+        journal.add_stage("demostf", lambda job, values: record(job.name) or time.sleep(1) or "demo")
+        journal.add_stage("logstf", lambda job, values: "log")
+        journal.add_stage("discord", lambda job, values: record(f"{job.name}-discord-{values['demostf']}"), requires=("logstf", "demostf"))
+        journals.append(journal)
+        return journal
+
+    first = journal()
+    first.start()
+    first.submit("A", {})
+    first.submit("B", {})
+    assert wait_for(lambda: len(calls) == 2)
+    first.stop()
+
+    second = journal()
+    second.start()
+    assert wait_for(lambda: len(completed) == 2, timeout=15)
+    assert sorted(calls) == ["A", "A-discord-demo", "B", "B-discord-demo"]
+    assert os.listdir(tmp_path) == []
+
+
+def test_stage_marked_by_a_dead_process_runs_again(tmp_path, journals):
+    stage = {"status": STATUS_PENDING, "attempts": 0, "next_attempt": 0, "result": None, "error": None, "running": "1:1"}
+    with open(tmp_path / "match.json", "w") as file:
+        json.dump({"match": "match", "created": 0, "context": {}, "stages": {"logstf": stage}, "state": {}}, file)
+
+    completed = []
+    journal = UploadJournal(str(tmp_path), on_complete=completed.append)
+    journal.add_stage("logstf", lambda job, values: "log")
+    journal.start()
+    journals.append(journal)
+
+    assert wait_for(lambda: completed)
+    assert completed[0].stage("logstf")["result"] == "log"
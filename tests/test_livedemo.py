@@ -0,0 +1,56 @@
+import threading
+import time
+
+from match.livedemo import LiveDemoUpload
+
+
+class FakeS3(object):
+    def __init__(self):
+        self.parts = []
+        self.aborted = []
+        self.uploaded = threading.Event()
+
+    def create_multipart_upload(self, Bucket, Key, ContentType):
+        return {"UploadId": "upload"}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body, ContentMD5):
+        self.parts.append(PartNumber)
+        self.uploaded.set()
+        return {"ETag": f"etag{PartNumber}"}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.aborted.append(UploadId)
+
+
+def live_demo(tmp_path, client):
+    path = tmp_path / "match.dem"
+    path.write_bytes(b"x" * 5000)
+    upload = LiveDemoUpload(lambda: client, "bucket", "match.dem", str(path), part_size=1024, poll=0.01)
+    upload.start()
+    assert client.uploaded.wait(2)
+    return upload
+
+
+def test_parts_past_the_header_go_up_while_recording(tmp_path):
+    client = FakeS3()
+    upload = live_demo(tmp_path, client)
+    deadline = time.monotonic() + 2
+    while len(client.parts) < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    state = upload.join(2)
+
+    # Part 1 holds the header and the last one may still grow
+    assert client.parts == [2, 3, 4]
+    assert state["upload_id"] == "upload"
+    assert [part["number"] for part in state["parts"]] == [2, 3, 4]
+    assert client.aborted == []
+
+
+def test_abort_throws_the_upload_away(tmp_path):
+    client = FakeS3()
+    upload = live_demo(tmp_path, client)
+    upload.abort()
+    upload.thread.join(2)
+
+    assert client.aborted == ["upload"]
+    assert upload.state() == {}
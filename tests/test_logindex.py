@@ -0,0 +1,74 @@
+import _compression
+import gzip
+import json
+import lzma
+
+import pytest
+
+from logger.logindex import LogIndexer, build_blocks, covering_blocks, format_block, log_files, query, index_path
+
+
+def write_log(path, count, opener=open):
+    with opener(path, "wt") as file:
+        for number in range(count):
+            steamid = "[U:1:7]" if number % 500 == 0 else f"[U:1:{100 + number % 50}]"
+            file.write(json.dumps({"time": 1000 + number, "event_name": "x", "event": {"steamid": steamid, "pad": "y" * 100}}) + "\n")
+
+
+def test_log_files_oldest_first(tmp_path):
+    for name in ("chat.log", "chat.log.20261018-120000-2", "chat.log.20261018-120000-1.gz",
+                 "chat.log.20261018-120000.gz", "chat.log.20261017-120000.xz", "chat.log.idx", "event.log"):
+        (tmp_path / name).write_text("")
+
+    assert [path.rsplit("/", 1)[1] for path in log_files(str(tmp_path), "chat.log")] == [
+        "chat.log.20261017-120000.xz", "chat.log.20261018-120000.gz",
+        "chat.log.20261018-120000-1.gz", "chat.log.20261018-120000-2", "chat.log"
+    ]
+
+
+def test_indexer_blocks_and_rotation(tmp_path):
+    path = str(tmp_path / "event.log")
+    indexer = LogIndexer(index_path(path), block_seconds=10)
+    indexer.open(0)
+    offset = 0
+    for number in range(25):
+        indexer.add(offset, 100, {"time": number, "event": {"steamid": f"[U:1:{number}]"}})
+        offset += 100
+    indexer.rotated(path + ".20261018-120000.gz")
+
+    blocks = (tmp_path / "event.log.20261018-120000.idx").read_text().splitlines()
+    assert len(blocks) == 3
+    assert blocks[0].split("\t")[1:3] == ["0", "1100"]
+    assert not (tmp_path / "event.log.idx").exists()
+
+
+def test_missing_index_rebuilds_itself(tmp_path):
+    path = str(tmp_path / "event.log")
+    write_log(path, 2000)
+    assert list(query(path, steamid="[U:1:7]")) == list(query(path, steamid="[U:1:7]", persist=False))
+    assert (tmp_path / "event.log.idx").exists()
+    assert len(list(query(path, steamid="[U:1:7]"))) == 4
+
+
+@pytest.mark.parametrize("suffix,opener", [(".gz", gzip.open), (".xz", lzma.open)])
+def test_compressed_segment_is_read_in_one_pass(tmp_path, monkeypatch, suffix, opener):
+    path = str(tmp_path / f"event.log.20261018-120000{suffix}")
+    write_log(path, 20000, opener)
+    # Small blocks, so the steamid is in many of them
+    with opener(path, "rb") as file:
+        blocks, _ = build_blocks(file, 0, 1 << 40, block_seconds=1 << 30, block_bytes=16 * 1024)
+    with open(index_path(path), "w") as file:
+        file.writelines(format_block(*block) for block in blocks)
+    assert covering_blocks(path) == blocks
+
+    rewinds = []
+    rewind = _compression.DecompressReader._rewind
+    monkeypatch.setattr(_compression.DecompressReader, "_rewind", lambda self: rewinds.append(1) or rewind(self))
+
+    with opener(path, "rt") as file:
+        expected = [line.rstrip("\n") for line in file if '"[U:1:7]"' in line]
+    rewinds.clear()
+    assert list(query(path, steamid="[U:1:7]")) == expected
+    assert len(expected) == 40
+    assert rewinds == []
+    assert [json.loads(line)["time"] for line in query(path, steamid="[U:1:7]", since=11000, until=12000)] == [11000, 11500, 12000]
@@ -0,0 +1,94 @@
+import io
+
+import pytest
+
+from match.multipart import upload_multipart, UploadExpired
+
+
+class NoSuchUpload(Exception):
+    response = {"Error": {"Code": "NoSuchUpload"}}
+
+
+class FakeS3(object):
+    def __init__(self, fail_at=None):
+        self.uploads = {}
+        self.completed = {}
+        self.sent = []
+        self.fail_at = fail_at
+
+    def create_multipart_upload(self, Bucket, Key, **extra):
+        upload_id = f"upload-{len(self.uploads) + 1}"
+        self.uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body, ContentMD5):
+        if UploadId not in self.uploads:
+            raise NoSuchUpload()
+        if PartNumber == self.fail_at:
+            self.fail_at = None
+            raise ConnectionError("connection reset")
+
+        self.sent.append(PartNumber)
+        self.uploads[UploadId][PartNumber] = Body
+        return {"ETag": f"etag-{PartNumber}-{len(Body)}"}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = self.uploads.pop(UploadId)
+        self.completed[Key] = b"".join(parts[part["PartNumber"]] for part in MultipartUpload["Parts"])
+
+
+DATA = bytes(range(256)) * 40
+
+
+def upload(client, state, saves):
+    return upload_multipart(client, "bucket", "key", io.BytesIO(DATA), state, lambda: saves.append(dict(state)), part_size=1024)
+
+
+def test_uploads_every_part():
+    client = FakeS3()
+    state = {}
+    assert upload(client, state, []) == len(DATA)
+    assert client.completed["key"] == DATA
+    assert client.sent == list(range(1, 11))
+    assert state == {}
+
+
+def test_resumes_after_the_last_finished_part():
+    client = FakeS3(fail_at=4)
+    state, saves = {}, []
+    with pytest.raises(ConnectionError):
+        upload(client, state, saves)
+    assert [part["number"] for part in state["parts"]] == [1, 2, 3]
+
+    client.sent.clear()
+    sent = upload(client, state, saves)
+    assert client.sent == list(range(4, 11))
+    assert sent == len(DATA) - 3 * 1024
+    assert client.completed["key"] == DATA
+
+
+def test_changed_part_is_uploaded_again():
+    client = FakeS3(fail_at=3)
+    state = {}
+    with pytest.raises(ConnectionError):
+        upload(client, state, [])
+
+    state["parts"][0]["md5"] = "0" * 32
+    client.sent.clear()
+    upload(client, state, [])
+    assert client.sent[0] == 1 and 2 not in client.sent
+
+
+def test_expired_upload_starts_over():
+    client = FakeS3(fail_at=2)
+    state = {}
+    with pytest.raises(ConnectionError):
+        upload(client, state, [])
+
+    client.uploads.clear()
+    with pytest.raises(UploadExpired):
+        upload(client, state, [])
+    assert state == {}
+
+    upload(client, state, [])
+    assert client.completed["key"] == DATA
@@ -0,0 +1,48 @@
+import threading
+import time
+
+import pytest
+
+from match.pipeline import UploadGraph, STATUS_OK, STATUS_FAILED, STATUS_TIMEOUT
+
+
+def test_dependents_get_what_their_requirements_returned():
+    graph = UploadGraph()
+    graph.add("logstf", lambda values: "log")
+    graph.add("demostf", lambda values: 1 / 0)
+    graph.add("discord", lambda values: dict(values), requires=("logstf", "demostf"))
+
+    results = graph.run()
+    assert results["demostf"].status == STATUS_FAILED
+    assert results["discord"].status == STATUS_OK
+    assert results["discord"].value == {"logstf": "log", "demostf": None}
+
+
+def test_independent_stages_run_side_by_side():
+    barrier = threading.Barrier(2, timeout=2)
+    graph = UploadGraph(workers=2)
+    graph.add("a", lambda values: barrier.wait())
+    graph.add("b", lambda values: barrier.wait())
+
+    results = graph.run()
+    assert all(result.status == STATUS_OK for result in results.values())
+
+
+def test_timed_out_stage_doesnt_hold_up_its_dependents():
+    release = threading.Event()
+    graph = UploadGraph()
+    graph.add("slow", lambda values: release.wait(5), timeout=0.2)
+    graph.add("after", lambda values: values["slow"], requires=("slow",))
+
+    started = time.monotonic()
+    results = graph.run()
+    release.set()
+    assert time.monotonic() - started < 2
+    assert results["slow"].status == STATUS_TIMEOUT
+    assert results["after"].value is None
+
+
+def test_unknown_requirement():
+    graph = UploadGraph()
+    with pytest.raises(ValueError):
+        graph.add("discord", lambda values: None, requires=("logstf",))
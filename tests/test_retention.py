@@ -0,0 +1,50 @@
+import os
+
+from match.retention import RetentionManager
+
+
+def matches(tmp_path, archived=()):
+    directory = tmp_path / "matches"
+    directory.mkdir()
+    for number, name in enumerate(("a", "b", "c")):
+        for suffix in (".dem", ".log"):
+            (directory / (name + suffix)).write_bytes(b"x" * 1000)
+            os.utime(directory / (name + suffix), (1000 + number, 1000 + number))
+    return directory
+
+
+def retention(directory, tmp_path, budget, unarchived=False, protected=()):
+    manager = RetentionManager(
+        str(directory), str(tmp_path / "retention" / "manifest.json"),
+        lambda: (budget, 0), lambda: protected, lambda: unarchived
+    )
+    os.makedirs(tmp_path / "retention", exist_ok=True)
+    return manager
+
+
+def test_archived_matches_go_oldest_first(tmp_path):
+    directory = matches(tmp_path)
+    manager = retention(directory, tmp_path, budget=4000)
+    manager.archived("b")
+    manager.archived("c")
+
+    report = manager.run_pass()
+    assert report.evicted == ["b"]
+    assert sorted(os.listdir(directory)) == ["a.dem", "a.log", "c.dem", "c.log"]
+
+
+def test_unarchived_matches_are_kept_unless_asked(tmp_path):
+    directory = matches(tmp_path)
+    manager = retention(directory, tmp_path, budget=1000)
+    manager.archived("c")
+
+    report = manager.run_pass()
+    assert report.evicted == ["c"]
+    assert report.shortfall == 3000
+    assert sorted(os.listdir(directory)) == ["a.dem", "a.log", "b.dem", "b.log"]
+
+    manager.unarchived = lambda: True
+    manager.protected = lambda: ["a"]
+    report = manager.run_pass()
+    assert report.evicted == ["b"]
+    assert sorted(os.listdir(directory)) == ["a.dem", "a.log"]
@@ -0,0 +1,107 @@
+import json
+import os
+
+from logger.writer import FileSink, LogRotator, LogWriter, COMPRESS_NONE
+
+
+class RecordingIndexer(object):
+    """
+        Shares LogIndexer's interface, remembers what the log looked like
+        when it was told about the rotation
+    """
+    def __init__(self, path):
+        self.path = path
+        self.rotations = []
+
+    def open(self, offset):
+        pass
+
+    def add(self, offset, length, record):
+        pass
+
+    def close(self):
+        pass
+
+    def rotated(self, target):
+        self.rotations.append((target, os.path.exists(self.path), os.path.exists(target)))
+
+
+def test_events_reach_the_file_in_order(tmp_path):
+    writer = LogWriter([FileSink(str(tmp_path))], flush_interval=0.01)
+    writer.start()
+    for number in range(100):
+        writer.put("event.log", {"time": number, "event_name": "tick", "event": {}})
+    writer.stop()
+
+    with open(tmp_path / "event.log") as file:
+        assert [json.loads(line)["time"] for line in file] == list(range(100))
+
+
+def test_indexes_hear_of_a_rotation_before_the_rename(tmp_path):
+    indexer = RecordingIndexer(str(tmp_path / "chat.log"))
+    rotator = LogRotator("size", max_bytes=100, compress=COMPRESS_NONE, keep=0)
+    sink = FileSink(str(tmp_path), rotator=rotator, indexers={"chat.log": indexer})
+    for number in range(3):
+        sink.emit("chat.log", {"time": number, "event_name": "player_say", "event": {"message": "x" * 60}})
+        sink.flush()
+
+    assert indexer.rotations
+    for target, log_there, target_there in indexer.rotations:
+        assert log_there and not target_there
+        assert os.path.exists(target)
+
+
+def test_sparse_index_follows_its_segment_with_keep(tmp_path):
+    rotator = LogRotator("size", max_bytes=200, compress="gzip", keep=3)
+    sink = FileSink(str(tmp_path), rotator=rotator, index_seconds=1)
+    sink.start()
+    for number in range(40):
+        sink.emit("chat.log", {"time": number * 10, "event_name": "player_say", "event": {"message": "x" * 60}})
+        sink.flush()
+    sink.stop()
+
+    names = set(os.listdir(tmp_path))
+    segments = [name for name in names if name.endswith(".gz")]
+    assert len(segments) == 3
+    for name in names:
+        if name.endswith(".idx") and name != "chat.log.idx":
+            assert name[:-len(".idx")] + ".gz" in names, name
+
+
+def test_expire_removes_stray_indexes_only_of_expired_segments(tmp_path):
+    def touch(name):
+        (tmp_path / name).write_text("x")
+
+    touch("chat.log.20200101-000000.idx")
+    for stamp in ("20261018-100000", "20261018-110000", "20261018-120000", "20261018-130000"):
+        touch(f"chat.log.{stamp}.gz")
+        touch(f"chat.log.{stamp}.idx")
+    # Renamed ahead of its segment, which is on its way
+    touch("chat.log.20261018-140000.idx")
+    touch("event.log.20200101-000000.idx")
+
+    LogRotator("size", compress=COMPRESS_NONE, keep=3)._expire(str(tmp_path / "chat.log.20261018-130000"))
+    assert sorted(os.listdir(tmp_path)) == [
+        "chat.log.20261018-110000.gz", "chat.log.20261018-110000.idx",
+        "chat.log.20261018-120000.gz", "chat.log.20261018-120000.idx",
+        "chat.log.20261018-130000.gz", "chat.log.20261018-130000.idx",
+        "chat.log.20261018-140000.idx",
+        "event.log.20200101-000000.idx"
+    ]
+
+
+def test_gauges_snapshot_and_per_value_files(tmp_path):
+    sink = FileSink(str(tmp_path))
+    sink.gauges({"players": 12, "idle": 0, "bots": 0, "spectators": 1, "hltv": 1, "currentmap": "cp_process_final", "time": 5})
+
+    with open(tmp_path / "gauges.json") as file:
+        assert json.load(file)["players"] == 12
+    assert (tmp_path / "players").read_text() == "12"
+    assert (tmp_path / "currentmap").read_text() == "cp_process_final"
+    assert not (tmp_path / "hltv").exists()
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+    sink = FileSink(str(tmp_path / "new"), legacy_gauges=())
+    os.makedirs(tmp_path / "new")
+    sink.gauges({"players": 3})
+    assert os.listdir(tmp_path / "new") == ["gauges.json"]